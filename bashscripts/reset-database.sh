@@ -1,5 +1,6 @@
 #!/bin/bash
-PGPASSWORD=$DJANGO_DB_PASSWORD
+# The password is only in the environment file, not in postactivate.
+PGPASSWORD=$(python3 -c 'import json, os; print(json.load(open(os.environ["DJANGO_ENVIRONMENT_FILE"]))["DJANGO_DB_PASSWORD"])')
 PGUSER=$DJANGO_DB_USER
 PGDATABASE="postgres"
 
@@ -1,3 +1,4 @@
 #!/bin/bash
-echo 'make api-urls.json'
-django-admin show_urls --settings=settings.production | grep -v "<format>" | awk 'BEGIN{print "{"} NR > 1 { print "," } { printf("\"%s\": \"%s\"", $3, $1)} END{ print "\n}"}' | column -t > src/javascript/api-urls.json
+# Writes api-urls.json if the named urls have changed.
+cd $(git rev-parse --show-toplevel)
+exec python3 config_tools/export_urls.py src/javascript/api-urls.json --settings=settings.production
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Keystroke latency for the autocomplete prefix index.
+
+Types random names one letter at a time and reports latency per keystroke.
+Use --redis to measure the redis backed index instead of the in-memory one.
+
+    python benchmarks/autocomplete.py --items 50000 --redis
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'django'))
+
+from apps.common.autocomplete import PrefixIndex, RedisPrefixIndex  # noqa
+
+FIRST_NAMES = (
+    'Ola Kari Per Anne Nils Ingrid Lars Marte Jon Sigrid Knut Ida Erik Nora '
+    'Hans Eva Arne Lise Tor Maja').split()
+LAST_NAMES = (
+    'Nordmann Hansen Johansen Olsen Larsen Andersen Pedersen Nilsen '
+    'Kristiansen Jensen Karlsen Johnsen Pettersen Eriksen Berg Haugen '
+    'Hagen Johannessen Andreassen Jacobsen').split()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('--redis', action='store_true')
+    parser.add_argument('--redis-db', type=int, default=15)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    if args.redis:
+        import redis
+        index = RedisPrefixIndex(
+            'benchmark', connection=redis.StrictRedis(db=args.redis_db))
+        index.clear()
+    else:
+        index = PrefixIndex('benchmark')
+
+    start = time.time()
+    names = []
+    for pk in range(args.items):
+        name = '{} {} {}'.format(
+            rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), pk)
+        names.append(name)
+        index.add(pk, name)
+    print('indexed {} items in {:.2f} s'.format(
+        args.items, time.time() - start))
+
+    latencies = []
+    for _ in range(args.queries):
+        name = rng.choice(names)
+        for length in range(1, len(name) + 1):
+            start = time.time()
+            index.search(name[:length])
+            latencies.append((time.time() - start) * 1000)
+    print('{} keystrokes: p50 {:.3f} ms, p95 {:.3f} ms, p99 {:.3f} ms'.format(
+        len(latencies),
+        percentile(latencies, .5),
+        percentile(latencies, .95),
+        percentile(latencies, .99),
+    ))
+    if args.redis:
+        index.clear()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+HTTP load test for the public routes of the site.
+
+Replays a mix of frontpage, section, article, rss, search and 404 requests
+at a fixed concurrency and reports latency percentiles and requests per
+second per route. Paths are either discovered from links on the frontpage
+or replayed from an nginx access log.
+
+    python benchmarks/loadtest.py http://localhost:8000 -c 10 -n 2000 \\
+        --output results.json --compare previous.json
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from collections import defaultdict
+
+try:
+    from urllib.request import urlopen, Request
+    from urllib.error import HTTPError
+    from queue import Queue
+except ImportError:  # python 2
+    from urllib2 import urlopen, Request, HTTPError
+    from Queue import Queue
+
+# Same order and patterns as the root urlconf.
+ROUTES = [
+    ('rss', r'^/rss/$'),
+    ('frontpage', r'^/$'),
+    ('search', r'^/search/'),
+    ('article', r'^/[a-z0-9-]+/\d+/[a-z0-9-]*/?$'),
+    ('article', r'^/\d+/'),
+    ('storytype', r'^/[a-z0-9-]+/[a-z0-9-]+/$'),
+    ('section', r'^/[a-z0-9-]+/$'),
+    ('not_found', r'^/.+/$'),
+]
+ROUTES = [(name, re.compile(pattern)) for name, pattern in ROUTES]
+
+# Relative weight of each route in the synthetic mix.
+DEFAULT_MIX = {
+    'frontpage': 20, 'section': 10, 'storytype': 5, 'article': 50,
+    'rss': 5, 'search': 5, 'not_found': 5,
+}
+SEARCH_WORDS = ['studenter', 'eksamen', 'universitetet', 'bolig', 'valg']
+ACCESS_LOG_LINE = re.compile(r'"GET (?P<path>\S+) HTTP/[\d.]+"')
+
+
+def route_name(path):
+    path = path.split('?')[0]
+    for name, pattern in ROUTES:
+        if pattern.match(path):
+            return name
+    return 'other'
+
+
+def fetch(url, timeout=30):
+    """Returns (status code, body)"""
+    request = Request(url, headers={'User-Agent': 'prodsys-loadtest'})
+    try:
+        response = urlopen(request, timeout=timeout)
+        return response.getcode(), response.read()
+    except HTTPError as err:
+        return err.code, b''
+
+
+def discover_paths(base_url):
+    """Group internal links on the frontpage by route name."""
+    status, body = fetch(base_url + '/')
+    links = set(re.findall(r'href="(/[^"#]*)"', body.decode('utf8', 'ignore')))
+    paths = defaultdict(list)
+    for path in links:
+        paths[route_name(path)].append(path)
+    paths['frontpage'] = ['/']
+    paths['rss'] = ['/rss/']
+    paths['search'] = ['/search/?q=' + word for word in SEARCH_WORDS]
+    paths['not_found'] = [
+        '/finnes-ikke/side-{}/mangler/'.format(n) for n in range(50)]
+    return paths
+
+
+def synthetic_paths(paths, mix, count, rng):
+    routes = [route for route in mix if paths.get(route)]
+    weights = [mix[route] for route in routes]
+    chosen = []
+    for _ in range(count):
+        route = weighted_choice(routes, weights, rng)
+        chosen.append(rng.choice(paths[route]))
+    return chosen
+
+
+def weighted_choice(items, weights, rng):
+    point = rng.uniform(0, sum(weights))
+    for item, weight in zip(items, weights):
+        point -= weight
+        if point <= 0:
+            return item
+    return items[-1]
+
+
+def replay_paths(logfile, count):
+    """GET request paths from an nginx access log."""
+    chosen = []
+    with open(logfile) as lines:
+        for line in lines:
+            match = ACCESS_LOG_LINE.search(line)
+            if match:
+                chosen.append(match.group('path'))
+                if len(chosen) == count:
+                    break
+    return chosen
+
+
+def run(base_url, paths, concurrency):
+    """Request all paths and return a list of (route, status, seconds)"""
+    queue = Queue()
+    for path in paths:
+        queue.put(path)
+    results = []
+    lock = threading.Lock()
+
+    def worker():
+        while True:
+            try:
+                path = queue.get_nowait()
+            except Exception:
+                return
+            start = time.time()
+            try:
+                status, _ = fetch(base_url + path)
+            except Exception:
+                status = 0
+            elapsed = time.time() - start
+            with lock:
+                results.append((route_name(path), status, elapsed))
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(results, wall_time):
+    by_route = defaultdict(list)
+    for route, status, seconds in results:
+        by_route[route].append((status, seconds))
+        by_route['all'].append((status, seconds))
+    summary = {}
+    for route, rows in by_route.items():
+        times = [seconds * 1000 for status, seconds in rows]
+        summary[route] = {
+            'requests': len(rows),
+            'errors': sum(1 for status, _ in rows if not status or status >= 500),
+            'rps': len(rows) / wall_time,
+            'p50': percentile(times, .50),
+            'p95': percentile(times, .95),
+            'p99': percentile(times, .99),
+        }
+    return summary
+
+
+def print_summary(summary, previous=None):
+    columns = ['requests', 'errors', 'rps', 'p50', 'p95', 'p99']
+    print('{:<12}'.format('route') + ''.join(
+        '{:>12}'.format(column) for column in columns))
+    for route in sorted(summary):
+        row = summary[route]
+        line = '{:<12}'.format(route)
+        for column in columns:
+            value = '{:.1f}'.format(row[column])
+            if previous and route in previous and column in ('rps', 'p50',
+                                                             'p95', 'p99'):
+                old = previous[route][column]
+                if old:
+                    value += ' {:+.0f}%'.format((row[column] - old) / old * 100)
+            line += '{:>12}'.format(value)
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('base_url', nargs='?', default='http://localhost:8000')
+    parser.add_argument('-c', '--concurrency', type=int, default=10)
+    parser.add_argument('-n', '--requests', type=int, default=1000)
+    parser.add_argument('--replay', metavar='ACCESS_LOG',
+                        help='replay GET requests from an nginx access log')
+    parser.add_argument('--mix', type=json.loads, default=DEFAULT_MIX,
+                        help='json object of route weights')
+    parser.add_argument('--warmup', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write results to json file')
+    parser.add_argument('--compare', help='json results to compare with')
+    args = parser.parse_args(argv)
+
+    base_url = args.base_url.rstrip('/')
+    rng = random.Random(args.seed)
+    if args.replay:
+        paths = replay_paths(args.replay, args.requests)
+    else:
+        paths = synthetic_paths(
+            discover_paths(base_url), args.mix, args.requests, rng)
+    if not paths:
+        print('no paths to request')
+        return 1
+
+    run(base_url, paths[:args.warmup], args.concurrency)
+    start = time.time()
+    results = run(base_url, paths, args.concurrency)
+    summary = summarize(results, time.time() - start)
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as compare_file:
+            previous = json.load(compare_file)['routes']
+    print_summary(summary, previous)
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'base_url': base_url,
+                'concurrency': args.concurrency,
+                'requests': len(paths),
+                'routes': summary,
+            }, output, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Redirect lookup time as the number of redirects grows.
+
+Compares the redirect table with trying one regular expression per redirect,
+which is what a list of url patterns does.
+
+    python benchmarks/redirects.py --sizes 100 1000 10000 50000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'django'))
+
+from apps.common.redirects import RedirectTable  # noqa
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[100, 1000, 10000, 50000])
+    parser.add_argument('--lookups', type=int, default=1000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    print('{:>8} {:>14} {:>14}'.format(
+        'redirects', 'table us', 'patterns us'))
+    for size in args.sizes:
+        sources = ['/arkiv/{}/sak-{}/'.format(n % 97, n) for n in range(size)]
+        table = RedirectTable()
+        for n, source in enumerate(sources):
+            table.add(source, '/nyheter/{}/'.format(n))
+        patterns = [
+            (re.compile('^{}$'.format(re.escape(source))), source)
+            for source in sources]
+        # Half of the lookups are misses, like requests for real content.
+        paths = [rng.choice(sources) if n % 2 else '/nyheter/{}/'.format(n)
+                 for n in range(args.lookups)]
+
+        start = time.time()
+        for path in paths:
+            table.lookup(path)
+        table_time = (time.time() - start) / len(paths) * 1e6
+
+        # The linear scan is slow, so use fewer lookups for large tables.
+        sample = paths[:max(10, args.lookups * 1000 // size)]
+        start = time.time()
+        for path in sample:
+            next((p for p, _ in patterns if p.match(path)), None)
+        pattern_time = (time.time() - start) / len(sample) * 1e6
+
+        print('{:>8} {:>14.2f} {:>14.2f}'.format(
+            size, table_time, pattern_time))
+
+
+if __name__ == '__main__':
+    main()
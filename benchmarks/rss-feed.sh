@@ -0,0 +1,23 @@
+#!/bin/bash
+# Requests per second for the rss feed, with and without conditional GET.
+# usage: benchmarks/rss-feed.sh [base url] [number of requests] [concurrency]
+# Run it against the old and new revision to compare.
+BASE_URL=${1:-http://localhost:8000}
+REQUESTS=${2:-1000}
+CONCURRENCY=${3:-10}
+FEED_URL="$BASE_URL/rss/"
+
+rps(){
+  ab -q -n $REQUESTS -c $CONCURRENCY "$@" $FEED_URL | grep 'Requests per second'
+}
+
+echo "full feed requests"
+rps
+
+etag=$(curl -sI $FEED_URL | grep -i '^etag:' | cut -d' ' -f2 | tr -d '\r')
+if [ -n "$etag" ]; then
+  echo "conditional requests (If-None-Match: $etag)"
+  rps -H "If-None-Match: $etag"
+else
+  echo "no etag in response, skipping conditional requests"
+fi
@@ -0,0 +1,31 @@
+#!/bin/bash
+# Boot the site with gunicorn and run the load test against it.
+# usage: benchmarks/run-loadtest.sh [loadtest.py options]
+# Set LOADTEST_RESET_DB=yes to repopulate the database with dummydata first.
+# Results are saved as benchmarks/results/<commit>.json and compared with
+# the most recent earlier result.
+cd $(git rev-parse --show-toplevel)
+PORT=${LOADTEST_PORT:-8123}
+WORKERS=${LOADTEST_WORKERS:-3}
+RESULTS=benchmarks/results
+PIDFILE=/tmp/loadtest-gunicorn.pid
+mkdir -p $RESULTS
+
+if [ "$LOADTEST_RESET_DB" == "yes" ]; then
+  bashscripts/reset-database.sh
+fi
+
+gunicorn core.wsgi:application --daemon --pid $PIDFILE \
+  --bind 127.0.0.1:$PORT --workers $WORKERS --log-level warning
+trap 'kill $(cat $PIDFILE)' EXIT
+
+echo 'waiting for gunicorn'
+for i in $(seq 30); do
+  curl -s -o /dev/null http://127.0.0.1:$PORT/ && break
+  sleep 1
+done
+
+commit=$(git rev-parse --short HEAD)
+previous=$(ls -t $RESULTS/*.json 2>/dev/null | grep -v "$commit.json" | head -1)
+python benchmarks/loadtest.py http://127.0.0.1:$PORT \
+  --output $RESULTS/$commit.json ${previous:+--compare $previous} "$@"
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Compare fuzzy slug lookup with the slug index against a linear scan.
+
+    python benchmarks/slug_index.py --items 20000 --queries 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'django'))
+
+from apps.common.fuzzy_index import SlugIndex, linear_closest  # noqa
+
+WORDS = (
+    'student studenter universitet oslo blindern rektor eksamen kantine '
+    'semester pensum forelesning bolig husleie sio valg styre debatt '
+    'kultur konsert teater film bok musikk sport fotball ski forskning '
+    'professor stipendiat doktorgrad budsjett kutt streik demonstrasjon'
+).split()
+
+
+def make_slug(rng):
+    return '-'.join(rng.choice(WORDS) for _ in range(rng.randint(3, 7)))
+
+
+def typo(rng, slug):
+    position = rng.randrange(len(slug))
+    return slug[:position] + slug[position + 1:]
+
+
+def timed(function, queries):
+    start = time.time()
+    for query in queries:
+        function(query)
+    return (time.time() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--items', type=int, default=20000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    items = [(n, make_slug(rng)) for n in range(args.items)]
+    queries = [typo(rng, rng.choice(items)[1]) for _ in range(args.queries)]
+
+    start = time.time()
+    index = SlugIndex()
+    for key, slug in items:
+        index.add(key, slug, slug.replace('-', ' '))
+    print('built index of {} slugs in {:.2f} s'.format(
+        len(index), time.time() - start))
+
+    print('index:       {:8.3f} ms per lookup'.format(
+        timed(index.closest, queries)))
+    print('linear scan: {:8.3f} ms per lookup'.format(
+        timed(lambda query: linear_closest(items, query), queries)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Summarize nginx access logs and django logs.
+
+Reads plain or gzipped log files line by line in a single pass, and keeps
+only aggregates per route and time window, so memory use does not depend
+on the size of the logs.
+
+    python analyze_logs.py /srv/example.com/logs/access-nginx.log* \\
+        /srv/example.com/logs/error-django.log* \\
+        /srv/example.com/logs/debug-django.log* --window 60 --top 20
+"""
+import argparse
+import gzip
+import io
+import json
+import re
+import sys
+from collections import Counter, defaultdict
+from datetime import datetime
+
+NGINX_LINE = re.compile(
+    r'\[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<path>\S+) [^"]*" '
+    r'(?P<status>\d{3}) \S+'
+    r'(?: "[^"]*" "[^"]*"'
+    r' rt=(?P<request_time>[\d.]+) urt=(?P<upstream_time>[-\d., :]+)'
+    r' cache=(?P<cache>\S+))?'
+)
+DJANGO_LINE = re.compile(
+    r'^(?P<time>\d\d:\d\d:\d\d \d{4}-\d\d-\d\d) \[\s*(?P<level>[A-Z]+)\]'
+    r' +(?P<logger>\S+)'
+)
+
+# Url names for the paths in the root urlconf, in the same order.
+ROUTES = [(name, re.compile(pattern)) for name, pattern in [
+    ('static', r'^/(static|media)/'),
+    ('admin', r'^/admin/'),
+    ('autocomplete', r'^/autocomplete'),
+    ('rss', r'^/rss/$'),
+    ('frontpage', r'^/$'),
+    ('search', r'^/search/'),
+    ('pdf_archive', r'^/(pdf|utgivelsesplan)/'),
+    ('article', r'^/[a-z0-9-]+/\d+/[a-z0-9-]*/?$'),
+    ('article_short', r'^/\d+/'),
+    ('storytype', r'^/[a-z0-9-]+/[a-z0-9-]+/$'),
+    ('section', r'^/[a-z0-9-]+/$'),
+    ('not_found', r'^/.+/$'),
+]]
+
+# Upper bounds in milliseconds of the latency histogram buckets.
+BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000,
+           float('inf')]
+CACHE_HITS = ('HIT', 'STALE', 'UPDATING', 'REVALIDATED')
+CACHE_LOOKUPS = CACHE_HITS + ('MISS', 'EXPIRED')
+
+
+def route_name(path):
+    path = path.split('?')[0]
+    for name, pattern in ROUTES:
+        if pattern.match(path):
+            return name
+    return 'other'
+
+
+def open_log(filename):
+    if filename.endswith('.gz'):
+        return io.TextIOWrapper(gzip.open(filename), errors='replace')
+    return io.open(filename, errors='replace')
+
+
+class Timing(object):
+
+    """Request count, total time and a latency histogram."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.upstream = 0.0
+        self.histogram = [0] * len(BUCKETS)
+
+    def add(self, milliseconds, upstream_milliseconds=0.0):
+        self.count += 1
+        self.total += milliseconds
+        self.upstream += upstream_milliseconds
+        for n, bound in enumerate(BUCKETS):
+            if milliseconds <= bound:
+                self.histogram[n] += 1
+                break
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket containing the percentile, or None."""
+        if not self.count:
+            return None
+        target = self.count * fraction
+        seen = 0
+        for bound, count in zip(BUCKETS, self.histogram):
+            seen += count
+            if seen >= target:
+                return bound
+        return BUCKETS[-1]
+
+    def summary(self):
+        return {
+            'requests': self.count,
+            'mean_ms': self.total / self.count if self.count else 0,
+            'mean_upstream_ms': self.upstream / self.count if self.count else 0,
+            'p50_ms': self.percentile(.5),
+            'p95_ms': self.percentile(.95),
+            'p99_ms': self.percentile(.99),
+        }
+
+
+class LogAnalyzer(object):
+
+    def __init__(self, window_minutes=60):
+        self.window = window_minutes * 60
+        self.routes = defaultdict(Timing)
+        self.statuses = Counter()
+        self.cache = Counter()
+        self.windows = defaultdict(lambda: {
+            'timing': Timing(), 'errors': 0, 'cache': Counter()})
+        self.django_levels = Counter()
+        self.django_loggers = Counter()
+        self.django_windows = defaultdict(Counter)
+        self.skipped = 0
+
+    def _window_key(self, timestamp):
+        start = int(timestamp) // self.window * self.window
+        return datetime.utcfromtimestamp(start).strftime('%Y-%m-%d %H:%M')
+
+    def add_file(self, filename):
+        with open_log(filename) as lines:
+            for line in lines:
+                if line.startswith('\t') or not line.strip():
+                    continue  # django log message body or blank line
+                match = DJANGO_LINE.match(line)
+                if match:
+                    self.add_django_line(match)
+                    continue
+                match = NGINX_LINE.search(line)
+                if match:
+                    self.add_nginx_line(match)
+                else:
+                    self.skipped += 1
+
+    def add_nginx_line(self, match):
+        timestamp = datetime.strptime(
+            match.group('time').split()[0], '%d/%b/%Y:%H:%M:%S')
+        window = self.windows[self._window_key(
+            (timestamp - datetime(1970, 1, 1)).total_seconds())]
+        status = int(match.group('status'))
+        self.statuses['{}xx'.format(status // 100)] += 1
+        if status >= 500:
+            window['errors'] += 1
+        if match.group('request_time') is None:
+            return  # log format without timing
+        total = float(match.group('request_time')) * 1000
+        # Upstream time is "-" for static files and can list several
+        # upstreams when a request is retried.
+        upstream = sum(
+            float(value) for value in re.findall(
+                r'[\d.]+', match.group('upstream_time'))) * 1000
+        self.routes[route_name(match.group('path'))].add(total, upstream)
+        window['timing'].add(total, upstream)
+        cache = match.group('cache')
+        self.cache[cache] += 1
+        window['cache'][cache] += 1
+
+    def add_django_line(self, match):
+        timestamp = datetime.strptime(match.group('time'), '%H:%M:%S %Y-%m-%d')
+        level = match.group('level')
+        self.django_levels[level] += 1
+        self.django_loggers[match.group('logger')] += 1
+        self.django_windows[self._window_key(
+            (timestamp - datetime(1970, 1, 1)).total_seconds())][level] += 1
+
+    @staticmethod
+    def hit_ratio(cache):
+        lookups = sum(cache[status] for status in CACHE_LOOKUPS)
+        hits = sum(cache[status] for status in CACHE_HITS)
+        return hits / float(lookups) if lookups else None
+
+    def report(self, top=20):
+        slowest = sorted(
+            self.routes.items(),
+            key=lambda item: item[1].total, reverse=True)[:top]
+        windows = dict(
+            (key, dict(
+                window['timing'].summary(),
+                errors=window['errors'],
+                cache_hit_ratio=self.hit_ratio(window['cache'])))
+            for key, window in self.windows.items())
+        return {
+            'routes': [dict(item.summary(), route=name, total_s=item.total / 1000)
+                       for name, item in slowest],
+            'statuses': dict(self.statuses),
+            'cache': dict(self.cache),
+            'cache_hit_ratio': self.hit_ratio(self.cache),
+            'windows': windows,
+            'django_levels': dict(self.django_levels),
+            'django_loggers': dict(self.django_loggers.most_common(top)),
+            'django_windows': dict(
+                (key, dict(value)) for key, value in self.django_windows.items()),
+            'skipped_lines': self.skipped,
+        }
+
+
+def _number(value, spec):
+    """Format a number, or '-' for missing values."""
+    return '{:>{width}}'.format(
+        '-' if value is None else format(value, spec),
+        width=int(re.match(r'\d+', spec).group()))
+
+
+def print_report(report):
+    print('slowest routes by total time')
+    columns = ['requests', 'total_s', 'mean_ms', 'mean_upstream_ms',
+               'p50_ms', 'p95_ms', 'p99_ms']
+    print('{:<16}'.format('route') + ''.join(
+        '{:>17}'.format(column) for column in columns))
+    for row in report['routes']:
+        print('{:<16}'.format(row['route']) + ''.join(
+            _number(row[column], '17.1f') for column in columns))
+    print('\nstatus codes: {}'.format(
+        ', '.join('{} {}'.format(*item)
+                  for item in sorted(report['statuses'].items()))))
+    if report['cache_hit_ratio'] is not None:
+        print('cache hit ratio: {:.1%}'.format(report['cache_hit_ratio']))
+    print('\n{:<18}{:>10}{:>8}{:>10}{:>8}'.format(
+        'window', 'requests', '5xx', 'p95_ms', 'cache'))
+    for key, window in sorted(report['windows'].items()):
+        print('{:<18}{:>10}{:>8}{}{}'.format(
+            key, window['requests'], window['errors'],
+            _number(window['p95_ms'], '10.0f'),
+            _number(window['cache_hit_ratio'], '8.0%')))
+    if report['django_levels']:
+        print('\ndjango log levels: {}'.format(', '.join(
+            '{} {}'.format(*item)
+            for item in sorted(report['django_levels'].items()))))
+        print('django loggers: {}'.format(', '.join(
+            '{} {}'.format(*item)
+            for item in sorted(report['django_loggers'].items()))))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('--window', type=int, default=60,
+                        help='minutes per time window')
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+
+    analyzer = LogAnalyzer(args.window)
+    for filename in args.files:
+        analyzer.add_file(filename)
+    report = analyzer.report(args.top)
+    if args.json:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    else:
+        print_report(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
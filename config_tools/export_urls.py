@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Write the named urls as json for the frontend, if the urlconfs changed.
+
+The url conf source files are hashed before django is set up, so the
+common case, where no urls.py has changed, exits without loading django.
+
+    python3 config_tools/export_urls.py [output] [--settings=...] [--force]
+"""
+import argparse
+import hashlib
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Set by postactivate when the virtual environment is active.
+SOURCE_FOLDER = os.environ.get(
+    'DJANGO_SOURCE_FOLDER', os.path.join(ROOT, 'django'))
+HASH_FILE = os.path.join(ROOT, '.url-map-hash')
+IGNORED_FOLDERS = {
+    'node_modules', 'bower_components', '.git', 'static', 'management',
+    'templatetags', 'tests'}
+
+
+def urlconf_files(folder):
+    for path, dirs, files in os.walk(folder):
+        dirs[:] = sorted(name for name in dirs if name not in IGNORED_FOLDERS)
+        for filename in sorted(files):
+            if filename.endswith('urls.py'):
+                yield os.path.join(path, filename)
+
+
+def urlconf_hash(output, settings_module):
+    """Hash of the url conf sources, the output file and the settings."""
+    digest = hashlib.sha1(
+        '{}\0{}\0'.format(output, settings_module).encode('utf-8'))
+    for path in urlconf_files(SOURCE_FOLDER):
+        digest.update(os.path.relpath(path, ROOT).encode('utf-8') + b'\0')
+        with open(path, 'rb') as source_file:
+            digest.update(source_file.read())
+    return digest.hexdigest()
+
+
+def _read(path):
+    try:
+        with open(path) as input_file:
+            return input_file.read().strip()
+    except IOError:
+        return None
+
+
+def export(output, settings_module):
+    """Set up django and write the url map. Returns True if it changed."""
+    sys.path.insert(0, SOURCE_FOLDER)
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    import django
+    django.setup()
+    from apps.common.url_map import export_url_map
+    return export_url_map(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument(
+        'output', nargs='?',
+        default=os.path.join(ROOT, 'src', 'javascript', 'api-urls.json'))
+    parser.add_argument('--settings', default='settings.production')
+    parser.add_argument(
+        '--force', action='store_true',
+        help='Export even if no url conf has changed.')
+    args = parser.parse_args(argv)
+    output = os.path.abspath(args.output)
+    current = urlconf_hash(output, args.settings)
+    if not args.force and os.path.exists(output) and (
+            _read(HASH_FILE) == current):
+        print('{} is up to date'.format(os.path.relpath(output, ROOT)))
+        return 0
+    if export(output, args.settings):
+        print('wrote {}'.format(os.path.relpath(output, ROOT)))
+    with open(HASH_FILE, 'w') as hash_file:
+        hash_file.write(current + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,51 +1,93 @@
 # -*- coding: utf-8 -*-
 """ Create postactivate shell script file """
+import json
+import os
 import random
-from requests import request
 from os import environ, path
 
+import requests
+
 PREFIX = 'DJANGO_'  # Environment variable prefix
 SETTINGS_MODULE = 'settings'  # Python module path to settings folder
 WEBSERVER_ROOT = '/srv'  # Location of each django project
+# Services that reply with the public ip of the caller. The debug toolbar is
+# shown for that ip, unless DJANGO_DEBUG_TOOLBAR_INTERNAL_IPS is set.
+IP_ECHO_URLS = ('http://ipecho.net/plain', 'http://canihazip.com/s')
+# Settings exported by postactivate, because shell scripts and django-admin
+# need them. None of them are secret. Everything else, including passwords
+# and the secret key, is only in the environment file.
+SHELL_VARIABLES = (
+    'db_name', 'db_user', 'environment_file', 'settings_module',
+    'site_url', 'source_folder',
+)
 
 
-def make_postactivate_file(site_url, file_path=None):
+def make_postactivate_file(site_url, file_path=None, environment_file=None):
     """ Make a postactivate file and return settings as a dictionary. """
     if file_path is None:
         file_path = '{this_folder}/postactivate.{url}'.format(
             this_folder=path.dirname(__file__),
             url=site_url,
         )
-    contents, settings = make_postactivate_text(site_url)
+    contents, settings = make_postactivate_text(site_url, environment_file)
     with open(file_path, 'w') as f:
         f.write(contents)
 
     return file_path, settings
 
 
+def make_environment_file(site_url, settings, file_path=None):
+    """
+    Write the settings as a json file. Django reads this file once at
+    startup instead of looking up each environment variable. The file has
+    secrets, so only the owner can read it.
+    """
+    if file_path is None:
+        file_path = '{this_folder}/environment.{url}.json'.format(
+            this_folder=path.dirname(__file__),
+            url=site_url,
+        )
+    environment = dict(
+        (_variable_name(key), '{}'.format(value))
+        for key, value in settings.items())
+    descriptor = os.open(
+        file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, 'w') as f:
+        json.dump(environment, f, indent=2, sort_keys=True)
+    return file_path
+
+
+def _variable_name(key):
+    return '{prefix}{key}'.format(
+        prefix=PREFIX, key=key.replace(' ', '_').upper())
+
+
 def _make_random_sequence(length=50):
     """ Generate a random string for secret key or password """
     chars = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
     return ''.join(random.SystemRandom().choice(chars) for n in range(length))
 
 
-def _find_my_ip_address():
-    """ find public ip of local computer """
-    try:
-        return request('get', 'http://ipecho.net/plain').text
-    except:
-        pass
-    try:
-        return request('get', 'http://canihazip.com/s').text
-    except:
-        return '127.0.0.1'
+def _find_my_ip_address(timeout=2):
+    """ find public ip of local computer, or 127.0.0.1 if offline """
+    for url in IP_ECHO_URLS:
+        try:
+            response = requests.get(url, timeout=timeout)
+            response.raise_for_status()
+            return response.text.strip()
+        except requests.RequestException:
+            continue
+    return '127.0.0.1'
 
 
-def make_postactivate_text(site_url):
+def make_postactivate_text(site_url, environment_file=None):
     """
     Generate the text of a shell script to run on virtualenv activation.
     Returns the contents as a tuple containing a string and a dictionary.
     """
+    if environment_file is None:
+        environment_file = '{root}/{url}/bin/environment.json'.format(
+            root=WEBSERVER_ROOT, url=site_url, )
     settings = {}
     for key in environ.keys():
         if key.startswith(PREFIX):
@@ -64,18 +106,19 @@ def make_postactivate_text(site_url):
         'db_user': site_url.replace('.', '_'),
         'db_name': site_url.replace('.', '_'),
         'user': site_url.replace('.', '_'),
-        'debug_toolbar_internal_ips': _find_my_ip_address(),
+        'environment_file': environment_file,
     })
+    if 'debug_toolbar_internal_ips' not in settings:
+        settings['debug_toolbar_internal_ips'] = _find_my_ip_address()
 
     postactivate = (
         '#!/bin/bash\n'
         '# This hook is run after the virtualenv is activated.\n\n'
         '# Environmental variables for django projects.\n\n'
     )
-    for key in sorted(settings):
-        postactivate += 'export {prefix}{key}="{value}"\n'.format(
-            prefix=PREFIX,
-            key=key.replace(' ', '_').upper(),
+    for key in SHELL_VARIABLES:
+        postactivate += 'export {name}="{value}"\n'.format(
+            name=_variable_name(key),
             value=settings[key],
         )
     postactivate += ('\n'
@@ -88,4 +131,10 @@ def make_postactivate_text(site_url):
 
 if (__name__) == '__main__':
     # make a postactivate file for local dev server.
-    make_postactivate_file(site_url='local.{}'.format('example.com'),)
+    site_url = 'local.{}'.format('example.com')
+    environment_file = path.abspath(
+        '{this_folder}/environment.{url}.json'.format(
+            this_folder=path.dirname(__file__), url=site_url, ))
+    postactivate_file, settings = make_postactivate_file(
+        site_url=site_url, environment_file=environment_file)
+    make_environment_file(site_url, settings, environment_file)
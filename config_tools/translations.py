@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extract and compile translations, doing only the work that is needed.
+
+extract: Run xgettext on each source file that has changed since the last
+         run. Results are cached by content hash, so unchanged files are
+         never parsed again. The cached results are combined with msgcat,
+         and existing catalogs are updated with msgmerge only if the
+         combined template changed.
+compile: Run msgfmt on the .po files that are newer than their .mo files.
+
+Both steps run the gettext tools in parallel.
+
+    python3 config_tools/translations.py [extract|compile|all]
+"""
+import argparse
+import hashlib
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Set by postactivate when the virtual environment is active.
+SOURCE_FOLDER = os.environ.get(
+    'DJANGO_SOURCE_FOLDER', os.path.join(ROOT, 'django'))
+LOCALE_FOLDER = os.path.join(SOURCE_FOLDER, 'translation')
+CACHE_FOLDER = os.path.join(ROOT, '.translation-cache')
+IGNORED_FOLDERS = {'node_modules', 'bower_components', '.git', 'static'}
+
+KEYWORDS = [
+    '--keyword=gettext_noop', '--keyword=gettext_lazy',
+    '--keyword=ngettext_lazy:1,2', '--keyword=pgettext:1c,2',
+    '--keyword=npgettext:1c,2,3',
+]
+PYTHON_KEYWORDS = KEYWORDS + [
+    '--keyword=ugettext_noop', '--keyword=ugettext_lazy',
+    '--keyword=ungettext_lazy:1,2', '--keyword=pgettext_lazy:1c,2',
+    '--keyword=npgettext_lazy:1c,2,3',
+]
+# domain: (source folder, file extensions, xgettext arguments)
+DOMAINS = {
+    'django': (
+        SOURCE_FOLDER, ('.py', '.html', '.txt'),
+        ['--language=Python'] + PYTHON_KEYWORDS),
+    'djangojs': (
+        os.path.join(ROOT, 'src'), ('.js', '.jsx'),
+        ['--language=JavaScript'] + KEYWORDS),
+}
+XGETTEXT = [
+    'xgettext', '--output=-', '--from-code=UTF-8', '--no-wrap',
+    '--add-comments=Translators',
+]
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+def source_files(folder, extensions):
+    for path, dirs, files in os.walk(folder):
+        dirs[:] = sorted(name for name in dirs if name not in IGNORED_FOLDERS)
+        for filename in sorted(files):
+            if filename.endswith(extensions):
+                yield os.path.join(path, filename)
+
+
+def _configure_django():
+    from django.conf import settings
+    if not settings.configured:
+        settings.configure()
+
+
+def _templatize(content, path):
+    """Django templates must be turned into python before xgettext."""
+    from django.utils.translation import templatize
+    return templatize(content.decode('utf-8'), path).encode('utf-8')
+
+
+def extract_file(path, content, arguments):
+    """Messages in one source file, as a .pot file fragment."""
+    relative_path = os.path.relpath(path, ROOT)
+    if path.endswith(TEMPLATE_EXTENSIONS):
+        content = _templatize(content, path)
+    suffix = '.py' if path.endswith(TEMPLATE_EXTENSIONS) else (
+        os.path.splitext(path)[1])
+    with tempfile.NamedTemporaryFile(suffix=suffix) as temp_file:
+        temp_file.write(content)
+        temp_file.flush()
+        output = subprocess.check_output(
+            XGETTEXT + arguments + [temp_file.name])
+        output = output.decode('utf-8').replace(
+            temp_file.name, relative_path)
+    return output.replace('charset=CHARSET', 'charset=UTF-8')
+
+
+def _write(path, text):
+    with open(path, 'wb') as output_file:
+        output_file.write(text.encode('utf-8'))
+
+
+def _read(path):
+    try:
+        with open(path, 'rb') as input_file:
+            return input_file.read().decode('utf-8')
+    except IOError:
+        return None
+
+
+class Extractor(object):
+
+    def __init__(self, domain, executor):
+        self.domain = domain
+        self.folder, self.extensions, self.arguments = DOMAINS[domain]
+        self.executor = executor
+        self.cache = os.path.join(CACHE_FOLDER, domain)
+        if domain == 'django':
+            _configure_django()  # once, before templates are parsed in threads
+        if not os.path.isdir(self.cache):
+            os.makedirs(self.cache)
+
+    def _fragment(self, path):
+        """Cached .pot fragment for a file. Returns (path, extracted)"""
+        with open(path, 'rb') as source_file:
+            content = source_file.read()
+        key = hashlib.sha1(
+            os.path.relpath(path, ROOT).encode('utf-8') + b'\0' + content)
+        fragment = os.path.join(self.cache, key.hexdigest() + '.pot')
+        if os.path.exists(fragment):
+            return fragment, False
+        # Write and rename, so an interrupted run leaves no partial files.
+        _write(fragment + '.tmp', extract_file(path, content, self.arguments))
+        os.rename(fragment + '.tmp', fragment)
+        return fragment, True
+
+    def run(self):
+        """Update the catalogs. Returns number of files extracted."""
+        paths = list(source_files(self.folder, self.extensions))
+        results = list(self.executor.map(self._fragment, paths))
+        used = set(fragment for fragment, _ in results)
+        for filename in os.listdir(self.cache):
+            path = os.path.join(self.cache, filename)
+            if filename.endswith('.pot') and path not in used:
+                os.remove(path)  # the source file has changed or is gone
+        fragments = [
+            fragment for fragment, _ in results if os.path.getsize(fragment)]
+        template = self._combine(fragments)
+        if template is not None:
+            self._merge(template)
+        return sum(1 for _, extracted in results if extracted)
+
+    def _combine(self, fragments):
+        """Combine fragments. Returns the template, if it has changed."""
+        template = os.path.join(CACHE_FOLDER, self.domain + '.pot')
+        previous = _read(template)
+        if fragments:
+            list_file = template + '.files'
+            _write(list_file, '\n'.join(fragments))
+            subprocess.check_call([
+                'msgcat', '--use-first', '--no-wrap', '--sort-by-file',
+                '--files-from', list_file, '-o', template])
+        else:
+            _write(template, '')
+        current = _read(template)
+        # The creation date in the header changes on every run.
+        header = re.compile(r'^"POT-Creation-Date: .*$', re.MULTILINE)
+        if previous is not None and (
+                header.sub('', previous) == header.sub('', current)):
+            return None
+        return template
+
+    def _merge(self, template):
+        catalogs = [
+            path for path in (
+                os.path.join(LOCALE_FOLDER, locale, 'LC_MESSAGES',
+                             self.domain + '.po')
+                for locale in sorted(os.listdir(LOCALE_FOLDER)))
+            if os.path.exists(path)]
+
+        def merge(catalog):
+            subprocess.check_call([
+                'msgmerge', '--quiet', '--previous', '--no-wrap', '--update',
+                '--backup=none', catalog, template])
+            subprocess.check_call([
+                'msgattrib', '--no-obsolete', '--no-wrap',
+                '-o', catalog, catalog])
+            return catalog
+
+        for catalog in self.executor.map(merge, catalogs):
+            print('updated {}'.format(os.path.relpath(catalog, ROOT)))
+
+
+def stale_catalogs(folder):
+    for path in source_files(folder, ('.po',)):
+        compiled = path[:-3] + '.mo'
+        if not os.path.exists(compiled) or (
+                os.path.getmtime(compiled) < os.path.getmtime(path)):
+            yield path
+
+
+def compile_catalog(path):
+    subprocess.check_call([
+        'msgfmt', '--check-format', '-o', path[:-3] + '.mo', path])
+    return path
+
+
+def compile_all(executor):
+    catalogs = list(stale_catalogs(LOCALE_FOLDER))
+    for path in executor.map(compile_catalog, catalogs):
+        print('compiled {}'.format(os.path.relpath(path, ROOT)))
+    return len(catalogs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument(
+        'command', nargs='?', default='all',
+        choices=['extract', 'compile', 'all'])
+    parser.add_argument(
+        '--jobs', '-j', type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args(argv)
+    if not os.path.isdir(LOCALE_FOLDER):
+        print('no translations in {}'.format(LOCALE_FOLDER))
+        return 0
+    with ThreadPoolExecutor(args.jobs) as executor:
+        if args.command in ('extract', 'all'):
+            for domain in sorted(DOMAINS):
+                if os.path.isdir(DOMAINS[domain][0]):
+                    extracted = Extractor(domain, executor).run()
+                    print('{}: extracted {} changed files'.format(
+                        domain, extracted))
+        if args.command in ('compile', 'all'):
+            print('compiled {} catalogs'.format(compile_all(executor)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from django.apps import AppConfig, apps
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+
+
+class CommonConfig(AppConfig):
+    name = 'apps.common'
+    label = 'common'
+    verbose_name = 'Common'
+
+    def ready(self):
+        from .publication import touch_publication
+        from .autocomplete import connect_autocomplete_signals
+        from .search import register_search_models
+        from .sitemaps import connect_sitemap_signals
+        for model in installed_models(settings.PUBLICATION_MODELS):
+            post_save.connect(touch_publication, sender=model)
+            post_delete.connect(touch_publication, sender=model)
+        connect_autocomplete_signals()
+        register_search_models()
+        connect_sitemap_signals()
+
+
+def installed_models(model_labels):
+    """Yield models from a list of 'app_label.ModelName' that are installed"""
+    for label in model_labels:
+        try:
+            yield apps.get_model(label)
+        except LookupError:
+            continue
@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+Prefix indexes for autocomplete.
+
+Every word of an item's label is stored in a lexicographically sorted set
+as ``word \\x00 label \\x00 pk``, so each keystroke is answered with a range
+lookup instead of an ``icontains`` database query. Indexes live in redis,
+so all worker processes share them, and are updated when models are saved.
+Only published objects are indexed, and only staff can search.
+"""
+import bisect
+import json
+import re
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse
+
+from .publication import published_objects
+
+SEPARATOR = '\x00'
+MAX_WORDS = 8  # words per label to index
+MAX_LABEL_LENGTH = 100
+
+
+def words(text):
+    return re.findall(r'\w+', text.lower(), flags=re.UNICODE)
+
+
+def clean_label(label):
+    return ' '.join(label.split())[:MAX_LABEL_LENGTH]
+
+
+class PrefixIndex(object):
+
+    """
+    Prefix index stored in python data structures. Not shared.
+
+    When the index holds ``max_items`` items, the item with the lowest
+    primary key is evicted to make room for a new one, so recent content
+    can always be found.
+    """
+
+    def __init__(self, name, max_items=100000):
+        self.name = name
+        self.max_items = max_items
+        self._members = []
+        self._labels = {}
+
+    # storage backend
+    def _add_members(self, members):
+        for member in members:
+            bisect.insort(self._members, member)
+
+    def _remove_members(self, members):
+        for member in members:
+            position = bisect.bisect_left(self._members, member)
+            if self._members[position:position + 1] == [member]:
+                del self._members[position]
+
+    def _members_from(self, start, count, inclusive=True):
+        if inclusive:
+            position = bisect.bisect_left(self._members, start)
+        else:
+            position = bisect.bisect_right(self._members, start)
+        return self._members[position:position + count]
+
+    def _get_label(self, pk):
+        return self._labels.get(pk)
+
+    def _set_label(self, pk, label):
+        if label is None:
+            self._labels.pop(pk, None)
+        else:
+            self._labels[pk] = label
+
+    def _lowest_pk(self):
+        return min(self._labels)
+
+    def __len__(self):
+        return len(self._labels)
+
+    def clear(self):
+        self._members, self._labels = [], {}
+
+    # public api
+    def _members_for(self, pk, label):
+        return set(
+            SEPARATOR.join([word, label, str(pk)])
+            for word in words(label)[:MAX_WORDS])
+
+    def add(self, pk, label):
+        label = clean_label(label)
+        old_label = self._get_label(pk)
+        if old_label == label:
+            return
+        if old_label is None and len(self) >= self.max_items:
+            lowest = self._lowest_pk()
+            if pk < lowest:
+                return  # older than everything in the index
+            self.remove(lowest)
+        self.remove(pk)
+        self._set_label(pk, label)
+        self._add_members(self._members_for(pk, label))
+
+    def remove(self, pk):
+        label = self._get_label(pk)
+        if label is not None:
+            self._remove_members(self._members_for(pk, label))
+            self._set_label(pk, None)
+
+    def search(self, query, limit=10):
+        """List of (pk, label) where label has words starting with query."""
+        terms = words(query)
+        if not terms:
+            return []
+        # Look up the longest term, since it has the fewest matches. The
+        # other terms are checked against the label, so the range is read
+        # in batches until there are enough results or it ends.
+        terms.sort(key=len, reverse=True)
+        prefix = terms[0]
+        batch_size = limit * 5
+        results, seen = [], set()
+        members = self._members_from(prefix, batch_size)
+        while members:
+            for member in members:
+                word, label, pk = member.split(SEPARATOR)
+                if not word.startswith(prefix):
+                    return results
+                if pk in seen:
+                    continue
+                label_words = words(label)
+                if all(any(w.startswith(term) for w in label_words)
+                       for term in terms[1:]):
+                    seen.add(pk)
+                    results.append((int(pk), label))
+                    if len(results) == limit:
+                        return results
+            if len(members) < batch_size:
+                break
+            members = self._members_from(
+                members[-1], batch_size, inclusive=False)
+        return results
+
+
+# Shared by the add and remove scripts. KEYS are the members sorted set,
+# the labels hash, a hash of pk -> members joined by newlines, and a sorted
+# set of pks used to find the oldest item.
+_REMOVE_LUA = """
+local function remove(pk)
+    local members = redis.call('HGET', KEYS[3], pk)
+    if not members then
+        return
+    end
+    for member in string.gmatch(members, '[^\\n]+') do
+        redis.call('ZREM', KEYS[1], member)
+    end
+    redis.call('HDEL', KEYS[2], pk)
+    redis.call('HDEL', KEYS[3], pk)
+    redis.call('ZREM', KEYS[4], pk)
+end
+"""
+
+# ARGV is pk, label, max items and the members for the new label.
+ADD_SCRIPT = _REMOVE_LUA + """
+local pk, label, max_items = ARGV[1], ARGV[2], tonumber(ARGV[3])
+if redis.call('HGET', KEYS[2], pk) == label then
+    return 0
+end
+if redis.call('HEXISTS', KEYS[2], pk) == 0
+        and redis.call('ZCARD', KEYS[4]) >= max_items then
+    local lowest = redis.call('ZRANGE', KEYS[4], 0, 0, 'WITHSCORES')
+    if tonumber(pk) < tonumber(lowest[2]) then
+        return 0
+    end
+    remove(lowest[1])
+end
+remove(pk)
+redis.call('HSET', KEYS[2], pk, label)
+redis.call('HSET', KEYS[3], pk, table.concat(ARGV, '\\n', 4))
+redis.call('ZADD', KEYS[4], pk, pk)
+for i = 4, #ARGV do
+    redis.call('ZADD', KEYS[1], 0, ARGV[i])
+end
+return 1
+"""
+
+REMOVE_SCRIPT = _REMOVE_LUA + "remove(ARGV[1])"
+
+
+class RedisPrefixIndex(PrefixIndex):
+
+    """
+    Prefix index stored in redis sorted sets and hashes.
+
+    Adding and removing items are lua scripts, so each change is a single
+    atomic round trip to redis.
+    """
+
+    def __init__(self, name, max_items=100000, connection=None):
+        super(RedisPrefixIndex, self).__init__(name, max_items)
+        self.redis = connection or redis_connection()
+        prefix = 'autocomplete:{}:'.format(name)
+        self.members_key = prefix + 'members'
+        self.labels_key = prefix + 'labels'
+        self.keys = [
+            self.members_key, self.labels_key, prefix + 'entries',
+            prefix + 'pks']
+        self._add_script = self.redis.register_script(ADD_SCRIPT)
+        self._remove_script = self.redis.register_script(REMOVE_SCRIPT)
+
+    def add(self, pk, label):
+        label = clean_label(label)
+        members = sorted(self._members_for(pk, label))
+        self._add_script(
+            keys=self.keys, args=[pk, label, self.max_items] + members)
+
+    def remove(self, pk):
+        self._remove_script(keys=self.keys, args=[pk])
+
+    def _members_from(self, start, count, inclusive=True):
+        members = self.redis.zrangebylex(
+            self.members_key, ('[' if inclusive else '(') + start, '+',
+            start=0, num=count)
+        return [member.decode('utf8') for member in members]
+
+    def _get_label(self, pk):
+        label = self.redis.hget(self.labels_key, pk)
+        return None if label is None else label.decode('utf8')
+
+    def __len__(self):
+        return self.redis.hlen(self.labels_key)
+
+    def clear(self):
+        self.redis.delete(*self.keys)
+
+
+_connection_pool = []
+_indexes = {}  # created once per process
+
+
+def redis_connection():
+    import redis
+    if not _connection_pool:
+        _connection_pool.append(
+            redis.ConnectionPool(db=settings.AUTOCOMPLETE_REDIS_DB))
+    return redis.StrictRedis(connection_pool=_connection_pool[0])
+
+
+def autocomplete_indexes():
+    """Dictionary of index name -> (model label, label field, index)"""
+    if not _indexes:
+        _indexes.update(
+            (name, (model_label, field, RedisPrefixIndex(name)))
+            for name, (model_label, field)
+            in settings.AUTOCOMPLETE_INDEXES.items())
+    return _indexes
+
+
+def rebuild_autocomplete_index(name):
+    """
+    Fill an index from the database. Returns the number of items.
+    Raises KeyError for unknown index names and LookupError if the model is
+    not installed.
+    """
+    from django.apps import apps
+    model_label, field, index = autocomplete_indexes()[name]
+    model = apps.get_model(model_label)
+    index.clear()
+    rows = published_objects(model).values_list('pk', field)
+    for pk, label in rows.iterator():
+        index.add(pk, '{}'.format(label))
+    return len(index)
+
+
+def update_autocomplete_item(name, pk):
+    """
+    Update one item from its current database row. Objects that are not
+    published or no longer exist are removed.
+    """
+    from django.apps import apps
+    model_label, field, index = autocomplete_indexes()[name]
+    model = apps.get_model(model_label)
+    label = published_objects(model).filter(pk=pk).values_list(
+        field, flat=True).first()
+    if label is None:
+        index.remove(pk)
+    else:
+        index.add(pk, '{}'.format(label))
+
+
+def connect_autocomplete_signals():
+    """
+    Keep indexes updated when models are saved or deleted. The task is
+    queued when the transaction is committed, and reads the current row.
+    """
+    from django.apps import apps
+    from django.db.models.signals import post_delete, post_save
+    for name, (model_label, field) in settings.AUTOCOMPLETE_INDEXES.items():
+        try:
+            model = apps.get_model(model_label)
+        except LookupError:
+            continue
+
+        def changed(instance, name=name, **kwargs):
+            from .celery import delay_on_commit
+            from .tasks import update_autocomplete
+            delay_on_commit(update_autocomplete, name, instance.pk)
+
+        post_save.connect(changed, sender=model, weak=False)
+        post_delete.connect(changed, sender=model, weak=False)
+
+
+@staff_member_required
+def autocomplete_index_view(request, name):
+    """Json list of items matching the query parameter `q`."""
+    try:
+        index = autocomplete_indexes()[name][2]
+    except KeyError:
+        raise Http404('No autocomplete index named {}'.format(name))
+    results = index.search(request.GET.get('q', ''))
+    data = [{'id': pk, 'label': label} for pk, label in results]
+    return HttpResponse(json.dumps(data), content_type='application/json')
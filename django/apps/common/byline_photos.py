@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Index of byline photos in BYLINE_PHOTO_DIR.
+
+Matching contributors to byline photos used to mean listing the photo
+folder and comparing names on every lookup. The index stores file names,
+normalized name tokens, mtime and image dimensions, and is updated
+incrementally by the ``index_byline_photos`` management command.
+"""
+import json
+import logging
+import os
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.conf import settings
+
+logger = logging.getLogger('bylines')
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# Words in file names that are not part of the person's name.
+IGNORED_TOKENS = {'byline', 'bylinebilde', 'foto', 'bilde', 'ny', 'crop'}
+
+
+def name_tokens(name):
+    """Lowercase ascii words from a name or file name, without digits."""
+    name = name.lower().replace(u'æ', 'ae').replace(u'ø', 'o')
+    name = unicodedata.normalize('NFKD', name)
+    name = name.encode('ascii', 'ignore').decode('ascii')
+    return [token for token in re.findall(r'[a-z]+', name)
+            if token not in IGNORED_TOKENS]
+
+
+def _image_size(path):
+    from PIL import Image
+    try:
+        return Image.open(path).size
+    except (IOError, OSError) as err:
+        logger.warning('could not read image %s: %s', path, err)
+        return 0, 0
+
+
+class BylinePhotoIndex(object):
+
+    """Persistent index of image files in the byline photo folder."""
+
+    def __init__(self, folder=None, index_file=None):
+        self.folder = folder or settings.BYLINE_PHOTO_DIR
+        self.index_file = index_file or settings.BYLINE_PHOTO_INDEX
+        self.photos = {}
+        self.tokens = defaultdict(set)
+
+    def load(self):
+        try:
+            with open(self.index_file) as index_fh:
+                data = json.load(index_fh)
+        except (IOError, ValueError):
+            data = {}
+        self.photos = data.get('photos', {})
+        self._build_token_index()
+        return self
+
+    def save(self):
+        temp_file = self.index_file + '.tmp'
+        with open(temp_file, 'w') as index_fh:
+            json.dump({'photos': self.photos}, index_fh)
+        os.rename(temp_file, self.index_file)
+
+    def _build_token_index(self):
+        self.tokens = defaultdict(set)
+        for filename, photo in self.photos.items():
+            for token in photo['tokens']:
+                self.tokens[token].add(filename)
+
+    def update(self, force=False):
+        """
+        Index new and changed files and forget deleted ones.
+        Returns the number of files indexed, or None if nothing changed.
+
+        Every file is checked, since a photo that is replaced in place does
+        not change the folder's mtime. Only changed images are opened.
+        """
+        found = set()
+        indexed = 0
+        for filename in os.listdir(self.folder):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            found.add(filename)
+            path = os.path.join(self.folder, filename)
+            mtime = os.path.getmtime(path)
+            if not force and self.photos.get(filename, {}).get('mtime') == mtime:
+                continue
+            width, height = _image_size(path)
+            self.photos[filename] = {
+                'mtime': mtime,
+                'tokens': name_tokens(os.path.splitext(filename)[0]),
+                'width': width,
+                'height': height,
+            }
+            indexed += 1
+        removed = set(self.photos) - found
+        for filename in removed:
+            del self.photos[filename]
+        if not indexed and not removed:
+            return None
+        self._build_token_index()
+        return indexed
+
+    def match(self, name):
+        """
+        Full path of the best byline photo for a name, or None.
+
+        The photo's file name must contain the first name and the surname.
+        Middle names are optional, so 'Ola Nordmann Hansen' matches
+        ola-hansen.jpg, but 'Ola Hansen' does not match ola-nordmann.jpg.
+        """
+        name_list = name_tokens(name)
+        if not name_list:
+            return None
+        tokens = set(name_list)
+        required = {name_list[0], name_list[-1]}
+        candidates = set.intersection(
+            *(self.tokens.get(token, set()) for token in required))
+
+        def score(filename):
+            photo = self.photos[filename]
+            photo_tokens = set(photo['tokens'])
+            shared = len(tokens & photo_tokens)
+            # Prefer files with no extra names, then larger images.
+            return (
+                shared / float(len(tokens)),
+                -len(photo_tokens - tokens),
+                photo['width'] * photo['height'],
+            )
+
+        if not candidates:
+            logger.info('no byline photo for %s', name)
+            return None
+        best = max(candidates, key=score)
+        logger.info('byline photo for %s: %s', name, best)
+        return os.path.join(self.folder, best)
+
+
+_loaded_index = {'mtime': None, 'index': None}
+
+
+def byline_photo_index():
+    """The byline photo index. Only read again when the file changes."""
+    try:
+        mtime = os.path.getmtime(settings.BYLINE_PHOTO_INDEX)
+    except OSError:
+        mtime = None
+    if _loaded_index['index'] is None or mtime != _loaded_index['mtime']:
+        _loaded_index['index'] = BylinePhotoIndex().load()
+        _loaded_index['mtime'] = mtime
+    return _loaded_index['index']
+
+
+def find_byline_photo(name):
+    """Find byline photo for a contributor name, without listing folders."""
+    return byline_photo_index().match(name)
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Celery application for background jobs.
+
+Heavy work runs in worker processes, so request handlers and deploys only
+put a message on a queue. The broker is the local redis server. Each queue
+has its own supervisor program with its own concurrency, so slow media jobs
+can not hold up quick ones.
+
+Start a worker for one queue with:
+
+    celery worker -A apps.common -Q media --concurrency=1
+"""
+from __future__ import absolute_import
+
+import calendar
+import logging
+import random
+import time
+
+from celery import Celery, Task
+from celery.utils import uuid
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import task_metrics
+
+logger = logging.getLogger('celery')
+
+app = Celery('prodsys')
+app.config_from_object('django.conf:settings')
+app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
+
+
+def on_commit(func, using=None):
+    """
+    Call func when the current transaction is committed, or right away
+    outside a transaction. Django 1.8 needs a database backend from
+    django-transaction-hooks for this, otherwise func is called right away.
+    """
+    if hasattr(transaction, 'on_commit'):
+        transaction.on_commit(func, using)
+        return
+    connection = transaction.get_connection(using)
+    if hasattr(connection, 'on_commit'):
+        connection.on_commit(func)
+    else:
+        func()
+
+
+def delay_on_commit(task, *args, **kwargs):
+    """
+    Queue a task when the current transaction is committed, so the worker
+    reads the committed rows. If the broker is down, the error is logged
+    instead of failing the request that saved the object.
+    """
+    def send():
+        try:
+            task.delay(*args, **kwargs)
+        except Exception:
+            logger.exception('could not queue %s', task.name)
+    on_commit(send)
+
+
+def _due(options):
+    """Unix time a task is due, from the countdown or eta option."""
+    eta = options.get('eta')
+    if eta is not None:
+        if timezone.is_aware(eta):
+            return calendar.timegm(eta.utctimetuple())
+        return time.mktime(eta.timetuple())
+    return time.time() + (options.get('countdown') or 0)
+
+
+class QueueTask(Task):
+
+    """
+    Base task that retries on temporary errors with exponential backoff and
+    records queue latency and run time for each queue.
+    """
+
+    abstract = True
+    queue = 'default'
+    # Exceptions that make the task try again later.
+    retry_on = (IOError, OSError)
+    max_retries = 5
+    backoff = 10         # seconds before the first retry
+    backoff_max = 1800   # longest wait between retries
+
+    def apply_async(self, args=None, kwargs=None, task_id=None, **options):
+        task_id = task_id or uuid()
+        if not self.app.conf.CELERY_ALWAYS_EAGER:
+            task_metrics.enqueued(task_id, _due(options))
+        return super(QueueTask, self).apply_async(
+            args, kwargs, task_id=task_id, **options)
+
+    def __call__(self, *args, **kwargs):
+        if self.request.called_directly or self.request.is_eager:
+            return super(QueueTask, self).__call__(*args, **kwargs)
+        queue = self.request.delivery_info.get('routing_key') or self.queue
+        task_metrics.started(queue, self.request.id)
+        start = time.time()
+        status = 'failed'
+        try:
+            result = super(QueueTask, self).__call__(*args, **kwargs)
+            status = 'done'
+            return result
+        except self.retry_on as exc:
+            if self.request.retries >= self.max_retries:
+                raise
+            status = 'retried'
+            countdown = min(
+                self.backoff_max, self.backoff * 2 ** self.request.retries)
+            # Jitter keeps retries of many failed tasks from arriving at once.
+            countdown = countdown * random.uniform(0.8, 1.2)
+            logger.warning('%s failed, retry in %d seconds: %s',
+                           self.name, countdown, exc)
+            raise self.retry(exc=exc, countdown=countdown)
+        finally:
+            task_metrics.finished(queue, time.time() - start, status)
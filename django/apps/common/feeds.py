@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+""" Caching and conditional GET for syndication feeds. """
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+from .publication import publication_datetime, publication_stamp
+
+FEED_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def _feed_etag(request, *args, **kwargs):
+    return 'feed-{:x}'.format(int(publication_stamp() * 1000))
+
+
+def _feed_last_modified(request, *args, **kwargs):
+    return publication_datetime()
+
+
+def cached_feed(feed_view, timeout=FEED_CACHE_TIMEOUT):
+    """
+    Wrap a feed view so the feed is rendered once per publication change.
+
+    Feed readers that send If-None-Match or If-Modified-Since get a 304
+    response without any database queries.
+    """
+    @wraps(feed_view)
+    def view(request, *args, **kwargs):
+        cache_key = 'feed:{path}:{stamp}'.format(
+            path=hashlib.md5(request.get_full_path().encode('utf8')).hexdigest(),
+            stamp=publication_stamp(),
+        )
+        response = cache.get(cache_key)
+        if response is None:
+            response = feed_view(request, *args, **kwargs)
+            cache.set(cache_key, response, timeout)
+        return response
+
+    return condition(
+        etag_func=_feed_etag,
+        last_modified_func=_feed_last_modified,
+    )(view)
@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+"""
+Fuzzy lookup of content by slug, for urls that don't match anything.
+
+A trigram index over slugs and titles narrows the search down to a few
+candidates, which are compared by edit distance to catch typos and truncated
+urls, and by trigram similarity when no slug is close enough. The index is
+kept in memory and updated incrementally.
+"""
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+
+try:
+    from Levenshtein import distance as edit_distance
+except ImportError:  # pragma: no cover
+    def edit_distance(first, second):
+        """Levenshtein distance in pure python."""
+        previous = list(range(len(second) + 1))
+        for i, char_a in enumerate(first, 1):
+            current = [i]
+            for j, char_b in enumerate(second, 1):
+                current.append(min(
+                    previous[j] + 1,
+                    current[j - 1] + 1,
+                    previous[j - 1] + (char_a != char_b),
+                ))
+            previous = current
+        return previous[-1]
+
+
+def normalize_title(text):
+    """Lowercase words joined by hyphens."""
+    return '-'.join(re.findall(r'\w+', text.lower(), flags=re.UNICODE))
+
+
+def normalize(text):
+    """Lowercase words joined by hyphens. The last segment of a path."""
+    return normalize_title(text.strip('/').rsplit('/', 1)[-1])
+
+
+def trigrams(text):
+    padded = '  {} '.format(text.replace('-', ' '))
+    return set(padded[n:n + 3] for n in range(len(padded) - 2))
+
+
+def _discard(mapping, name, key):
+    """Remove a key from a set in a mapping, and the set if it is empty."""
+    keys = mapping.get(name)
+    if keys is not None:
+        keys.discard(key)
+        if not keys:
+            del mapping[name]
+
+
+class SlugIndex(object):
+
+    """Find the closest item for a slug, by slug or title similarity."""
+
+    def __init__(self, max_distance=3, min_score=0.3, candidates=20):
+        self.max_distance = max_distance
+        self.min_score = min_score
+        self.candidates = candidates
+        self.slugs = defaultdict(set)  # slug -> keys
+        self.grams = defaultdict(set)  # trigram -> keys
+        self.items = {}  # key -> (slug, trigrams)
+        self.built = time.time()
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, key, slug, title=''):
+        self.remove(key)
+        slug = normalize(slug)
+        grams = trigrams(slug) | trigrams(normalize_title(title))
+        self.items[key] = (slug, grams)
+        self.slugs[slug].add(key)
+        for gram in grams:
+            self.grams[gram].add(key)
+
+    def remove(self, key):
+        if key not in self.items:
+            return
+        slug, grams = self.items.pop(key)
+        _discard(self.slugs, slug, key)
+        for gram in grams:
+            _discard(self.grams, gram, key)
+
+    def _common_grams(self, query):
+        """Trigrams found in more than a tenth of all items."""
+        # .get(), since looking up a missing key adds it to a defaultdict.
+        limit = max(len(self.items) // 10, 50)
+        return set(
+            gram for gram in query if len(self.grams.get(gram, ())) > limit)
+
+    def closest(self, slug):
+        """Key of the item that best matches the slug, or None."""
+        slug = normalize(slug)
+        if not slug:
+            return None
+        if self.slugs.get(slug):
+            return min(self.slugs[slug])
+
+        query = trigrams(slug)
+        # Common trigrams are expensive to count and say little about
+        # similarity, so only use them if there is nothing else.
+        rare = (query - self._common_grams(query)) or query
+        shared = Counter()
+        for gram in rare:
+            shared.update(self.grams.get(gram, ()))
+        candidates = [key for key, _ in shared.most_common(self.candidates)]
+
+        # Allow fewer typos in short slugs.
+        max_distance = min(self.max_distance, len(slug) // 4)
+        best_key, best_distance = None, max_distance + 1
+        for key in candidates:
+            distance = edit_distance(slug, self.items[key][0])
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        if best_key is not None:
+            return best_key
+
+        best_score = self.min_score
+        for key in candidates:
+            grams = self.items[key][1]
+            common = len(query & grams)
+            score = common / float(len(query) + len(grams) - common)
+            if score > best_score:
+                best_key, best_score = key, score
+        return best_key
+
+
+def linear_closest(items, slug):
+    """Reference implementation. Scan all (key, slug) pairs."""
+    slug = normalize(slug)
+    best = min(items, key=lambda item: edit_distance(slug, item[1]))
+    return best[0]
+
+
+def _apply(index, key, values):
+    if values is None:
+        index.remove(key)
+    else:
+        slug, title = values
+        index.add(key, slug or '', title or '')
+
+
+class ModelSlugIndex(object):
+
+    """
+    A SlugIndex for a django model, kept up to date with model signals.
+
+    Each process has its own copy. Changes saved by other processes are
+    picked up when the index is rebuilt after ``max_age`` seconds. Only the
+    first lookup waits for the index to be built. Later rebuilds run in a
+    background thread, and the old index is used until they are done.
+    Changes saved during a rebuild are applied to the new index as well.
+    """
+
+    def __init__(self, queryset, slug_field='slug', title_field='title',
+                 max_age=15 * 60):
+        self.queryset = queryset
+        self.slug_field = slug_field
+        self.title_field = title_field
+        self.max_age = max_age
+        self.index = None
+        self._rebuilding = threading.Lock()
+        self._lock = threading.Lock()  # guards index and _pending
+        self._pending = None  # changes saved during a rebuild
+        self._connect()
+
+    def _connect(self):
+        from django.db.models.signals import post_delete, post_save
+        model = self.queryset.model
+        post_save.connect(self._saved, sender=model, weak=False)
+        post_delete.connect(self._deleted, sender=model, weak=False)
+
+    def _change(self, key, values=None):
+        """Add or update an item with (slug, title), or remove it."""
+        with self._lock:
+            index = self.index
+            if self._pending is not None:
+                self._pending.append((key, values))
+        if index is not None:
+            _apply(index, key, values)
+
+    def _saved(self, instance, **kwargs):
+        if self.index is None:
+            return
+        if self.queryset.filter(pk=instance.pk).exists():
+            self._change(instance.pk, (
+                getattr(instance, self.slug_field),
+                getattr(instance, self.title_field)))
+        else:
+            self._change(instance.pk)
+
+    def _deleted(self, instance, **kwargs):
+        if self.index is not None:
+            self._change(instance.pk)
+
+    def _build_index(self):
+        index = SlugIndex()
+        rows = self.queryset.values_list(
+            'pk', self.slug_field, self.title_field)
+        for pk, slug, title in rows.iterator():
+            index.add(pk, slug or '', title or '')
+        return index
+
+    def build(self):
+        index = self._build_index()
+        self.index = index
+        return index
+
+    def _rebuild(self):
+        from django.db import connection
+        with self._lock:
+            self._pending = []
+        try:
+            index = self._build_index()
+            with self._lock:
+                # The rows read by the rebuild may be older than these.
+                for key, values in self._pending:
+                    _apply(index, key, values)
+                self.index = index
+        finally:
+            with self._lock:
+                self._pending = None
+            connection.close()  # each thread has its own connection
+            self._rebuilding.release()
+
+    def refresh(self):
+        """Start a background rebuild, unless one is already running."""
+        if self._rebuilding.acquire(False):
+            thread = threading.Thread(target=self._rebuild)
+            thread.daemon = True
+            thread.start()
+
+    def closest(self, slug):
+        """The model instance that best matches the slug, or None."""
+        index = self.index
+        if index is None:
+            index = self.build()
+        elif time.time() - index.built > self.max_age:
+            self.refresh()
+        key = index.closest(slug)
+        if key is None:
+            return None
+        return self.queryset.filter(pk=key).first()
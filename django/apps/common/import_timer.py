@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Measure how long each module takes to import during a cold worker boot.
+
+Run as a script in a fresh interpreter, since modules that are already in
+``sys.modules`` cost nothing to import again:
+
+    python -m apps.common.import_timer --settings=settings.production
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+
+try:
+    import builtins
+except ImportError:  # python 2
+    import __builtin__ as builtins
+
+try:
+    # ``import_module`` calls ``_bootstrap._gcd_import`` on python 3, which
+    # does not go through ``__import__``. Patching it also catches modules
+    # that did ``from importlib import import_module`` before timing began.
+    from importlib import _bootstrap
+except ImportError:  # python 2, where import_module calls __import__
+    _bootstrap = None
+
+# time.perf_counter is not in python 2.
+clock = getattr(time, 'perf_counter', time.time)
+
+
+class ImportTimer(object):
+
+    """Context manager that records time spent on first-time imports."""
+
+    def __init__(self):
+        self.timings = {}  # module name -> [inclusive seconds, self seconds]
+        self._stack = []
+
+    def __enter__(self):
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._wrap(self._original_import, 3)
+        if _bootstrap is not None:
+            self._original_gcd_import = _bootstrap._gcd_import
+            _bootstrap._gcd_import = self._wrap(self._original_gcd_import, 1)
+        return self
+
+    def __exit__(self, *exc_info):
+        builtins.__import__ = self._original_import
+        if _bootstrap is not None:
+            _bootstrap._gcd_import = self._original_gcd_import
+
+    def _wrap(self, import_function, level_index):
+        """Time an import function that takes ``level`` at this position."""
+        def timed_import(name, *args, **kwargs):
+            level = kwargs.get(
+                'level', args[level_index] if len(args) > level_index else 0)
+            if level or name.startswith('.') or name in sys.modules:
+                # relative or cached imports are not interesting.
+                return import_function(name, *args, **kwargs)
+            self._stack.append(0.0)
+            start = clock()
+            try:
+                return import_function(name, *args, **kwargs)
+            finally:
+                elapsed = clock() - start
+                children = self._stack.pop()
+                if self._stack:
+                    self._stack[-1] += elapsed
+                inclusive, own = self.timings.get(name, (0.0, 0.0))
+                self.timings[name] = [
+                    inclusive + elapsed, own + elapsed - children]
+        return timed_import
+
+    def report(self, limit=30):
+        """List of (module, inclusive ms, self ms), slowest first."""
+        rows = sorted(
+            self.timings.items(), key=lambda item: item[1][0], reverse=True)
+        return [
+            (name, inclusive * 1000, own * 1000)
+            for name, (inclusive, own) in rows[:limit]
+        ]
+
+    @property
+    def total(self):
+        """Total seconds spent in top level imports."""
+        return sum(own for inclusive, own in self.timings.values())
+
+
+def boot_worker(settings_module):
+    """Import everything a gunicorn worker imports before its first request."""
+    os.environ['DJANGO_SETTINGS_MODULE'] = settings_module
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    get_wsgi_application()
+    importlib.import_module(settings.ROOT_URLCONF)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--settings', default=os.environ.get(
+        'DJANGO_SETTINGS_MODULE', 'settings.production'))
+    parser.add_argument('--limit', type=int, default=30)
+    parser.add_argument('--budget', type=float, default=0,
+                        help='fail if total import time exceeds this (ms)')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args(argv)
+
+    with ImportTimer() as timer:
+        boot_worker(args.settings)
+
+    total = timer.total * 1000
+    rows = timer.report(args.limit)
+    if args.json:
+        print(json.dumps({'total': total, 'modules': rows}, indent=2))
+    else:
+        print('{:<50} {:>10} {:>10}'.format('module', 'cumul ms', 'self ms'))
+        for name, inclusive, own in rows:
+            print('{:<50} {:>10.1f} {:>10.1f}'.format(name, inclusive, own))
+        print('total import time: {:.1f} ms'.format(total))
+    if args.budget and total > args.budget:
+        print('import time budget of {:.0f} ms exceeded'.format(args.budget))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Incremental sync from the legacy prodsys database.
+
+Each table in LEGACY_SYNC_TABLES is read in order of its last modified
+column, starting after the high-water mark saved by the previous run. Rows
+are streamed from a server side cursor in batches, transformed one by one
+and written with a single multi-row upsert per batch. The high-water mark is
+saved after each batch is committed, so an interrupted sync continues where
+it stopped, and batches written twice are harmless. Rows without a last
+modified time can not be placed after a mark, so they are not synced.
+"""
+import datetime
+import json
+import logging
+import os
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.db import connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+def _import_function(dotted_path):
+    module, name = dotted_path.rsplit('.', 1)
+    return getattr(import_module(module), name)
+
+
+def _to_json(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat(' ')
+    return value
+
+
+class SyncState(object):
+
+    """High-water marks for synced tables, stored as json."""
+
+    def __init__(self, filename=None):
+        self.filename = filename or settings.LEGACY_SYNC_STATE_FILE
+        self.tables = {}
+
+    def load(self):
+        try:
+            with open(self.filename) as state_file:
+                self.tables = json.load(state_file)
+        except (IOError, ValueError):
+            self.tables = {}
+        return self
+
+    def save(self):
+        temp_file = self.filename + '.tmp'
+        with open(temp_file, 'w') as state_file:
+            json.dump(self.tables, state_file, indent=2, sort_keys=True)
+        os.rename(temp_file, self.filename)
+
+
+def server_side_cursor(connection):
+    """
+    Cursor that fetches rows from the server as they are needed. The MySQL
+    driver reads the whole result into memory unless asked not to.
+    """
+    if connection.vendor == 'mysql':
+        from MySQLdb.cursors import SSCursor
+        connection.ensure_connection()
+        return connection.connection.cursor(SSCursor)
+    # Other backends used here, such as sqlite in tests, already stream.
+    return connection.cursor()
+
+
+class TableSync(object):
+
+    """Sync one legacy table to a table in the default database."""
+
+    def __init__(self, name, source_table, target_table, key, modified,
+                 columns, transform=None, source='prodsys', target='default',
+                 batch_size=1000):
+        self.name = name
+        self.source_table = source_table
+        self.target_table = target_table
+        self.key = key
+        self.modified = modified
+        self.columns = columns  # source column -> target column
+        self.transform = transform
+        self.source = connections[source]
+        self.target = connections[target]
+        self.batch_size = batch_size
+
+    @classmethod
+    def from_settings(cls, name, **kwargs):
+        table = dict(settings.LEGACY_SYNC_TABLES[name])
+        if table.get('transform'):
+            table['transform'] = _import_function(table['transform'])
+        table.update(kwargs)
+        return cls(name, **table)
+
+    def _select(self, mark, limit):
+        quote = self.source.ops.quote_name
+        source_columns = list(self.columns)
+        for column in (self.key, self.modified):
+            if column not in source_columns:
+                source_columns.append(column)
+        sql = 'SELECT {} FROM {}'.format(
+            ', '.join(quote(column) for column in source_columns),
+            quote(self.source_table))
+        sql += ' WHERE {modified} IS NOT NULL'
+        params = []
+        if mark:
+            # Rows changed in the same second as the mark are told apart by
+            # their primary key.
+            sql += (' AND ({modified} > %s OR '
+                    '({modified} = %s AND {key} > %s))')
+            params = [mark['modified'], mark['modified'], mark['key']]
+        sql += ' ORDER BY {modified}, {key}'
+        if limit:
+            sql += ' LIMIT {:d}'.format(limit)
+        sql = sql.format(modified=quote(self.modified), key=quote(self.key))
+        return source_columns, sql, params
+
+    def source_batches(self, mark=None, limit=None):
+        """Yield lists of rows as dictionaries, in order of modification."""
+        source_columns, sql, params = self._select(mark, limit)
+        cursor = server_side_cursor(self.source)
+        try:
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                yield [dict(zip(source_columns, row)) for row in rows]
+        finally:
+            cursor.close()
+
+    def transformed(self, rows):
+        """Yield target rows as tuples in the order of the target columns."""
+        for row in rows:
+            if self.transform is not None:
+                row = self.transform(row)
+                if row is None:
+                    continue
+            yield tuple(row[column] for column in self.columns)
+
+    def upsert(self, rows):
+        """Insert rows, or update them if the primary key exists."""
+        if not rows:
+            return 0
+        quote = self.target.ops.quote_name
+        target_columns = list(self.columns.values())
+        target_key = self.columns[self.key]
+        placeholders = '({})'.format(', '.join(['%s'] * len(target_columns)))
+        sql = (
+            'INSERT INTO {table} ({columns}) VALUES {values} '
+            'ON CONFLICT ({key}) DO UPDATE SET {updates}'
+        ).format(
+            table=quote(self.target_table),
+            columns=', '.join(quote(column) for column in target_columns),
+            values=', '.join([placeholders] * len(rows)),
+            key=quote(target_key),
+            updates=', '.join(
+                '{0} = EXCLUDED.{0}'.format(quote(column))
+                for column in target_columns if column != target_key),
+        )
+        params = [value for row in rows for value in row]
+        with self.target.cursor() as cursor:
+            cursor.execute(sql, params)
+        return len(rows)
+
+    def run(self, state, limit=None, full=False):
+        """Sync changes since the last run. Returns a dictionary of stats."""
+        mark = None if full else state.tables.get(self.name)
+        start = time.time()
+        stats = {'table': self.name, 'read': 0, 'written': 0, 'lag': 0}
+        for batch in self.source_batches(mark, limit):
+            rows = list(self.transformed(batch))
+            with transaction.atomic(using=self.target.alias):
+                stats['written'] += self.upsert(rows)
+            stats['read'] += len(batch)
+            last = batch[-1]
+            if last[self.modified] is None:
+                raise ValueError('{}: last modified is NULL for {}'.format(
+                    self.name, last[self.key]))
+            state.tables[self.name] = {
+                'modified': _to_json(last[self.modified]),
+                'key': _to_json(last[self.key]),
+            }
+            state.save()
+            stats['lag'] = self._lag(last[self.modified])
+        stats['seconds'] = time.time() - start
+        stats['rows_per_second'] = (
+            stats['read'] / stats['seconds'] if stats['seconds'] else 0)
+        logger.info(
+            '{table}: {read} rows read, {written} written, '
+            '{rows_per_second:.0f} rows/s, lag {lag} seconds'.format(**stats))
+        return stats
+
+    @staticmethod
+    def _lag(modified):
+        """Seconds between the last synced change and now."""
+        if not isinstance(modified, datetime.datetime):
+            return None
+        now = datetime.datetime.now(modified.tzinfo)
+        return (now - modified).total_seconds()
+
+
+def sync_tables(names=None, limit=None, full=False, batch_size=1000):
+    """Sync legacy tables. Returns a list of stats for each table."""
+    state = SyncState().load()
+    names = names or sorted(settings.LEGACY_SYNC_TABLES)
+    return [
+        TableSync.from_settings(name, batch_size=batch_size).run(
+            state, limit=limit, full=full)
+        for name in names
+    ]
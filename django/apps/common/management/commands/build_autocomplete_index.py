@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+""" Rebuild the autocomplete prefix indexes from the database. """
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.autocomplete import (
+    autocomplete_indexes, rebuild_autocomplete_index)
+
+
+class Command(BaseCommand):
+    help = 'Rebuild autocomplete prefix indexes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help='Names of indexes to rebuild. Default is all indexes.')
+
+    def handle(self, *args, **options):
+        names = options['names'] or sorted(autocomplete_indexes())
+        for name in names:
+            try:
+                count = rebuild_autocomplete_index(name)
+            except KeyError:
+                raise CommandError('No autocomplete index named ' + name)
+            except LookupError as err:
+                self.stderr.write('{}'.format(err))
+                continue
+            self.stdout.write('{}: {} items'.format(name, count))
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+""" Write the named urls as json for the frontend. """
+from django.core.management.base import BaseCommand
+
+from apps.common.url_map import export_url_map
+
+
+class Command(BaseCommand):
+    help = ('Write a json object of url name -> url for all named urls. '
+            'The file is only written if the urls have changed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', nargs='?', default='src/javascript/api-urls.json',
+            help='Json file to write.')
+
+    def handle(self, *args, **options):
+        if export_url_map(options['output']):
+            self.stdout.write('wrote {}'.format(options['output']))
+        elif options['verbosity'] > 1:
+            self.stdout.write('{} is up to date'.format(options['output']))
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+""" Bulk import legacy url redirects. """
+import io
+import os
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.redirects import RedirectTable, table_from_urlpatterns
+
+
+class Command(BaseCommand):
+    help = ('Add redirects from text files to the redirects file. Each line '
+            'is "old_path new_path [status]". Regular expressions start '
+            'with "~". Redirects can also be exported from a module with '
+            'url patterns for RedirectViews.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*')
+        parser.add_argument(
+            '--urlconf', action='append', default=[],
+            help='Module with RedirectView url patterns to export, such as '
+                 'apps.common.redirect_urls')
+        parser.add_argument(
+            '--replace', action='store_true', default=False,
+            help='Replace existing redirects instead of merging.')
+
+    def handle(self, *args, **options):
+        redirects_file = settings.REDIRECTS_FILE
+        lines = []
+        if not options['replace'] and os.path.exists(redirects_file):
+            with io.open(redirects_file, encoding='utf8') as existing:
+                lines.extend(existing)
+        for filename in options['files']:
+            try:
+                with io.open(filename, encoding='utf8') as new_lines:
+                    lines.extend(new_lines)
+            except IOError as err:
+                raise CommandError(err)
+        for urlconf in options['urlconf']:
+            try:
+                module = import_module(urlconf)
+            except ImportError as err:
+                raise CommandError(err)
+            exported = table_from_urlpatterns(module.urlpatterns, '^')
+            if exported.errors:
+                raise CommandError(
+                    'Url patterns that can not be exported, nothing was '
+                    'written:\n' + '\n'.join(exported.errors))
+            lines.extend(exported.to_lines())
+        if not lines:
+            raise CommandError('No redirects given')
+
+        table = RedirectTable.from_lines(lines)
+        if table.errors:
+            raise CommandError('Invalid redirects, nothing was written:\n' +
+                               '\n'.join(table.errors))
+        temp_file = redirects_file + '.tmp'
+        with io.open(temp_file, 'w', encoding='utf8') as output:
+            output.writelines(table.to_lines())
+        os.rename(temp_file, redirects_file)
+        self.stdout.write('{} exact redirects, {} patterns'.format(
+            len(table.exact), len(table.patterns)))
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+""" Update the index of byline photos. """
+from django.core.management.base import BaseCommand
+
+from apps.common.byline_photos import BylinePhotoIndex
+
+
+class Command(BaseCommand):
+    help = 'Index new and changed image files in BYLINE_PHOTO_DIR.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', '-f', action='store_true', default=False,
+            help='Index all files, not only new and changed ones.')
+
+    def handle(self, *args, **options):
+        index = BylinePhotoIndex().load()
+        indexed = index.update(force=options['force'])
+        if indexed is None:
+            self.stdout.write('no byline photos have changed')
+            return
+        index.save()
+        self.stdout.write('indexed {} of {} byline photos'.format(
+            indexed, len(index.photos)))
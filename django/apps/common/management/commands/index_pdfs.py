@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+""" Update the index of the pdf archive. """
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.common.pdf_index import PdfIndex
+
+
+class Command(BaseCommand):
+    help = ('Extract page counts, text and cover thumbnails from new or '
+            'changed pdf files in the archive.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', '-p', type=int, default=1,
+            help='Number of pdf files to parse in parallel.')
+        parser.add_argument(
+            '--force', '-f', action='store_true', default=False,
+            help='Index all files, not only new and changed ones.')
+
+    def handle(self, *args, **options):
+        start = time.time()
+        index = PdfIndex().load()
+        changed, removed = index.update(
+            processes=options['processes'], force=options['force'])
+        index.save()
+        self.stdout.write(
+            'indexed {changed} and removed {removed} of {total} pdf files '
+            'in {seconds:.1f} seconds'.format(
+                changed=len(changed),
+                removed=len(removed),
+                total=len(index.entries),
+                seconds=time.time() - start,
+            ))
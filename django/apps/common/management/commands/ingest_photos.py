@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+""" Import new photos from the staging folder. """
+from django.core.management.base import BaseCommand
+
+from apps.common.photo_ingest import PhotoIngest
+
+
+class Command(BaseCommand):
+    help = ('Import new image files from STAGING_ROOT. Safe to run again '
+            'after an interruption.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', '-p', type=int, default=None,
+            help='Image processes. Defaults to the cpu count.')
+        parser.add_argument(
+            '--upload-threads', '-u', type=int, default=8,
+            help='Concurrent uploads to file storage.')
+        parser.add_argument(
+            '--limit', '-l', type=int, default=None,
+            help='Import at most this many files.')
+
+    def handle(self, *args, **options):
+        ingest = PhotoIngest(
+            processes=options['processes'],
+            upload_threads=options['upload_threads'],
+        )
+        stats = ingest.run(limit=options['limit'])
+        self.stdout.write(
+            '{new} new files: {imported} imported, {duplicates} duplicates, '
+            '{failed} failed in {seconds:.1f} seconds '
+            '({per_minute:.0f} images/min)'.format(**stats))
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+""" Rebuild full text search entries. """
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.apps import installed_models
+from apps.common.search import reindex
+
+
+class Command(BaseCommand):
+    help = 'Rebuild full text search entries for searchable models.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'models', nargs='*',
+            help='Models to reindex, such as stories.Story. Default is all.')
+        parser.add_argument(
+            '--batch-size', '-b', type=int, default=500,
+            help='Number of objects to index in each transaction.')
+
+    def handle(self, *args, **options):
+        labels = options['models'] or sorted(settings.SEARCH_MODELS)
+        unknown = set(labels) - set(settings.SEARCH_MODELS)
+        if unknown:
+            raise CommandError('Not searchable: {}'.format(
+                ', '.join(sorted(unknown))))
+        for model in installed_models(labels):
+            start = time.time()
+            total = model.objects.count()
+            done = 0
+            for done in reindex(model, batch_size=options['batch_size']):
+                self.stdout.write('{}: {} of {} ({:.0f}/s)'.format(
+                    model.__name__, done, total,
+                    done / (time.time() - start)))
+            self.stdout.write('{}: indexed {} in {:.1f} seconds'.format(
+                model.__name__, done, time.time() - start))
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+""" Count database queries per request for anonymous readers. """
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+DEFAULT_PATHS = ['/', '/rss/', '/kontakt/', '/pdf/', '/utgivelsesplan/']
+
+
+class Command(BaseCommand):
+    help = ('Request pages through the full middleware stack and report the '
+            'number of database queries for each request.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*', default=DEFAULT_PATHS,
+            help='Paths to request.')
+        parser.add_argument(
+            '--session', action='store_true', default=False,
+            help='Send a session cookie, like a reader who has logged in.')
+        parser.add_argument(
+            '--max', type=int, default=None,
+            help='Exit with an error if any request uses more queries.')
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST=settings.SITE_URL)
+        if options['session']:
+            client.cookies[settings.SESSION_COOKIE_NAME] = 'not-a-session'
+        worst = 0
+        for path in options['paths']:
+            with CaptureQueriesContext(connection) as queries:
+                response = client.get(path)
+            worst = max(worst, len(queries))
+            self.stdout.write('{:4} queries  {}  {}'.format(
+                len(queries), response.status_code, path))
+            if options['verbosity'] > 1:
+                for query in queries.captured_queries:
+                    self.stdout.write('      ' + query['sql'])
+        if options['max'] is not None and worst > options['max']:
+            raise CommandError('{} queries, more than {}.'.format(
+                worst, options['max']))
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+""" Compare reverse() with fast_reverse() for article links. """
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.urlresolvers import reverse
+
+from apps.common.url_map import fast_reverse, reverse_table
+
+ARTICLE_KWARGS = {
+    'section': 'nyheter', 'story_id': 12345, 'slug': 'studentene-protesterer'}
+
+
+def calls_per_second(function, count):
+    start = time.time()
+    for _ in range(count):
+        function('article', kwargs=ARTICLE_KWARGS)
+    return count / (time.time() - start)
+
+
+class Command(BaseCommand):
+    help = 'Measure reverse() and fast_reverse() calls per second.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count', '-n', type=int, default=20000,
+            help='Number of calls to time.')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        reverse_table()  # built once per process, not part of the timing
+        expected = reverse('article', kwargs=ARTICLE_KWARGS)
+        if fast_reverse('article', **ARTICLE_KWARGS) != expected:
+            self.stderr.write('fast_reverse gives a different url')
+        results = [
+            ('reverse', calls_per_second(reverse, count)),
+            ('fast_reverse', calls_per_second(
+                lambda name, kwargs: fast_reverse(name, **kwargs), count)),
+        ]
+        for name, rate in results:
+            self.stdout.write('{:14} {:10.0f} calls/s'.format(name, rate))
+        self.stdout.write('speedup {:.1f}x'.format(
+            results[1][1] / results[0][1]))
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+""" Compare full text search with a plain text scan for typical queries. """
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.common.models import SearchEntry
+from apps.common.search import search
+
+DEFAULT_QUERIES = [
+    'studentsamskipnaden', 'universitetet i oslo', 'eksamen', 'bolig',
+    'kantine', 'studentparlamentet', 'forskning', 'valg',
+]
+
+
+def _scan(query, page_size):
+    """Substring search, like the search that was replaced."""
+    condition = Q()
+    for word in query.split():
+        condition &= (
+            Q(title__icontains=word) | Q(description__icontains=word) |
+            Q(content__icontains=word))
+    return list(SearchEntry.objects.filter(condition)[:page_size + 1])
+
+
+def _watson(query, page_size):
+    import watson
+    return list(watson.search(query)[:page_size + 1])
+
+
+class Command(BaseCommand):
+    help = ('Time full text search against a substring scan, and against '
+            'watson if it is installed.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'queries', nargs='*', default=DEFAULT_QUERIES,
+            help='Search queries.')
+        parser.add_argument(
+            '--repeat', '-r', type=int, default=5,
+            help='Number of times to run each query.')
+
+    def handle(self, *args, **options):
+        searches = [
+            ('fulltext', lambda query: search(query).results),
+            ('scan', lambda query: _scan(query, 20)),
+        ]
+        try:
+            import watson  # noqa
+        except ImportError:
+            pass
+        else:
+            searches.append(('watson', lambda query: _watson(query, 20)))
+        self.stdout.write('{:24}'.format('query') + ''.join(
+            '{:>14}'.format(name + ' ms') for name, _ in searches))
+        totals = dict((name, 0.0) for name, _ in searches)
+        for query in options['queries']:
+            line = '{:24}'.format(query[:24])
+            for name, function in searches:
+                timings = []
+                for _ in range(options['repeat']):
+                    start = time.time()
+                    function(query)
+                    timings.append(time.time() - start)
+                best = min(timings) * 1000
+                totals[name] += best
+                line += '{:14.1f}'.format(best)
+            self.stdout.write(line)
+        self.stdout.write('{:24}'.format('total') + ''.join(
+            '{:14.1f}'.format(totals[name]) for name, _ in searches))
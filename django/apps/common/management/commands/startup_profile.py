@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+""" Report import time per module for a cold worker boot. """
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ('Boot the wsgi application in a fresh python process and list '
+            'the slowest module imports.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, default=30,
+            help='Number of modules to list.')
+        parser.add_argument(
+            '--budget', type=float, default=0,
+            help='Exit with an error if total import time exceeds this (ms).')
+        parser.add_argument(
+            '--json', action='store_true', default=False,
+            help='Output the report as json.')
+
+    def handle(self, *args, **options):
+        # This process has already imported django and the settings, so the
+        # measurement has to happen in a new interpreter.
+        command = [
+            sys.executable, '-m', 'apps.common.import_timer',
+            '--settings', settings.SETTINGS_MODULE,
+            '--limit', str(options['limit']),
+            '--budget', str(options['budget']),
+        ]
+        if options['json']:
+            command.append('--json')
+        returncode = subprocess.call(command)
+        if returncode:
+            raise CommandError('Startup import budget exceeded.')
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+""" Copy changes from the legacy prodsys database. """
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.legacy_sync import sync_tables
+
+
+def _seconds(value):
+    return '-' if value is None else '{:.0f}s'.format(value)
+
+
+class Command(BaseCommand):
+    help = ('Copy rows that changed since the last sync from the legacy '
+            'prodsys database, in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'tables', nargs='*',
+            help='Tables to sync. Default is all tables.')
+        parser.add_argument(
+            '--batch-size', '-b', type=int, default=1000,
+            help='Number of rows to read and write at a time.')
+        parser.add_argument(
+            '--limit', '-l', type=int, default=None,
+            help='Maximum number of rows to read from each table.')
+        parser.add_argument(
+            '--full', action='store_true', default=False,
+            help='Ignore the high-water mark and sync all rows.')
+
+    def handle(self, *args, **options):
+        unknown = set(options['tables']) - set(settings.LEGACY_SYNC_TABLES)
+        if unknown:
+            raise CommandError('Unknown tables: {}'.format(
+                ', '.join(sorted(unknown))))
+        results = sync_tables(
+            names=options['tables'],
+            limit=options['limit'],
+            full=options['full'],
+            batch_size=options['batch_size'],
+        )
+        for stats in results:
+            self.stdout.write(
+                '{table}: {read} read, {written} written in {seconds:.1f} '
+                'seconds ({rows_per_second:.0f} rows/s), lag {lag}'.format(
+                    lag=_seconds(stats.pop('lag')), **stats))
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+""" Show depth, latency and run time of the background task queues. """
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.common.task_metrics import queue_stats
+
+
+def _ms(seconds):
+    return '-' if seconds is None else '{:.0f}'.format(seconds * 1000)
+
+
+class Command(BaseCommand):
+    help = ('Show the number of waiting tasks and recent latency and run '
+            'time for each task queue.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'queues', nargs='*',
+            help='Queues to show. Default is all queues.')
+        parser.add_argument(
+            '--json', action='store_true', default=False,
+            help='Output the metrics as json.')
+
+    def handle(self, *args, **options):
+        queues = options['queues'] or settings.CELERY_TASK_QUEUES
+        stats = queue_stats(queues)
+        if options['json']:
+            self.stdout.write(json.dumps(stats, indent=2, sort_keys=True))
+            return
+        self.stdout.write(
+            '{:12} {:>7} {:>7} {:>7} {:>7} {:>7} {:>7} {:>9}'.format(
+                'queue', 'waiting', 'done', 'failed', 'retried',
+                'wait50', 'wait95', 'run95 ms'))
+        for queue in queues:
+            queue_info = stats[queue]
+            counts = queue_info['counts']
+            self.stdout.write(
+                '{:12} {:>7} {:>7} {:>7} {:>7} {:>7} {:>7} {:>9}'.format(
+                    queue, queue_info['depth'], counts.get('done', 0),
+                    counts.get('failed', 0), counts.get('retried', 0),
+                    _ms(queue_info['latency_p50']),
+                    _ms(queue_info['latency_p95']),
+                    _ms(queue_info['runtime_p95'])))
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Sessions, authentication and messages only for requests that use them.
+
+Anonymous readers make up almost all traffic, and they never log in or see
+flash messages. For a GET or HEAD request without a session cookie outside
+of SESSION_PATHS, ``request.user`` is an ``AnonymousUser`` without any
+lookups, and ``request.session`` is a new, empty session. Reading it costs
+nothing and doesn't add ``Vary: Cookie`` to the response. The session is
+only saved, and the cookie set, if a view or a message changes it.
+"""
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+def needs_session(request):
+    """Does this request need session, authentication and messages?"""
+    if request.method not in SAFE_METHODS:
+        return True
+    if settings.SESSION_COOKIE_NAME in request.COOKIES:
+        return True
+    return request.path.startswith(tuple(settings.SESSION_PATHS))
+
+
+class SessionOnDemandMiddleware(object):
+
+    """
+    Replaces SessionMiddleware, AuthenticationMiddleware and
+    MessageMiddleware in MIDDLEWARE_CLASSES.
+    """
+
+    def __init__(self):
+        self.session_middleware = SessionMiddleware()
+        self.auth_middleware = AuthenticationMiddleware()
+        self.message_middleware = MessageMiddleware()
+
+    def process_request(self, request):
+        if needs_session(request):
+            self.session_middleware.process_request(request)
+            self.auth_middleware.process_request(request)
+        else:
+            request.session_on_demand = True
+            request.session = self.session_middleware.SessionStore(None)
+            request.user = AnonymousUser()
+        self.message_middleware.process_request(request)
+
+    def process_response(self, request, response):
+        if not hasattr(request, 'session'):
+            return response  # an earlier middleware returned a response
+        response = self.message_middleware.process_response(request, response)
+        if getattr(request, 'session_on_demand', False) and (
+                not request.session.modified):
+            return response
+        return self.session_middleware.process_response(request, response)
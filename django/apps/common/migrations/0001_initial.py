@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+# The search vector is computed by postgresql when a row is written, with
+# the title weighted higher than the description and the content.
+CREATE_SEARCH_VECTOR = """
+ALTER TABLE common_searchentry ADD COLUMN search_vector tsvector;
+
+CREATE INDEX common_searchentry_search_vector
+    ON common_searchentry USING gin(search_vector);
+
+CREATE FUNCTION common_searchentry_update_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.norwegian', NEW.title), 'A') ||
+        setweight(to_tsvector('pg_catalog.norwegian', NEW.description), 'B') ||
+        setweight(to_tsvector('pg_catalog.norwegian', NEW.content), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER common_searchentry_update_vector
+    BEFORE INSERT OR UPDATE OF title, description, content
+    ON common_searchentry
+    FOR EACH ROW EXECUTE PROCEDURE common_searchentry_update_vector();
+"""
+
+DROP_SEARCH_VECTOR = """
+DROP TRIGGER common_searchentry_update_vector ON common_searchentry;
+DROP FUNCTION common_searchentry_update_vector();
+ALTER TABLE common_searchentry DROP COLUMN search_vector;
+"""
+
+
+def _postgresql_only(sql):
+    def run_sql(apps, schema_editor):
+        # The sqlite test database has no full text search.
+        if schema_editor.connection.vendor == 'postgresql':
+            schema_editor.execute(sql)
+    return run_sql
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.AutoField(
+                    verbose_name='ID', serialize=False, auto_created=True,
+                    primary_key=True)),
+                ('object_id', models.PositiveIntegerField()),
+                ('title', models.TextField(blank=True)),
+                ('description', models.TextField(blank=True)),
+                ('content', models.TextField(blank=True)),
+                ('url', models.CharField(max_length=500, blank=True)),
+                ('content_type', models.ForeignKey(
+                    to='contenttypes.ContentType')),
+            ],
+            options={
+                'verbose_name_plural': 'search entries',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='searchentry',
+            unique_together=set([('content_type', 'object_id')]),
+        ),
+        migrations.RunPython(
+            _postgresql_only(CREATE_SEARCH_VECTOR),
+            _postgresql_only(DROP_SEARCH_VECTOR),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils.encoding import python_2_unicode_compatible
+
+
+@python_2_unicode_compatible
+class SearchEntry(models.Model):
+
+    """
+    Full text search document for one object.
+
+    The table also has a ``search_vector`` tsvector column with a GIN index.
+    It is kept up to date by a database trigger, see migration 0001.
+    """
+
+    content_type = models.ForeignKey(ContentType)
+    object_id = models.PositiveIntegerField()
+    object = GenericForeignKey('content_type', 'object_id')
+    title = models.TextField(blank=True)
+    description = models.TextField(blank=True)
+    content = models.TextField(blank=True)
+    url = models.CharField(max_length=500, blank=True)
+
+    class Meta:
+        unique_together = [('content_type', 'object_id')]
+        verbose_name_plural = 'search entries'
+
+    def __str__(self):
+        return self.title
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Keyset pagination.
+
+Pages are found by filtering on the ordering values of the last item on
+the previous page, instead of with OFFSET. The database can then use an
+index to go straight to the page, so deep pages are as fast as the first.
+The position is passed between requests as an opaque cursor string.
+"""
+import base64
+import json
+from collections import namedtuple
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+KeysetPage = namedtuple('KeysetPage', 'items next_cursor has_next')
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    data = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """The list of ordering values in a cursor."""
+    try:
+        data = base64.urlsafe_b64decode(cursor.encode('ascii'))
+        values = json.loads(data.decode('utf-8'))
+    except (TypeError, ValueError, UnicodeError) as err:
+        raise InvalidCursor('{}'.format(err))
+    # Null can't be compared with greater or less than.
+    if not isinstance(values, list) or None in values:
+        raise InvalidCursor('cursor is not a list of values')
+    return values
+
+
+class KeysetPaginator(object):
+
+    """
+    Page through a queryset in a fixed order. The ordering must end with a
+    unique field, such as the primary key, so no two items sort equal.
+    The ordering fields can't be null.
+
+        paginator = KeysetPaginator(stories, ['-publication_date', '-pk'])
+        page = paginator.page(request.GET.get('cursor'))
+    """
+
+    def __init__(self, queryset, ordering=('-pk',), per_page=20):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        self.per_page = per_page
+
+    def _after(self, values):
+        """Filter for items that come after the given ordering values."""
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor('cursor does not match the ordering')
+        conditions = []
+        for index, field in enumerate(self.ordering):
+            lookup = '__lt' if field.startswith('-') else '__gt'
+            equal = dict(zip(self.fields[:index], values[:index]))
+            equal[self.fields[index] + lookup] = values[index]
+            conditions.append(Q(**equal))
+        return reduce(lambda first, second: first | second, conditions)
+
+    def _values(self, item):
+        return [getattr(item, field) for field in self.fields]
+
+    def page(self, cursor=None):
+        """A page of items after the cursor, or the first page."""
+        queryset = self.queryset.order_by(*self.ordering)
+        try:
+            if cursor:
+                queryset = queryset.filter(self._after(decode_cursor(cursor)))
+            # Some values are only converted when the query is compiled.
+            items = list(queryset[:self.per_page + 1])
+        except (TypeError, ValueError, ValidationError) as err:
+            if not cursor or isinstance(err, InvalidCursor):
+                raise
+            # The values have the wrong type for the ordering fields.
+            raise InvalidCursor('{}'.format(err))
+        has_next = len(items) > self.per_page
+        items = items[:self.per_page]
+        next_cursor = (
+            encode_cursor(self._values(items[-1])) if has_next else None)
+        return KeysetPage(items, next_cursor, has_next)
+
+    def __iter__(self):
+        """Iterate over all items, one page at a time."""
+        cursor = None
+        while True:
+            page = self.page(cursor)
+            for item in page.items:
+                yield item
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+
+def keyset_page(request, queryset, ordering=('-pk',), per_page=20):
+    """The page for the ``cursor`` query parameter, for listing views."""
+    paginator = KeysetPaginator(queryset, ordering, per_page)
+    try:
+        return paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        raise Http404('Invalid page cursor')
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Precomputed index of the issue pdf archive.
+
+Parsing large pdf files is too slow for the request path, so page counts,
+text and cover thumbnails are extracted by the ``index_pdfs`` management
+command. Files are only parsed again when their mtime or size changes.
+
+The index itself only has the page count and cover of each file, so it is
+small enough to keep loaded in every worker. Page text is stored in a file
+per pdf in PDF_TEXT_DIR, and only read when it is needed.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import subprocess
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+COVER_SIZE = '300x'
+TEXT_LENGTH = 2000  # characters of text to keep per page
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size
+
+
+def _path_hash(relative_path):
+    return hashlib.sha1(relative_path.encode('utf-8')).hexdigest()
+
+
+def _render_cover(path):
+    """Render first page of a pdf file as a jpeg. Returns image data."""
+    return subprocess.check_output([
+        'convert', '-density', '72', '{}[0]'.format(path),
+        '-resize', COVER_SIZE, '-quality', '80', 'jpeg:-',
+    ])
+
+
+def _cover_name(relative_path):
+    # The hash keeps names unique when "a/b-c" and "a-b/c" both exist.
+    name = os.path.splitext(relative_path)[0].replace(os.sep, '-')
+    return 'pdf-covers/{}-{}.jpg'.format(name, _path_hash(relative_path)[:8])
+
+
+def extract_pdf(path):
+    """Extract page count, text and cover image data from a pdf file."""
+    from PyPDF2 import PdfFileReader
+    entry = {'pages': 0, 'text': [], 'cover': None}
+    try:
+        with open(path, 'rb') as pdf_file:
+            reader = PdfFileReader(pdf_file, strict=False)
+            entry['pages'] = reader.getNumPages()
+            for number in range(entry['pages']):
+                text = reader.getPage(number).extractText()
+                entry['text'].append(' '.join(text.split())[:TEXT_LENGTH])
+    except Exception as err:
+        logger.warning('could not read pdf %s: %s', path, err)
+    try:
+        entry['cover'] = _render_cover(path)
+    except (OSError, subprocess.CalledProcessError) as err:
+        logger.warning('could not render cover for %s: %s', path, err)
+    return entry
+
+
+class PdfIndex(object):
+
+    """Index of pdf files in a folder, stored as gzipped json."""
+
+    def __init__(self, root=None, index_file=None, text_folder=None):
+        self.root = root or settings.PDF_ARCHIVE_DIR
+        self.index_file = index_file or settings.PDF_INDEX_FILE
+        self.text_folder = text_folder or settings.PDF_TEXT_DIR
+        self.entries = {}
+
+    def load(self):
+        try:
+            with gzip.open(self.index_file, 'rt') as index_fh:
+                self.entries = json.load(index_fh)
+        except (IOError, ValueError):
+            self.entries = {}
+        return self
+
+    def save(self):
+        temp_file = self.index_file + '.tmp'
+        with gzip.open(temp_file, 'wt') as index_fh:
+            json.dump(self.entries, index_fh, separators=(',', ':'))
+        os.rename(temp_file, self.index_file)
+
+    def _text_file(self, name):
+        return os.path.join(
+            self.text_folder, _path_hash(name) + '.json.gz')
+
+    def _save_text(self, name, text):
+        if not os.path.isdir(self.text_folder):
+            os.makedirs(self.text_folder)
+        text_file = self._text_file(name)
+        with gzip.open(text_file + '.tmp', 'wt') as text_fh:
+            json.dump(text, text_fh, separators=(',', ':'))
+        os.rename(text_file + '.tmp', text_file)
+
+    def page_text(self, name):
+        """List with the text of each page of a pdf file."""
+        try:
+            with gzip.open(self._text_file(name), 'rt') as text_fh:
+                return json.load(text_fh)
+        except (IOError, ValueError):
+            return []
+
+    def find_files(self):
+        """Dictionary of relative path -> (mtime, size) for all pdf files."""
+        found = {}
+        for folder, dirs, files in os.walk(self.root):
+            for filename in files:
+                if filename.lower().endswith('.pdf'):
+                    path = os.path.join(folder, filename)
+                    relative_path = os.path.relpath(path, self.root)
+                    found[relative_path] = _file_signature(path)
+        return found
+
+    def update(self, processes=1, force=False):
+        """
+        Index new and changed files, and forget deleted files.
+        Returns a tuple with lists of changed and removed file names.
+        """
+        found = self.find_files()
+        removed = [name for name in self.entries if name not in found]
+        for name in removed:
+            del self.entries[name]
+            try:
+                os.remove(self._text_file(name))
+            except OSError:
+                pass
+        changed = sorted(
+            name for name, (mtime, size) in found.items() if force or (
+                self.entries.get(name, {}).get('mtime') != mtime or
+                self.entries.get(name, {}).get('size') != size))
+        paths = [os.path.join(self.root, name) for name in changed]
+        pool = None
+        if processes > 1 and len(paths) > 1:
+            pool = Pool(processes)
+            extracted = pool.imap(extract_pdf, paths)
+        else:
+            extracted = (extract_pdf(path) for path in paths)
+        try:
+            for name, entry in zip(changed, extracted):
+                self._add_entry(name, entry, found[name])
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        return changed, removed
+
+    def _add_entry(self, name, entry, signature):
+        """Store the text and cover of an extracted file."""
+        self._save_text(name, entry.pop('text'))
+        cover_data = entry.pop('cover')
+        if cover_data:
+            cover_name = _cover_name(name)
+            if default_storage.exists(cover_name):
+                default_storage.delete(cover_name)
+            entry['cover'] = default_storage.save(
+                cover_name, ContentFile(cover_data))
+        entry['mtime'], entry['size'] = signature
+        self.entries[name] = entry
+
+    def listing(self):
+        """All entries, sorted by file name."""
+        return [
+            dict(entry, filename=name)
+            for name, entry in sorted(self.entries.items())
+        ]
+
+
+_loaded_index = {'signature': None, 'index': None}
+
+
+def pdf_index():
+    """
+    The current pdf index for use in views.
+    The index file is only read again when it has been rebuilt.
+    """
+    try:
+        signature = _file_signature(settings.PDF_INDEX_FILE)
+    except OSError:
+        signature = None
+    if signature != _loaded_index['signature']:
+        _loaded_index['index'] = PdfIndex().load()
+        _loaded_index['signature'] = signature
+    return _loaded_index['index']
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Batch import of new photos from STAGING_ROOT.
+
+Files are hashed and deduplicated, then resized in a process pool and
+uploaded to the default storage from a thread pool. Every imported file is
+appended to a journal with its size and exif date, so an interrupted import
+continues where it stopped.
+"""
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from multiprocessing import Pool
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.tif', '.tiff')
+EXIF_ORIENTATION = 274
+EXIF_DATETIME_ORIGINAL = 36867
+ROTATIONS = {3: 180, 6: 270, 8: 90}
+
+
+def file_hash(path):
+    """Returns (path, sha1 hex digest of the file contents)"""
+    sha1 = hashlib.sha1()
+    with open(path, 'rb') as image_file:
+        for chunk in iter(lambda: image_file.read(1 << 16), b''):
+            sha1.update(chunk)
+    return path, sha1.hexdigest()
+
+
+def process_image(path, max_size=None):
+    """
+    Read exif data, fix rotation and resize an image.
+    Returns (path, jpeg data, exif dictionary) or (path, None, error message)
+    """
+    from PIL import Image
+    max_size = max_size or settings.PHOTO_INGEST_MAX_SIZE
+    try:
+        image = Image.open(path)
+        exif = {}
+        raw_exif = image._getexif() if hasattr(image, '_getexif') else None
+        if raw_exif:
+            exif['created'] = raw_exif.get(EXIF_DATETIME_ORIGINAL)
+            rotation = ROTATIONS.get(raw_exif.get(EXIF_ORIENTATION))
+            if rotation:
+                image = image.rotate(rotation, expand=True)
+        image = image.convert('RGB')
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=90, optimize=True)
+        exif['width'], exif['height'] = image.size
+        return path, output.getvalue(), exif
+    except Exception as err:
+        return path, None, '{}'.format(err)
+
+
+def _process_image(path):
+    return process_image(path)
+
+
+class Journal(object):
+
+    """Append-only log of imported files, one json object per line."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.files = set()   # (path, mtime, size) of handled files
+        self.hashes = {}     # sha1 -> storage name
+
+    def load(self):
+        try:
+            with open(self.filename) as lines:
+                for line in lines:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # line cut short by an interruption
+                    self.files.add(
+                        (entry['path'], entry['mtime'], entry['size']))
+                    self.hashes[entry['sha1']] = entry['name']
+        except IOError:
+            pass
+        return self
+
+    def add(self, **entry):
+        with open(self.filename, 'a') as journal_file:
+            journal_file.write(json.dumps(entry) + '\n')
+        self.files.add((entry['path'], entry['mtime'], entry['size']))
+        self.hashes[entry['sha1']] = entry['name']
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return path, int(stat.st_mtime), stat.st_size
+
+
+def discover(root, journal, exclude=()):
+    """New image files in root that are not in the journal."""
+    for folder, dirs, files in os.walk(root):
+        dirs[:] = [
+            name for name in dirs
+            if os.path.join(folder, name).rstrip('/') not in exclude]
+        for filename in files:
+            if filename.lower().endswith(IMAGE_EXTENSIONS):
+                signature = _signature(os.path.join(folder, filename))
+                if signature not in journal.files:
+                    yield signature
+
+
+def storage_name(path, sha1):
+    year_month = time.strftime('%Y/%m', time.localtime(os.path.getmtime(path)))
+    basename = os.path.splitext(os.path.basename(path))[0]
+    return 'photos/{}/{}-{}.jpg'.format(year_month, sha1[:12], basename)
+
+
+class PhotoIngest(object):
+
+    def __init__(self, root=None, journal_file=None, processes=None,
+                 upload_threads=8):
+        self.root = root or settings.STAGING_ROOT
+        self.journal = Journal(
+            journal_file or settings.PHOTO_INGEST_JOURNAL).load()
+        self.processes = processes
+        self.upload_threads = upload_threads
+        self.exclude = [settings.BYLINE_PHOTO_DIR.rstrip('/')]
+        self.stats = {'new': 0, 'duplicates': 0, 'imported': 0, 'failed': 0}
+
+    def _upload(self, name, data):
+        return default_storage.save(name, ContentFile(data))
+
+    def _journal(self, path, sha1, name, exif=None):
+        mtime, size = self.signatures[path]
+        self.journal.add(
+            path=path, mtime=mtime, size=size, sha1=sha1, name=name,
+            exif=exif)
+
+    def _finish_upload(self, future, path, exif):
+        sha1 = self.unique[path]
+        try:
+            name = future.result()
+        except Exception as err:
+            logger.warning('upload failed %s: %s', path, err)
+            self.stats['failed'] += 1
+            return
+        self._journal(path, sha1, name, exif)
+        self.stats['imported'] += 1
+        # Copies found in the same batch are done when the original is.
+        for duplicate in self.batch_duplicates.pop(sha1, []):
+            self._journal(duplicate, sha1, name, exif)
+
+    def _resize_and_upload(self, pool, uploader, max_pending):
+        """
+        Resize unique images in the pool and upload them. Resized images
+        are kept in memory until they are uploaded, so no more than
+        max_pending files are resized or uploaded at a time.
+        """
+        paths = iter(sorted(self.unique))
+        resizing = deque()
+        pending = {}  # upload future -> (path, exif)
+        while True:
+            while len(resizing) + len(pending) < max_pending:
+                path = next(paths, None)
+                if path is None:
+                    break
+                resizing.append(pool.apply_async(_process_image, (path,)))
+            if resizing:
+                path, data, info = resizing.popleft().get()
+                if data is None:
+                    logger.warning('could not import %s: %s', path, info)
+                    self.stats['failed'] += 1
+                else:
+                    name = storage_name(path, self.unique[path])
+                    future = uploader.submit(self._upload, name, data)
+                    pending[future] = path, info
+            elif not pending:
+                break
+            # Only wait for uploads when nothing is being resized.
+            done, _ = wait(
+                pending, timeout=0 if resizing else None,
+                return_when=FIRST_COMPLETED)
+            for future in done:
+                self._finish_upload(future, *pending.pop(future))
+
+    def run(self, limit=None):
+        start = time.time()
+        self.signatures = dict(
+            (path, (mtime, size)) for path, mtime, size in
+            discover(self.root, self.journal, self.exclude))
+        paths = sorted(self.signatures)[:limit]
+        self.stats['new'] = len(paths)
+        self.unique = {}  # path -> sha1
+        self.batch_duplicates = defaultdict(list)  # sha1 -> paths
+        pool = Pool(self.processes)
+        try:
+            # Hash everything first, so duplicates are never resized.
+            batch_hashes = {}
+            for path, sha1 in pool.imap_unordered(file_hash, paths, 8):
+                if sha1 in self.journal.hashes:
+                    self.stats['duplicates'] += 1
+                    self._journal(path, sha1, self.journal.hashes[sha1])
+                elif sha1 in batch_hashes:
+                    self.stats['duplicates'] += 1
+                    self.batch_duplicates[sha1].append(path)
+                else:
+                    self.unique[path] = sha1
+                    batch_hashes[sha1] = path
+
+            with ThreadPoolExecutor(self.upload_threads) as uploader:
+                self._resize_and_upload(
+                    pool, uploader, self.upload_threads * 2)
+        finally:
+            pool.close()
+            pool.join()
+        seconds = time.time() - start
+        self.stats['seconds'] = seconds
+        self.stats['per_minute'] = (
+            self.stats['imported'] / seconds * 60 if seconds else 0)
+        return self.stats
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Track when published content last changed.
+
+Cached pages and feeds use the publication stamp as part of their cache keys
+and etags, so they can be validated without querying the database.
+
+Content can also be scheduled to be published later, which saves nothing
+when the time comes. The time of the next scheduled publication is cached
+with the stamp, and the stamp changes when that time has passed.
+"""
+import calendar
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min
+from django.utils import timezone
+
+from .apps import installed_models
+
+# Cached value is (stamp, next scheduled publication or None)
+PUBLICATION_STAMP_KEY = 'publication-stamp:scheduled'
+
+
+def published_objects(model):
+    """Queryset of the published objects of a model."""
+    manager = model._default_manager
+    return getattr(manager, 'published', manager.all)()
+
+
+def next_scheduled_publication():
+    """Unix timestamp of the next scheduled publication, or None."""
+    now = timezone.now()
+    scheduled = []
+    for label, field in settings.PUBLICATION_SCHEDULE.items():
+        for model in installed_models([label]):
+            value = model._default_manager.filter(
+                **{field + '__gt': now}).aggregate(next=Min(field))['next']
+            if value is not None:
+                scheduled.append(calendar.timegm(value.utctimetuple()))
+    return min(scheduled) if scheduled else None
+
+
+def touch_publication(**kwargs):
+    """Mark published content as changed. Can be used as a signal receiver."""
+    stamp = time.time()
+    cache.set(
+        PUBLICATION_STAMP_KEY, (stamp, next_scheduled_publication()), None)
+    return stamp
+
+
+def publication_stamp():
+    """Unix timestamp of the last change to published content."""
+    value = cache.get(PUBLICATION_STAMP_KEY)
+    if value is None:
+        # Cache was cleared. Assume that everything has changed.
+        return touch_publication()
+    stamp, scheduled = value
+    if scheduled is not None and scheduled <= time.time():
+        # Scheduled content has been published since the last change.
+        stamp = touch_publication()
+    return stamp
+
+
+def publication_datetime():
+    """The publication stamp as an aware datetime."""
+    return datetime.fromtimestamp(int(publication_stamp()), timezone.utc)
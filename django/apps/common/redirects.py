@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+"""
+Redirects from legacy urls.
+
+Redirects are stored as data in a text file with one redirect per line:
+
+    /old/path/  /new/path/  [status]
+    ~^/old/(\\d+)/  /new/\\1/  [status]
+    /removed/  -  410
+
+Lines starting with ``~`` are regular expressions. Exact paths are looked
+up in a dictionary, so the cost of a request does not grow with the number
+of redirects. Only the few regular expressions are tried one by one.
+Invalid lines are logged and skipped, so one bad line can't break the site.
+
+Redirects that used to be url patterns are exported to the file with
+``import_redirects --urlconf``. The patterns are kept for their names, in a
+``ReverseOnlyResolver`` that reverse() can use but requests never walk.
+"""
+import io
+import logging
+import os
+import re
+import time
+
+from django.conf import settings
+from django.core.urlresolvers import RegexURLResolver, Resolver404, reverse
+from django.http import (
+    HttpResponseGone, HttpResponsePermanentRedirect, HttpResponseRedirect)
+from django.views.generic import RedirectView
+
+logger = logging.getLogger(__name__)
+
+PERMANENT = 301
+FOUND = 302
+GONE = 410
+STATUSES = {301, 302, 303, 307, 308, GONE}
+CHECK_INTERVAL = 5  # seconds between checks for a changed redirects file
+
+
+class InvalidRedirect(ValueError):
+    pass
+
+
+def _normalize_path(path):
+    return path.rstrip('/') or '/'
+
+
+class RedirectTable(object):
+
+    """Exact path lookup with a list of regular expression fallbacks."""
+
+    def __init__(self):
+        self.exact = {}
+        self.patterns = []
+        self.errors = []  # invalid lines skipped by from_lines()
+
+    def __len__(self):
+        return len(self.exact) + len(self.patterns)
+
+    def add(self, source, target, status=PERMANENT):
+        """Raises InvalidRedirect for unknown statuses and bad patterns."""
+        if status not in STATUSES:
+            raise InvalidRedirect('unsupported status {}'.format(status))
+        if source.startswith('~'):
+            try:
+                pattern = re.compile(source[1:])
+            except re.error as err:
+                raise InvalidRedirect('bad regular expression {}: {}'.format(
+                    source[1:], err))
+            self.patterns.append((pattern, target, status))
+        else:
+            self.exact[_normalize_path(source)] = (target, status)
+
+    def lookup(self, path):
+        """Returns a tuple of (target, status) or None."""
+        found = self.exact.get(_normalize_path(path))
+        if found:
+            return found
+        for pattern, target, status in self.patterns:
+            match = pattern.match(path)
+            if not match:
+                continue
+            try:
+                return match.expand(target), status
+            except (re.error, IndexError):
+                logger.warning(
+                    'bad redirect target %s for %s', target, pattern.pattern)
+        return None
+
+    @classmethod
+    def from_lines(cls, lines):
+        """Table from redirect lines. Invalid lines are listed in errors."""
+        table = cls()
+        for number, line in enumerate(lines, 1):
+            parts = line.split()
+            if len(parts) < 2 or line.startswith('#'):
+                continue
+            try:
+                status = int(parts[2]) if len(parts) > 2 else PERMANENT
+                table.add(parts[0], parts[1], status)
+            except ValueError as err:
+                table.errors.append('line {}: {}'.format(number, err))
+        return table
+
+    def to_lines(self):
+        for source, (target, status) in sorted(self.exact.items()):
+            yield '{}\t{}\t{}\n'.format(source, target, status)
+        for pattern, target, status in self.patterns:
+            yield '~{}\t{}\t{}\n'.format(pattern.pattern, target, status)
+
+
+# Matches a url regex without special characters, such as ^old/path/$
+_LITERAL_REGEX = re.compile(r'^\^((?:[^\\.^$*+?{}\[\]|()]|\\\W)*)\$$')
+# RedirectView url placeholders, such as %(pk)s
+_PLACEHOLDER = re.compile(r'%\((\w+)\)s')
+
+
+def _redirect_view_arguments(view):
+    """The as_view() arguments of a RedirectView function, or None."""
+    # django 1.8 keeps the class and its arguments only in the closure.
+    cells = [cell.cell_contents for cell in view.__closure__ or ()]
+    view_classes = [
+        cell for cell in cells
+        if isinstance(cell, type) and issubclass(cell, RedirectView)]
+    arguments = [cell for cell in cells if isinstance(cell, dict)]
+    if not view_classes:
+        return None
+    view_class = view_classes[0]
+    options = dict(
+        (name, getattr(view_class, name))
+        for name in ('url', 'pattern_name', 'permanent'))
+    options.update(arguments[0] if arguments else {})
+    return options
+
+
+def _redirect_from_pattern(regex, view):
+    """(source, target, status) for a url pattern with a RedirectView."""
+    options = _redirect_view_arguments(view)
+    if options is None:
+        raise InvalidRedirect('not a RedirectView')
+    literal = _LITERAL_REGEX.match(regex)
+    if literal:
+        source = '/' + re.sub(r'\\(.)', r'\1', literal.group(1))
+    elif regex.startswith('^'):
+        source = '~^/' + regex[1:]
+    else:
+        source = '~^/.*?' + regex
+    status = PERMANENT if options['permanent'] is not False else FOUND
+    if options['url']:
+        target = _PLACEHOLDER.sub(r'\\g<\1>', options['url'])
+        target = target.replace('%%', '%')
+        if literal and target != options['url'].replace('%%', '%'):
+            raise InvalidRedirect('placeholders in target of a plain path')
+    elif options['pattern_name']:
+        if not literal:
+            raise InvalidRedirect('pattern_name needs a plain path')
+        target = reverse(options['pattern_name'])
+    else:
+        target, status = '-', GONE
+    if re.search(r'\s', source + target):
+        raise InvalidRedirect('whitespace in redirect')
+    return source, target, status
+
+
+def table_from_urlpatterns(urlpatterns, prefix=''):
+    """
+    Redirect table from url patterns with RedirectViews. Patterns that
+    can't be converted are listed in errors.
+    """
+    table = RedirectTable()
+    for pattern in urlpatterns:
+        regex = pattern.regex.pattern
+        if prefix and regex.startswith('^'):
+            regex = regex[1:]  # continues where the prefix ends
+        regex = prefix + regex
+        if isinstance(pattern, RegexURLResolver):
+            included = table_from_urlpatterns(pattern.url_patterns, regex)
+            table.exact.update(included.exact)
+            table.patterns.extend(included.patterns)
+            table.errors.extend(included.errors)
+            continue
+        try:
+            table.add(*_redirect_from_pattern(regex, pattern.callback))
+        except InvalidRedirect as err:
+            table.errors.append('{} {}: {}'.format(
+                regex, pattern.name or '', err))
+    return table
+
+
+class ReverseOnlyResolver(RegexURLResolver):
+
+    """Url patterns that can be reversed, but never resolve a request."""
+
+    def resolve(self, path):
+        raise Resolver404({'path': path, 'tried': []})
+
+
+_loaded_table = {'mtime': None, 'checked': 0, 'table': RedirectTable()}
+
+
+def redirect_table():
+    """
+    The redirect table. The file is checked for changes at most every
+    CHECK_INTERVAL seconds, and only read again when it has changed.
+    """
+    now = time.time()
+    if now - _loaded_table['checked'] < CHECK_INTERVAL:
+        return _loaded_table['table']
+    _loaded_table['checked'] = now
+    try:
+        mtime = os.path.getmtime(settings.REDIRECTS_FILE)
+    except OSError:
+        return _loaded_table['table']
+    if mtime != _loaded_table['mtime']:
+        # Set first, so a file that can't be read is not retried every time.
+        _loaded_table['mtime'] = mtime
+        try:
+            with io.open(settings.REDIRECTS_FILE, encoding='utf8') as lines:
+                table = RedirectTable.from_lines(lines)
+        except (IOError, UnicodeDecodeError):
+            logger.exception('could not read %s', settings.REDIRECTS_FILE)
+        else:
+            for error in table.errors:
+                logger.warning('%s %s', settings.REDIRECTS_FILE, error)
+            _loaded_table['table'] = table
+    return _loaded_table['table']
+
+
+class LegacyRedirectMiddleware(object):
+
+    """Redirect legacy urls before url resolution and other middleware."""
+
+    def process_request(self, request):
+        found = redirect_table().lookup(request.path)
+        if found is None:
+            return None
+        target, status = found
+        if status == GONE:
+            return HttpResponseGone()
+        query = request.META.get('QUERY_STRING')
+        if query and '?' not in target:
+            target = '{}?{}'.format(target, query)
+        if status == PERMANENT:
+            return HttpResponsePermanentRedirect(target)
+        response = HttpResponseRedirect(target)
+        response.status_code = status
+        return response
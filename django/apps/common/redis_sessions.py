@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Session engine backed by redis.
+
+Sessions are stored in SESSION_REDIS_DB, separate from the cache and the
+thumbnail key value store, so flushing the cache does not log anyone out.
+Every session operation is a single redis round trip: ``SET`` with ``EX``
+and ``NX`` writes the data, sets the expiry and checks for key collisions
+at once, where the database backend needs a select and an insert or update.
+
+Use it with ``SESSION_ENGINE = 'apps.common.redis_sessions'``.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError, SessionBase
+from django.utils.encoding import force_text
+
+KEY_PREFIX = 'session:'
+
+_connection_pool = []
+
+
+def redis_connection():
+    import redis
+    if not _connection_pool:
+        _connection_pool.append(
+            redis.ConnectionPool(db=settings.SESSION_REDIS_DB))
+    return redis.StrictRedis(connection_pool=_connection_pool[0])
+
+
+class SessionStore(SessionBase):
+
+    def __init__(self, session_key=None):
+        super(SessionStore, self).__init__(session_key)
+        self.redis = redis_connection()
+
+    def _redis_key(self, session_key=None):
+        return KEY_PREFIX + (session_key or self._get_or_create_session_key())
+
+    def load(self):
+        if self.session_key is None:
+            self._session_key = None
+            return {}
+        data = self.redis.get(self._redis_key(self.session_key))
+        if data is None:
+            # Expired or unknown session key.
+            self._session_key = None
+            return {}
+        return self.decode(force_text(data))
+
+    def exists(self, session_key):
+        return bool(self.redis.exists(self._redis_key(session_key)))
+
+    def create(self):
+        while True:
+            self._session_key = self._get_new_session_key()
+            try:
+                self.save(must_create=True)
+            except CreateError:
+                continue  # key collision, try another key
+            self.modified = True
+            return
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self.encode(self._get_session(no_load=must_create))
+        stored = self.redis.set(
+            self._redis_key(), data,
+            ex=self.get_expiry_age(), nx=must_create)
+        if must_create and not stored:
+            raise CreateError
+
+    def delete(self, session_key=None):
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self.redis.delete(self._redis_key(session_key))
+
+    @classmethod
+    def clear_expired(cls):
+        # Redis removes expired sessions by itself.
+        pass
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Full text search with postgresql.
+
+Searchable models are listed in SEARCH_MODELS. A ``SearchEntry`` is saved
+for each object, and postgresql keeps its ``search_vector`` up to date, so
+a search is a single query against a GIN index instead of a scan of every
+story. Only the ``MAX_CANDIDATES`` newest matches are ranked, so a common
+word doesn't rank every entry in the table. Results are paged by fetching
+one row more than the page size, so the matches are only counted if a
+template asks for the total.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.paginator import Page, Paginator
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponse
+from django.template.response import TemplateResponse
+from django.utils.functional import cached_property
+
+from .apps import installed_models
+from .models import SearchEntry
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'norwegian'
+PAGE_SIZE = 20
+MAX_PAGE = 50
+MAX_CANDIDATES = PAGE_SIZE * MAX_PAGE  # matches to rank per search
+
+# The inner query picks the MAX_CANDIDATES newest matches, by entry id,
+# and only those are ranked. Sorting the matching ids is cheap compared to
+# ranking, which reads every search vector. When a query matches more
+# entries than that, the best of the newest matches are shown, and the
+# result is the same for every page.
+MATCHES_SQL = """
+SELECT entry.id, entry.content_type_id, entry.object_id, entry.title,
+       entry.description, entry.url, entry.search_vector, query
+FROM common_searchentry entry, plainto_tsquery(%s, %s) query
+WHERE entry.search_vector @@ query
+ORDER BY entry.id DESC
+LIMIT %s
+"""
+
+SEARCH_SQL = """
+SELECT id, content_type_id, object_id, title, description, url,
+       ts_rank_cd(search_vector, query) AS rank
+FROM ({matches}) candidate
+ORDER BY rank DESC, id
+LIMIT %s OFFSET %s
+""".format(matches=MATCHES_SQL)
+
+COUNT_SQL = 'SELECT count(*) FROM ({matches}) candidate'.format(
+    matches=MATCHES_SQL)
+
+_registry = {}  # model -> field names for title, description and content
+
+
+def register(model, title, description='', content=''):
+    """Keep search entries for a model updated when it is saved."""
+    _registry[model] = (title, description, content)
+    post_save.connect(_changed, sender=model, weak=False)
+    post_delete.connect(_changed, sender=model, weak=False)
+
+
+def register_search_models():
+    """Register the models in SEARCH_MODELS that are installed."""
+    for label, fields in settings.SEARCH_MODELS.items():
+        for model in installed_models([label]):
+            register(model, **fields)
+
+
+def _text(instance, field):
+    if not field:
+        return ''
+    value = getattr(instance, field)
+    return '{}'.format(value() if callable(value) else value)
+
+
+def _entry_fields(instance):
+    title, description, content = _registry[type(instance)]
+    url = getattr(instance, 'get_absolute_url', lambda: '')()
+    return {
+        'title': _text(instance, title),
+        'description': _text(instance, description),
+        'content': _text(instance, content),
+        'url': url,
+    }
+
+
+def save_entry(content_type_id, object_id, fields=None):
+    """Save the search entry for an object, or delete it if fields is None."""
+    if fields is None:
+        SearchEntry.objects.filter(
+            content_type_id=content_type_id, object_id=object_id).delete()
+    else:
+        SearchEntry.objects.update_or_create(
+            content_type_id=content_type_id, object_id=object_id,
+            defaults=fields)
+
+
+def update_entry(content_type_id, object_id):
+    """Save the search entry for an object from its current database row."""
+    model = ContentType.objects.get_for_id(content_type_id).model_class()
+    instance = model._default_manager.filter(pk=object_id).first()
+    fields = None if instance is None else _entry_fields(instance)
+    save_entry(content_type_id, object_id, fields)
+
+
+# The entry is written by a background task, which is queued when the
+# transaction is committed and reads the current row. Only the ids are sent,
+# so a task that runs late can not overwrite a newer entry with old fields.
+def _changed(sender, instance, **kwargs):
+    from .celery import delay_on_commit
+    from .tasks import update_search_entry
+    delay_on_commit(
+        update_search_entry,
+        ContentType.objects.get_for_model(sender).pk, instance.pk)
+
+
+def count_matches(query):
+    """Number of entries matching a query, up to MAX_CANDIDATES."""
+    if not query.strip():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(COUNT_SQL, [SEARCH_CONFIG, query, MAX_CANDIDATES])
+        return cursor.fetchone()[0]
+
+
+class SearchPaginator(Paginator):
+
+    """
+    Paginator for a search query. The matches are only counted when
+    ``count`` or ``num_pages`` is used.
+    """
+
+    def __init__(self, query, per_page=PAGE_SIZE):
+        super(SearchPaginator, self).__init__([], per_page)
+        self.query = query
+
+    @cached_property
+    def count(self):
+        if connection.vendor != 'postgresql':
+            return 0
+        return count_matches(self.query)
+
+
+class SearchPage(Page):
+
+    """
+    A page of search results. Works like a django Page, but whether there
+    is a next page is known without counting the matches.
+    """
+
+    def __init__(self, results, number, has_next, paginator):
+        super(SearchPage, self).__init__(results, number, paginator)
+        self.results = results
+        self._has_next = has_next
+
+    def __repr__(self):
+        return '<SearchPage {}>'.format(self.number)
+
+    def has_next(self):
+        return self._has_next
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
+
+    def start_index(self):
+        if not self.results:
+            return 0
+        return self.paginator.per_page * (self.number - 1) + 1
+
+    def end_index(self):
+        return self.start_index() + max(0, len(self.results) - 1)
+
+
+def search(query, page=1, page_size=PAGE_SIZE):
+    """Search entries ranked by relevance. Returns a SearchPage."""
+    page = max(1, min(page, MAX_PAGE))
+    paginator = SearchPaginator(query, page_size)
+    if not query.strip():
+        return SearchPage([], page, False, paginator)
+    rows = list(SearchEntry.objects.raw(SEARCH_SQL, [
+        SEARCH_CONFIG, query, MAX_CANDIDATES,
+        page_size + 1, (page - 1) * page_size]))
+    return SearchPage(
+        rows[:page_size], page, len(rows) > page_size, paginator)
+
+
+def reindex(model, batch_size=500):
+    """
+    Rebuild search entries for a model in batches. Yields the number of
+    objects indexed after each batch. Entries for objects that no longer
+    exist are deleted.
+    """
+    content_type = ContentType.objects.get_for_model(model)
+    entries = SearchEntry.objects.filter(content_type=content_type)
+    done = 0
+    last_pk = 0
+    while True:
+        batch = list(
+            model.objects.filter(pk__gt=last_pk).order_by('pk')[:batch_size])
+        if not batch:
+            break
+        # Every entry in the batch's pk range is replaced, including
+        # entries for deleted objects between the batch's pks.
+        first_pk, last_pk = last_pk, batch[-1].pk
+        with transaction.atomic():
+            entries.filter(
+                object_id__gt=first_pk, object_id__lte=last_pk).delete()
+            SearchEntry.objects.bulk_create([
+                SearchEntry(
+                    content_type=content_type, object_id=instance.pk,
+                    **_entry_fields(instance))
+                for instance in batch])
+        done += len(batch)
+        yield done
+    entries.filter(object_id__gt=last_pk).delete()
+
+
+def _search_page(request):
+    query = request.GET.get('q', '')
+    try:
+        page_number = int(request.GET.get('page', 1))
+    except ValueError:
+        page_number = 1
+    if connection.vendor != 'postgresql':
+        logger.warning('full text search needs postgresql')
+        return query, search('', page_number)
+    return query, search(query, page_number)
+
+
+def search_view(request):
+    """
+    Search results page. The context has the same names as the old watson
+    view. ``paginator.count`` and ``num_pages`` count the matches, so the
+    template should avoid them unless the total is needed.
+    """
+    query, page = _search_page(request)
+    return TemplateResponse(request, 'watson/search.html', {
+        'query': query,
+        'search_results': page.results,
+        'object_list': page.results,
+        'page_obj': page,
+        'paginator': page.paginator,
+        'is_paginated': page.has_other_pages(),
+    })
+
+
+def search_json(request):
+    """Json search results, in the same format as the old watson view."""
+    query, page = _search_page(request)
+    data = {'results': [{
+        'title': entry.title,
+        'description': entry.description,
+        'url': entry.url,
+    } for entry in page.results]}
+    return HttpResponse(json.dumps(data), content_type='application/json')
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""Site search. Uses the 'watson' namespace, like the search it replaced."""
+from django.conf.urls import url
+
+from .search import search_json, search_view
+
+urlpatterns = [
+    url(r'^$', search_view, name='search'),
+    url(r'^json/$', search_json, name='search_json'),
+]
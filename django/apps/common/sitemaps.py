@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Sitemaps for search engines.
+
+Each model in SITEMAPS is split into chunks by primary key range, so a
+chunk never has more than ``CHUNK_SIZE`` urls and its address stays the
+same as the table grows. A chunk is streamed while it is read from the
+database in keyset batches, and the finished document is cached.
+Saving or deleting an object only invalidates the chunk it belongs to.
+"""
+import calendar
+import time
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.db.models import Max
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .apps import installed_models
+from .pagination import KeysetPaginator
+from .publication import publication_stamp
+
+CHUNK_SIZE = 50000  # the most urls allowed in one sitemap file
+BATCH_SIZE = 2000  # rows per database query
+SITEMAP_CACHE_TIMEOUT = 60 * 60 * 24
+CONTENT_TYPE = 'application/xml; charset=utf-8'
+
+HEADER = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<{tag} xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n')
+FOOTER = '</{tag}>\n'
+
+
+def _model(name):
+    try:
+        label, lastmod_field = settings.SITEMAPS[name]
+    except KeyError:
+        raise Http404('No sitemap named {}'.format(name))
+    for model in installed_models([label]):
+        return model, lastmod_field
+    raise Http404('Model {} is not installed'.format(label))
+
+
+def _queryset(model):
+    manager = model._default_manager
+    return getattr(manager, 'published', manager.all)()
+
+
+def _chunk_queryset(model, chunk):
+    return _queryset(model).filter(
+        pk__gte=chunk * CHUNK_SIZE, pk__lt=(chunk + 1) * CHUNK_SIZE)
+
+
+def _chunk_of(pk):
+    return int(pk) // CHUNK_SIZE
+
+
+def _stamp_key(name, chunk):
+    return 'sitemap-stamp:{}:{}'.format(name, chunk)
+
+
+def touch_chunk(name, chunk):
+    stamp = time.time()
+    cache.set(_stamp_key(name, chunk), stamp, None)
+    return stamp
+
+
+def _timestamp(value):
+    """Unix timestamp of a date or datetime."""
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value, timezone.utc)
+    return calendar.timegm(value.utctimetuple())
+
+
+def _last_modified(name, chunk):
+    """
+    Newest lastmod value of the objects in a chunk, or the publication
+    stamp if the sitemap has no lastmod field.
+    """
+    model, lastmod_field = _model(name)
+    if lastmod_field:
+        lastmod = _chunk_queryset(model, chunk).aggregate(
+            last=Max(lastmod_field))['last']
+        if lastmod is not None:
+            return _timestamp(lastmod)
+    return publication_stamp()
+
+
+def chunk_stamp(name, chunk):
+    """Unix timestamp of the last change to objects in a chunk."""
+    key = _stamp_key(name, chunk)
+    stamp = cache.get(key)
+    if stamp is None:
+        # Not changed since the cache was cleared.
+        stamp = _last_modified(name, chunk)
+        cache.set(key, stamp, None)
+    return stamp
+
+
+def _isoformat(stamp):
+    return datetime.fromtimestamp(int(stamp), timezone.utc).isoformat()
+
+
+def connect_sitemap_signals():
+    """Invalidate the chunk of an object when it is saved or deleted."""
+    from django.db.models.signals import post_delete, post_save
+    for name, (label, _) in settings.SITEMAPS.items():
+        for model in installed_models([label]):
+
+            def changed(instance, name=name, **kwargs):
+                touch_chunk(name, _chunk_of(instance.pk))
+
+            post_save.connect(changed, sender=model, weak=False)
+            post_delete.connect(changed, sender=model, weak=False)
+
+
+def sitemap_chunks():
+    """Yield (name, chunk) for every sitemap file."""
+    for name in sorted(settings.SITEMAPS):
+        try:
+            model, _ = _model(name)
+        except Http404:
+            continue
+        last_pk = _queryset(model).aggregate(last=Max('pk'))['last']
+        if last_pk is not None:
+            for chunk in range(_chunk_of(last_pk) + 1):
+                yield name, chunk
+
+
+def url_entries(name, chunk, base_url):
+    """Yield <url> elements for the objects in a chunk."""
+    model, lastmod_field = _model(name)
+    queryset = _chunk_queryset(model, chunk)
+    for instance in KeysetPaginator(queryset, ['pk'], BATCH_SIZE):
+        entry = '<url><loc>{}</loc>'.format(
+            escape(base_url + instance.get_absolute_url()))
+        lastmod = lastmod_field and getattr(instance, lastmod_field)
+        if lastmod:
+            entry += '<lastmod>{}</lastmod>'.format(lastmod.isoformat())
+        yield entry + '</url>\n'
+
+
+def _base_url(request):
+    return request.build_absolute_uri('/').rstrip('/')
+
+
+def _index_etag(request):
+    return 'sitemap-{:x}'.format(int(publication_stamp() * 1000))
+
+
+def _chunk_etag(request, name, chunk):
+    if name not in settings.SITEMAPS:
+        return None
+    return 'sitemap-{}-{}-{:x}'.format(
+        name, chunk, int(chunk_stamp(name, int(chunk)) * 1000))
+
+
+@condition(etag_func=_index_etag)
+def sitemap_index(request):
+    """Sitemap index that lists every chunk."""
+    base_url = _base_url(request)
+    cache_key = 'sitemap-index:{}:{}'.format(base_url, publication_stamp())
+    content = cache.get(cache_key)
+    if content is None:
+        parts = [HEADER.format(tag='sitemapindex')]
+        for name, chunk in sitemap_chunks():
+            location = base_url + reverse(
+                'sitemap_chunk', kwargs={'name': name, 'chunk': chunk})
+            lastmod = _isoformat(chunk_stamp(name, chunk))
+            parts.append(
+                '<sitemap><loc>{}</loc><lastmod>{}</lastmod></sitemap>\n'
+                .format(escape(location), lastmod))
+        parts.append(FOOTER.format(tag='sitemapindex'))
+        content = ''.join(parts)
+        cache.set(cache_key, content, SITEMAP_CACHE_TIMEOUT)
+    return HttpResponse(content, content_type=CONTENT_TYPE)
+
+
+@condition(etag_func=_chunk_etag)
+def sitemap_chunk(request, name, chunk):
+    """One sitemap file. Streamed the first time, then served from cache."""
+    chunk = int(chunk)
+    _model(name)
+    base_url = _base_url(request)
+    cache_key = 'sitemap:{}:{}:{}:{}'.format(
+        base_url, name, chunk, chunk_stamp(name, chunk))
+    content = cache.get(cache_key)
+    if content is not None:
+        return HttpResponse(content, content_type=CONTENT_TYPE)
+
+    def stream():
+        parts = [HEADER.format(tag='urlset')]
+        yield parts[0]
+        for entry in url_entries(name, chunk, base_url):
+            parts.append(entry)
+            yield entry
+        parts.append(FOOTER.format(tag='urlset'))
+        yield parts[-1]
+        # Only a complete document is cached.
+        cache.set(cache_key, ''.join(parts), SITEMAP_CACHE_TIMEOUT)
+
+    return StreamingHttpResponse(stream(), content_type=CONTENT_TYPE)
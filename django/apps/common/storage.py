@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Amazon S3 storage with streaming, parallel multipart uploads.
+
+Files are read one part at a time and parts are uploaded from a thread pool,
+so memory use is bounded by the part size times the number of upload
+threads, no matter how large the file is. Failed parts are retried on their
+own. Set AWS_S3_ENDPOINT_URL to use a local S3 compatible server in tests.
+Files are stored with a content type guessed from the name and with the
+AWS_DEFAULT_ACL access control, public-read by default, like the
+django-storages backend this replaced.
+"""
+import binascii
+import hashlib
+import logging
+import mimetypes
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import Storage
+from django.utils.deconstruct import deconstructible
+
+logger = logging.getLogger(__name__)
+
+
+def multipart_etag(part_digests):
+    """The etag S3 gives a multipart upload, from the md5 digests of parts."""
+    if len(part_digests) == 1:
+        return binascii.hexlify(part_digests[0]).decode('ascii')
+    combined = hashlib.md5(b''.join(part_digests)).hexdigest()
+    return '{}-{}'.format(combined, len(part_digests))
+
+
+class UploadError(IOError):
+    pass
+
+
+DEFAULT_CONTENT_TYPE = 'application/octet-stream'
+
+
+@deconstructible
+class MultipartS3Storage(Storage):
+
+    location = ''
+
+    def __init__(self, bucket_name=None, location=None, part_size=None,
+                 upload_threads=4, retries=3):
+        self.bucket_name = bucket_name or settings.AWS_STORAGE_BUCKET_NAME
+        if location is not None:
+            self.location = location
+        # Parts must be at least 5 MB. Changing the part size changes the
+        # etags of files larger than one part.
+        self.part_size = part_size or settings.AWS_S3_FILE_BUFFER_SIZE
+        self.upload_threads = upload_threads
+        self.retries = retries
+        self.default_acl = getattr(settings, 'AWS_DEFAULT_ACL', 'public-read')
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import boto3
+            self._client = boto3.client(
+                's3',
+                endpoint_url=getattr(settings, 'AWS_S3_ENDPOINT_URL', None),
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+            )
+        return self._client
+
+    def _key(self, name):
+        return '/'.join(part for part in [self.location, name] if part)
+
+    def _object_parameters(self, name):
+        """Content type and access control for a new object."""
+        content_type = mimetypes.guess_type(name)[0] or DEFAULT_CONTENT_TYPE
+        return {'ContentType': content_type, 'ACL': self.default_acl}
+
+    def _retry(self, function, **kwargs):
+        for attempt in range(self.retries + 1):
+            try:
+                return function(**kwargs)
+            except Exception as err:
+                if attempt == self.retries:
+                    raise
+                logger.warning('retrying s3 request: %s', err)
+                time.sleep(2 ** attempt)
+
+    def _save(self, name, content):
+        key = self._key(name)
+        content.seek(0)
+        first_part = content.read(self.part_size)
+        if len(first_part) < self.part_size:
+            digest = hashlib.md5(first_part).digest()
+            response = self._retry(
+                self.client.put_object, Bucket=self.bucket_name, Key=key,
+                Body=first_part, **self._object_parameters(name))
+            self._check_etag(response, [digest], key)
+        else:
+            self._multipart_upload(name, key, content, first_part)
+        return name
+
+    def _multipart_upload(self, name, key, content, first_part):
+        upload_id = self.client.create_multipart_upload(
+            Bucket=self.bucket_name, Key=key,
+            **self._object_parameters(name))['UploadId']
+        # Limits how many parts are held in memory at the same time.
+        slots = threading.BoundedSemaphore(self.upload_threads + 1)
+        digests, futures = [], []
+
+        def upload_part(number, data):
+            try:
+                return self._retry(
+                    self.client.upload_part,
+                    Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+                    PartNumber=number, Body=data)['ETag']
+            finally:
+                slots.release()
+
+        try:
+            with ThreadPoolExecutor(self.upload_threads) as executor:
+                data, number = first_part, 1
+                while data:
+                    slots.acquire()
+                    if any(future.done() and future.exception()
+                           for future in futures):
+                        break  # no point in uploading the rest
+                    digests.append(hashlib.md5(data).digest())
+                    futures.append(executor.submit(upload_part, number, data))
+                    data, number = content.read(self.part_size), number + 1
+            parts = [
+                {'PartNumber': number, 'ETag': future.result()}
+                for number, future in enumerate(futures, 1)]
+            response = self.client.complete_multipart_upload(
+                Bucket=self.bucket_name, Key=key, UploadId=upload_id,
+                MultipartUpload={'Parts': parts})
+        except Exception:
+            self.client.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+            raise
+        self._check_etag(response, digests, key)
+
+    def _check_etag(self, response, digests, key):
+        if response.get('ServerSideEncryption') == 'aws:kms':
+            return  # the etag of a kms encrypted object is not an md5 digest
+        etag = response['ETag']
+        expected = multipart_etag(digests)
+        if etag.strip('"') != expected:
+            raise UploadError('etag mismatch for {}: {} != {}'.format(
+                key, etag, expected))
+
+    def _open(self, name, mode='rb'):
+        response = self.client.get_object(
+            Bucket=self.bucket_name, Key=self._key(name))
+        return File(response['Body'], name=name)
+
+    def _head(self, name):
+        from botocore.exceptions import ClientError
+        try:
+            return self.client.head_object(
+                Bucket=self.bucket_name, Key=self._key(name))
+        except ClientError as err:
+            if err.response['Error']['Code'] in ('404', 'NoSuchKey'):
+                return None
+            raise
+
+    def exists(self, name):
+        return self._head(name) is not None
+
+    def delete(self, name):
+        self.client.delete_object(Bucket=self.bucket_name, Key=self._key(name))
+
+    def size(self, name):
+        return self._head(name)['ContentLength']
+
+    def modified_time(self, name):
+        return self._head(name)['LastModified']
+
+    def url(self, name):
+        return 'http://{host}/{key}'.format(
+            host=settings.AWS_S3_CUSTOM_DOMAIN, key=self._key(name))
+
+
+class MediaStorage(MultipartS3Storage):
+    location = 'media'
+
+
+class StaticStorage(MultipartS3Storage):
+    location = 'static'
+
+
+class ThumbStorage(MultipartS3Storage):
+    location = 'media'
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Queue depth, latency and run time for background tasks.
+
+Metrics are stored in the broker's redis database. Latency is the time from
+a task is due until a worker starts it, so the countdown of a retry is not
+counted. The most recent samples for each queue are kept in capped lists.
+Metrics are never allowed to break queueing or running a task, so redis
+errors are only logged.
+"""
+import logging
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger('celery')
+
+SAMPLES = 1000  # samples of latency and run time to keep per queue
+# Time each task is due, deleted when it starts. Expires for tasks that
+# never start.
+ENQUEUED_KEY = 'metrics:enqueued:{}'
+ENQUEUED_TIMEOUT = 60 * 60 * 24
+
+_connection_pool = []
+
+
+def redis_connection():
+    import redis
+    if not _connection_pool:
+        _connection_pool.append(
+            redis.ConnectionPool.from_url(settings.BROKER_URL))
+    return redis.StrictRedis(connection_pool=_connection_pool[0])
+
+
+def _key(queue, name):
+    return 'metrics:{}:{}'.format(queue, name)
+
+
+def _ignore_redis_errors(function):
+    def wrapper(*args, **kwargs):
+        import redis
+        try:
+            return function(*args, **kwargs)
+        except redis.RedisError as err:
+            logger.warning('could not record task metrics: %s', err)
+    return wrapper
+
+
+@_ignore_redis_errors
+def enqueued(task_id, due=None):
+    """Record when a task is due to run. Defaults to now."""
+    redis_connection().set(
+        ENQUEUED_KEY.format(task_id), due or time.time(),
+        ex=ENQUEUED_TIMEOUT + int(max(0, (due or 0) - time.time())))
+
+
+@_ignore_redis_errors
+def started(queue, task_id):
+    connection = redis_connection()
+    pipe = connection.pipeline()
+    pipe.get(ENQUEUED_KEY.format(task_id))
+    pipe.delete(ENQUEUED_KEY.format(task_id))
+    due = pipe.execute()[0]
+    if due is not None:
+        _add_sample(connection.pipeline(), queue, 'latency',
+                    max(0, time.time() - float(due))).execute()
+
+
+@_ignore_redis_errors
+def finished(queue, seconds, status):
+    pipe = redis_connection().pipeline()
+    _add_sample(pipe, queue, 'runtime', seconds)
+    pipe.hincrby(_key(queue, 'count'), status, 1)
+    pipe.execute()
+
+
+def _add_sample(pipe, queue, name, value):
+    key = _key(queue, name)
+    pipe.lpush(key, value)
+    pipe.ltrim(key, 0, SAMPLES - 1)
+    return pipe
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def queue_stats(queues):
+    """Dictionary of queue name -> depth, task counts and timings"""
+    connection = redis_connection()
+    pipe = connection.pipeline()
+    for queue in queues:
+        # The redis transport keeps the messages of a queue in a list.
+        pipe.llen(queue)
+        pipe.hgetall(_key(queue, 'count'))
+        pipe.lrange(_key(queue, 'latency'), 0, -1)
+        pipe.lrange(_key(queue, 'runtime'), 0, -1)
+    results = pipe.execute()
+    stats = {}
+    for index, queue in enumerate(queues):
+        depth, counts, latency, runtime = results[index * 4:index * 4 + 4]
+        latency = [float(value) for value in latency]
+        runtime = [float(value) for value in runtime]
+        stats[queue] = {
+            'depth': depth,
+            'counts': dict(
+                (key.decode(), int(value)) for key, value in counts.items()),
+            'latency_p50': percentile(latency, .5),
+            'latency_p95': percentile(latency, .95),
+            'runtime_p50': percentile(runtime, .5),
+            'runtime_p95': percentile(runtime, .95),
+        }
+    return stats
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Background tasks.
+
+Tasks on the ``media`` queue start their own process pools, so that queue
+is served by a worker using the ``solo`` pool.
+
+Tasks on the ``media`` and ``sync`` queues can run for longer than the
+broker's visibility timeout. With late acks, redis would then deliver them
+to another worker while they are still running, so they are acknowledged
+when they start instead. The periodic ones run again on the next schedule
+if a worker dies.
+"""
+from __future__ import absolute_import
+
+import logging
+
+from .celery import QueueTask, app
+
+logger = logging.getLogger('celery')
+
+
+@app.task(base=QueueTask, queue='media', acks_late=False)
+def index_pdfs(force=False):
+    """Update the pdf archive index with new and changed files."""
+    from django.conf import settings
+    from .pdf_index import PdfIndex
+    index = PdfIndex().load()
+    changed, removed = index.update(
+        processes=settings.CELERY_MEDIA_PROCESSES, force=force)
+    index.save()
+    logger.info('indexed %d and removed %d pdf files',
+                len(changed), len(removed))
+    return len(changed)
+
+
+@app.task(base=QueueTask, queue='media', acks_late=False)
+def index_byline_photos(force=False):
+    """Update the byline photo index with new and changed photos."""
+    from .byline_photos import BylinePhotoIndex
+    index = BylinePhotoIndex().load()
+    indexed = index.update(force=force)
+    if indexed is not None:
+        index.save()
+    return indexed
+
+
+@app.task(base=QueueTask, queue='media', acks_late=False)
+def ingest_photos(limit=None):
+    """Import new photos from the staging folder."""
+    from django.conf import settings
+    from .photo_ingest import PhotoIngest
+    stats = PhotoIngest(processes=settings.CELERY_MEDIA_PROCESSES).run(limit)
+    logger.info('imported {imported} of {new} new photos'.format(**stats))
+    return stats
+
+
+@app.task(base=QueueTask, queue='media', acks_late=False)
+def make_thumbnail(name, geometry, **options):
+    """Create a thumbnail ahead of the first request that needs it."""
+    from sorl.thumbnail import get_thumbnail
+    return get_thumbnail(name, geometry, **options).name
+
+
+@app.task(base=QueueTask, queue='sync', acks_late=False)
+def sync_legacy(limit=None):
+    """Copy changes from the legacy prodsys database."""
+    from .legacy_sync import sync_tables
+    return sync_tables(limit=limit)
+
+
+@app.task(base=QueueTask, queue='sync', acks_late=False)
+def reindex_search(model_label, batch_size=500):
+    """Rebuild search entries for a model."""
+    from django.apps import apps
+    from .search import reindex
+    done = 0
+    for done in reindex(apps.get_model(model_label), batch_size):
+        pass
+    return done
+
+
+@app.task(base=QueueTask)
+def update_search_entry(content_type_id, object_id):
+    """Save the search entry for an object, or delete it if it is gone."""
+    from .search import update_entry
+    update_entry(content_type_id, object_id)
+
+
+@app.task(base=QueueTask)
+def update_autocomplete(name, pk):
+    """Update an autocomplete item, or remove it if it is not published."""
+    from .autocomplete import update_autocomplete_item
+    update_autocomplete_item(name, pk)
+
+
+@app.task(base=QueueTask)
+def build_autocomplete_index(name):
+    """Rebuild one autocomplete index from the database."""
+    from .autocomplete import rebuild_autocomplete_index
+    return rebuild_autocomplete_index(name)
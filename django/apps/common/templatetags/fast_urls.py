@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+{% fast_url %} works like {% url %}, but uses a precomputed table.
+Use it for links repeated many times on a page, such as article links in
+the listing templates, in place of {% url %}.
+
+    {% load fast_urls %}
+    {% fast_url 'article' section=section story_id=story.pk slug=story.slug %}
+"""
+from django import template
+
+from apps.common.url_map import fast_reverse
+
+register = template.Library()
+
+
+@register.simple_tag
+def fast_url(name, *args, **kwargs):
+    return fast_reverse(name, *args, **kwargs)
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Test runner that shards tests across processes and reports slow tests.
+
+The test database is created and migrated once in the main process. Worker
+processes are forked afterwards, so each gets its own copy of the migrated
+in-memory database and local memory cache without migrating again. Where
+processes can't be forked, the tests run in a single process.
+"""
+import multiprocessing
+import time
+import unittest
+import warnings
+from collections import OrderedDict
+
+from django.test.runner import DebugSQLTextTestResult, DiscoverRunner
+from django.utils.six import StringIO
+
+# Shards are set before forking, so workers can find them by index
+# without pickling test cases.
+_shards = []
+
+
+class TimingMixin(object):
+
+    """Test result mixin that records how long each test took."""
+
+    def __init__(self, *args, **kwargs):
+        super(TimingMixin, self).__init__(*args, **kwargs)
+        self.timings = []
+
+    def startTest(self, test):
+        self._started = time.time()
+        super(TimingMixin, self).startTest(test)
+
+    def stopTest(self, test):
+        super(TimingMixin, self).stopTest(test)
+        self.timings.append((test.id(), time.time() - self._started))
+
+
+class TimedTextTestResult(TimingMixin, unittest.TextTestResult):
+    pass
+
+
+class TimedDebugSQLTextTestResult(TimingMixin, DebugSQLTextTestResult):
+    pass
+
+
+def timed_result_class(debug_sql=False):
+    """The result class DiscoverRunner would use, with timings."""
+    return TimedDebugSQLTextTestResult if debug_sql else TimedTextTestResult
+
+
+def fork_context():
+    """
+    Multiprocessing context that forks, or None if forking is not possible.
+    Workers must be forked to inherit the shards and the test database.
+    """
+    get_context = getattr(multiprocessing, 'get_context', None)
+    if get_context is None:  # python 2 always forks
+        return multiprocessing
+    try:
+        return get_context('fork')
+    except ValueError:
+        return None
+
+
+class ShardResult(unittest.TestResult):
+
+    """Combined results from worker processes."""
+
+    def __init__(self):
+        super(ShardResult, self).__init__()
+        self.timings = []
+
+    def add_shard(self, shard):
+        self.testsRun += shard['tests_run']
+        self.failures.extend(shard['failures'])
+        self.errors.extend(shard['errors'])
+        self.skipped.extend(shard['skipped'])
+        self.timings.extend(shard['timings'])
+
+
+def _problems(problems):
+    # Debug sql results add the logged queries after the traceback.
+    return [(problem[0].id(), '\n'.join(problem[1:])) for problem in problems]
+
+
+def _run_shard(index, verbosity, failfast, debug_sql):
+    """Run one shard of tests in a worker process."""
+    stream = StringIO()
+    runner = unittest.TextTestRunner(
+        stream=stream, verbosity=verbosity, failfast=failfast,
+        resultclass=timed_result_class(debug_sql))
+    result = runner.run(_shards[index])
+    return {
+        'tests_run': result.testsRun,
+        'failures': _problems(result.failures),
+        'errors': _problems(result.errors),
+        'skipped': [(test.id(), reason) for test, reason in result.skipped],
+        'timings': result.timings,
+        'output': stream.getvalue(),
+    }
+
+
+def _flatten(suite):
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            for subtest in _flatten(test):
+                yield subtest
+        else:
+            yield test
+
+
+def make_shards(suite, count):
+    """
+    Split a suite into shards of roughly equal size. Tests from the same
+    TestCase class stay together, since they can share class level fixtures.
+    """
+    groups = OrderedDict()
+    for test in _flatten(suite):
+        groups.setdefault(type(test), []).append(test)
+    shards = [[] for _ in range(count)]
+    for tests in sorted(groups.values(), key=len, reverse=True):
+        min(shards, key=len).extend(tests)
+    return [unittest.TestSuite(tests) for tests in shards if tests]
+
+
+class ParallelTestRunner(DiscoverRunner):
+
+    """Run tests in parallel processes and list the slowest tests."""
+
+    def __init__(self, processes=None, slowest=10, **kwargs):
+        super(ParallelTestRunner, self).__init__(**kwargs)
+        self.processes = processes or multiprocessing.cpu_count()
+        self.slowest = slowest
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super(ParallelTestRunner, cls).add_arguments(parser)
+        parser.add_argument(
+            '--processes', type=int, default=None,
+            help='Number of test processes. Defaults to the cpu count.')
+        parser.add_argument(
+            '--slowest', type=int, default=10,
+            help='Number of slow tests to list.')
+
+    def run_suite(self, suite, **kwargs):
+        context = fork_context()
+        if context is None and self.processes > 1:
+            warnings.warn('Processes can not be forked. Running tests in a '
+                          'single process.')
+        if context is None or self.processes < 2 or (
+                suite.countTestCases() < 2):
+            result = self.test_runner(
+                verbosity=self.verbosity, failfast=self.failfast,
+                resultclass=timed_result_class(self.debug_sql),
+            ).run(suite)
+        else:
+            result = self._run_parallel(suite, context)
+        self._report_timings(result.timings)
+        return result
+
+    def _run_parallel(self, suite, context):
+        _shards[:] = make_shards(suite, self.processes)
+        pool = context.Pool(len(_shards))
+        try:
+            pending = [
+                pool.apply_async(_run_shard, (
+                    index, self.verbosity, self.failfast, self.debug_sql))
+                for index in range(len(_shards))]
+            shards = [job.get() for job in pending]
+        finally:
+            pool.close()
+            pool.join()
+            _shards[:] = []
+
+        result = ShardResult()
+        for shard in shards:
+            print(shard['output'])
+            result.add_shard(shard)
+        print('Ran {} tests in {} processes: {} failures, {} errors'.format(
+            result.testsRun, len(shards),
+            len(result.failures), len(result.errors)))
+        return result
+
+    def _report_timings(self, timings):
+        if not self.slowest or not timings:
+            return
+        print('\nSlowest tests:')
+        slowest = sorted(timings, key=lambda item: item[1], reverse=True)
+        for test_id, seconds in slowest[:self.slowest]:
+            print('{:8.3f}s  {}'.format(seconds, test_id))
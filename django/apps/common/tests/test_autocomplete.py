@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from apps.common import autocomplete
+from apps.common.autocomplete import PrefixIndex, update_autocomplete_item
+
+
+class PrefixIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        self.index = PrefixIndex('test')
+        # More items share the prefix "hansen" than one batch holds.
+        for pk in range(1, 191):
+            first_name = 'Ola' if pk % 19 == 0 else 'Kari'
+            self.index.add(pk, '{} Hansen {}'.format(first_name, pk))
+
+    def test_prefix(self):
+        self.assertEqual(self.index.search('kar', limit=3), [
+            (1, 'Kari Hansen 1'), (10, 'Kari Hansen 10'),
+            (100, 'Kari Hansen 100')])
+
+    def test_several_words_beyond_the_first_batch(self):
+        expected = [(pk, 'Ola Hansen {}'.format(pk))
+                    for pk in range(19, 191, 19)]
+        self.assertEqual(
+            sorted(self.index.search('ola hansen', limit=20)), expected)
+        self.assertEqual(
+            sorted(self.index.search('hansen ola', limit=20)), expected)
+
+    def test_limit(self):
+        self.assertEqual(len(self.index.search('hansen ola', limit=4)), 4)
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search('per hansen'), [])
+
+    def test_update_label(self):
+        self.index.add(19, 'Per Olsen')
+        self.assertEqual(self.index.search('per'), [(19, 'Per Olsen')])
+        self.assertNotIn((19, 'Ola Hansen 19'), self.index.search('ola'))
+
+    def test_evicts_lowest_pk_when_full(self):
+        index = PrefixIndex('test', max_items=2)
+        for pk in (3, 4, 5):
+            index.add(pk, 'sak {}'.format(pk))
+        index.add(1, 'sak 1')  # older than everything in the index
+        self.assertEqual(
+            sorted(index.search('sak')), [(4, 'sak 4'), (5, 'sak 5')])
+
+
+class UpdateItemTests(TestCase):
+
+    def setUp(self):
+        self.index = PrefixIndex('test')
+        autocomplete._indexes.clear()
+        autocomplete._indexes['brukere'] = (
+            'auth.User', 'username', self.index)
+        self.addCleanup(autocomplete._indexes.clear)
+
+    def test_reads_current_row(self):
+        user = User.objects.create(username='kari')
+        update_autocomplete_item('brukere', user.pk)
+        User.objects.filter(pk=user.pk).update(username='ola')
+        update_autocomplete_item('brukere', user.pk)
+        self.assertEqual(self.index.search('ola'), [(user.pk, 'ola')])
+        self.assertEqual(self.index.search('kari'), [])
+
+    def test_removes_deleted_object(self):
+        pk = User.objects.create(username='kari').pk
+        update_autocomplete_item('brukere', pk)
+        User.objects.filter(pk=pk).delete()
+        update_autocomplete_item('brukere', pk)
+        self.assertEqual(self.index.search('kari'), [])
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from apps.common.byline_photos import BylinePhotoIndex, name_tokens
+
+
+def _index(*filenames):
+    index = BylinePhotoIndex(folder='/photos', index_file='/dev/null')
+    for number, filename in enumerate(filenames, 1):
+        index.photos[filename] = {
+            'mtime': 0,
+            'tokens': name_tokens(os.path.splitext(filename)[0]),
+            'width': 100 * number,
+            'height': 100 * number,
+        }
+    index._build_token_index()
+    return index
+
+
+class NameTokensTests(SimpleTestCase):
+
+    def test_norwegian_letters_and_ignored_words(self):
+        self.assertEqual(
+            name_tokens('Bjørn Ærlig-Ås byline 2015'), ['bjorn', 'aerlig', 'as'])
+
+
+class MatchTests(SimpleTestCase):
+
+    def test_exact_name(self):
+        index = _index('ola-nordmann.jpg', 'kari-hansen.jpg')
+        self.assertEqual(index.match('Kari Hansen'), '/photos/kari-hansen.jpg')
+
+    def test_same_first_name_is_not_a_match(self):
+        index = _index('ola-nordmann.jpg')
+        self.assertIsNone(index.match('Ola Hansen'))
+
+    def test_same_surname_is_not_a_match(self):
+        index = _index('kari-hansen.jpg')
+        self.assertIsNone(index.match('Ola Hansen'))
+
+    def test_middle_name_is_optional(self):
+        index = _index('ola-hansen.jpg')
+        self.assertEqual(
+            index.match('Ola Nordmann Hansen'), '/photos/ola-hansen.jpg')
+
+    def test_prefers_file_without_extra_names(self):
+        index = _index('ola-hansen.jpg', 'ola-per-hansen-og-kari.jpg')
+        self.assertEqual(index.match('Ola Hansen'), '/photos/ola-hansen.jpg')
+
+    def test_prefers_larger_image(self):
+        index = _index('ola-hansen.jpg', 'ola-hansen-byline.png')
+        self.assertEqual(
+            index.match('Ola Hansen'), '/photos/ola-hansen-byline.png')
+
+    def test_no_name(self):
+        self.assertIsNone(_index('ola-hansen.jpg').match('2015'))
+
+
+class UpdateTests(SimpleTestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.index = BylinePhotoIndex(
+            folder=self.folder,
+            index_file=os.path.join(self.folder, 'index.json'))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write_photo(self, filename, mtime):
+        path = os.path.join(self.folder, filename)
+        with open(path, 'wb') as photo:
+            photo.write(b'not really an image')
+        os.utime(path, (mtime, mtime))
+
+    def test_new_changed_and_removed_files(self):
+        self.write_photo('ola-hansen.jpg', 1000)
+        self.write_photo('notes.txt', 1000)
+        self.assertEqual(self.index.update(), 1)
+        self.assertIsNone(self.index.update())
+
+        # Replaced in place. The folder mtime does not change.
+        folder_mtime = os.path.getmtime(self.folder)
+        self.write_photo('ola-hansen.jpg', 2000)
+        os.utime(self.folder, (folder_mtime, folder_mtime))
+        self.assertEqual(self.index.update(), 1)
+
+        os.remove(os.path.join(self.folder, 'ola-hansen.jpg'))
+        self.assertEqual(self.index.update(), 0)
+        self.assertIsNone(self.index.match('Ola Hansen'))
+
+    def test_save_and_load(self):
+        self.write_photo('kari-hansen.jpg', 1000)
+        self.index.update()
+        self.index.save()
+        loaded = BylinePhotoIndex(
+            folder=self.folder, index_file=self.index.index_file).load()
+        self.assertEqual(loaded.photos, self.index.photos)
+        self.assertTrue(loaded.match('Kari Hansen'))
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase
+
+from apps.common.fuzzy_index import (
+    ModelSlugIndex, SlugIndex, linear_closest, normalize, normalize_title)
+
+SLUGS = [
+    (1, 'studentparlamentet-vedtok-nytt-budsjett', 'Studentparlamentet '
+        'vedtok nytt budsjett'),
+    (2, 'kantinen-hever-prisene', 'Kantinen hever prisene'),
+    (3, 'rektor-gar-av', 'Rektor går av'),
+    (4, 'budsjett', 'Budsjett 2015/2016'),
+]
+
+
+class NormalizeTests(SimpleTestCase):
+
+    def test_path_uses_last_segment(self):
+        self.assertEqual(normalize('/nyheter/Rektor_Går AV/'), 'rektor_går-av')
+
+    def test_title_keeps_words_around_slashes(self):
+        self.assertEqual(
+            normalize_title('Budsjett 2015/2016'), 'budsjett-2015-2016')
+
+
+class SlugIndexTests(SimpleTestCase):
+
+    def setUp(self):
+        self.index = SlugIndex()
+        for key, slug, title in SLUGS:
+            self.index.add(key, slug, title)
+
+    def test_exact_slug(self):
+        self.assertEqual(self.index.closest('kantinen-hever-prisene'), 2)
+
+    def test_typo(self):
+        self.assertEqual(self.index.closest('kantinen-hevr-prisne'), 2)
+
+    def test_truncated_url(self):
+        self.assertEqual(
+            self.index.closest('/nyheter/studentparlamentet-vedtok-ny'), 1)
+
+    def test_title_similarity(self):
+        self.assertEqual(self.index.closest('budsjett-2015'), 4)
+
+    def test_nothing_similar(self):
+        self.assertIsNone(self.index.closest('xyzzy-qwerty'))
+
+    def test_empty_slug(self):
+        self.assertIsNone(self.index.closest('/'))
+
+    def test_remove(self):
+        self.index.remove(2)
+        self.assertNotEqual(self.index.closest('kantinen-hever-prisene'), 2)
+        self.assertEqual(len(self.index), 3)
+
+    def test_same_as_linear_scan_for_typos(self):
+        items = [(key, slug) for key, slug, _ in SLUGS]
+        for slug in ['rektor-gaar-av', 'kantinen-hever-prisen']:
+            self.assertEqual(
+                self.index.closest(slug), linear_closest(items, slug))
+
+    def test_lookups_do_not_grow_the_index(self):
+        grams = len(self.index.grams)
+        for number in range(100):
+            self.index.closest('ukjent-side-{}'.format(number))
+        self.assertEqual(len(self.index.grams), grams)
+
+    def test_remove_forgets_trigrams(self):
+        for key, _, _ in SLUGS:
+            self.index.remove(key)
+        self.assertEqual(dict(self.index.grams), {})
+        self.assertEqual(dict(self.index.slugs), {})
+
+
+class ModelSlugIndexTests(SimpleTestCase):
+
+    def test_changes_during_rebuild_are_kept(self):
+        model_index = ModelSlugIndex(User.objects.all(), 'username')
+        model_index.index = SlugIndex()
+
+        def build_index():
+            # Saved while the rebuild reads the table.
+            model_index._change(5, ('ny-sak', 'Ny sak'))
+            model_index._change(2)
+            index = SlugIndex()
+            index.add(2, 'kantinen-hever-prisene')
+            return index
+
+        model_index._build_index = build_index
+        model_index._rebuilding.acquire()
+        model_index._rebuild()
+        self.assertEqual(model_index.index.closest('ny-sak'), 5)
+        self.assertNotIn(2, model_index.index.items)
+        self.assertIsNone(model_index._pending)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+
+from django.db import connection
+from django.test import TestCase
+
+from apps.common.legacy_sync import SyncState, TableSync
+
+
+class TableSyncTests(TestCase):
+
+    """Sync between two tables in the sqlite test database."""
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE legacy_sak '
+                '(id integer PRIMARY KEY, tittel text, endret text)')
+            cursor.execute(
+                'CREATE TABLE sak (id integer PRIMARY KEY, title text)')
+        self.insert('legacy_sak', [
+            (1, 'første', '2015-01-01 10:00:00'),
+            (2, 'andre', '2015-01-01 10:00:00'),
+            (3, 'uten dato', None),
+            (4, 'tredje', '2015-01-02 10:00:00'),
+        ])
+        folder = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        self.state = SyncState(os.path.join(folder, 'state.json'))
+        self.sync = TableSync(
+            'sak', 'legacy_sak', 'sak', key='id', modified='endret',
+            columns={'id': 'id', 'tittel': 'title'},
+            source='default', batch_size=2)
+
+    def insert(self, table, rows):
+        with connection.cursor() as cursor:
+            for row in rows:
+                cursor.execute(
+                    'INSERT OR REPLACE INTO {} VALUES ({})'.format(
+                        table, ', '.join(['%s'] * len(row))), row)
+
+    def titles(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT id, title FROM sak ORDER BY id')
+            return cursor.fetchall()
+
+    def test_sync_and_upsert(self):
+        stats = self.sync.run(self.state)
+        self.assertEqual(stats['written'], 3)
+        self.assertEqual(
+            self.titles(), [(1, 'første'), (2, 'andre'), (4, 'tredje')])
+        self.assertEqual(
+            self.state.load().tables['sak'],
+            {'modified': '2015-01-02 10:00:00', 'key': 4})
+
+        self.insert('legacy_sak', [(2, 'endret', '2015-01-03 10:00:00')])
+        stats = self.sync.run(self.state)
+        self.assertEqual(stats['read'], 1)
+        self.assertEqual(
+            self.titles(), [(1, 'første'), (2, 'endret'), (4, 'tredje')])
+
+    def test_nothing_new(self):
+        self.sync.run(self.state)
+        self.assertEqual(self.sync.run(self.state)['read'], 0)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+from django.contrib import messages
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from apps.common.middleware import SessionOnDemandMiddleware
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies',
+    SESSION_PATHS=['/admin/'])
+class SessionOnDemandMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.middleware = SessionOnDemandMiddleware()
+        self.factory = RequestFactory()
+
+    def response(self, view, path='/sak/'):
+        request = self.factory.get(path)
+        self.middleware.process_request(request)
+        return request, self.middleware.process_response(
+            request, view(request))
+
+    def test_anonymous_reader_gets_an_empty_session(self):
+        def view(request):
+            return HttpResponse(request.session.get('besøkt', 'nei'))
+        request, response = self.response(view)
+        self.assertFalse(request.user.is_authenticated())
+        self.assertEqual(response.content, b'nei')
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+        self.assertEqual(response.cookies, {})
+
+    def test_session_is_saved_when_changed(self):
+        def view(request):
+            request.session['besøkt'] = True
+            return HttpResponse()
+        _, response = self.response(view)
+        self.assertIn('sessionid', response.cookies)
+
+    def test_messages_work(self):
+        def view(request):
+            messages.add_message(request, messages.INFO, 'Takk')
+            return HttpResponse()
+        _, response = self.response(view)
+        self.assertIn('messages', response.cookies)
+
+    def test_session_paths_get_the_full_middleware(self):
+        request, response = self.response(
+            lambda request: HttpResponse(), '/admin/')
+        self.assertFalse(hasattr(request, 'session_on_demand'))
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import base64
+import json
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+
+from apps.common.pagination import (
+    InvalidCursor, KeysetPaginator, decode_cursor, encode_cursor)
+
+
+def _cursor(values):
+    data = json.dumps(values).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii')
+
+
+class CursorTests(SimpleTestCase):
+
+    def test_round_trip(self):
+        values = ['2015-01-02T03:04:05', 42]
+        self.assertEqual(decode_cursor(encode_cursor(values)), values)
+
+    def test_garbage(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor('ikke en cursor')
+
+    def test_not_a_list(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(_cursor(42))
+
+    def test_null_value(self):
+        with self.assertRaises(InvalidCursor):
+            decode_cursor(_cursor([None, 1]))
+
+    def test_wrong_length(self):
+        paginator = KeysetPaginator(
+            User.objects.all(), ['-date_joined', '-pk'])
+        with self.assertRaises(InvalidCursor):
+            paginator._after([1])
+
+
+class KeysetPaginatorTests(TestCase):
+
+    def setUp(self):
+        for number in range(5):
+            User.objects.create(username='bruker{}'.format(number))
+        self.paginator = KeysetPaginator(User.objects.all(), ['pk'], 2)
+
+    def test_pages(self):
+        usernames = []
+        cursor = None
+        while True:
+            page = self.paginator.page(cursor)
+            usernames.extend(user.username for user in page.items)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(
+            usernames, ['bruker{}'.format(number) for number in range(5)])
+
+    def test_wrong_type(self):
+        with self.assertRaises(InvalidCursor):
+            self.paginator.page(_cursor(['x']))
+
+    def test_wrong_type_for_date(self):
+        paginator = KeysetPaginator(User.objects.all(), ['date_joined', 'pk'])
+        with self.assertRaises(InvalidCursor):
+            paginator.page(_cursor(['ikke en dato', 1]))
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from apps.common.publication import (
+    next_scheduled_publication, publication_stamp)
+
+
+@override_settings(PUBLICATION_SCHEDULE={'auth.User': 'date_joined'})
+class PublicationStampTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def test_nothing_scheduled(self):
+        User.objects.create(username='publisert')
+        self.assertIsNone(next_scheduled_publication())
+        self.assertEqual(publication_stamp(), publication_stamp())
+
+    def test_stamp_changes_when_scheduled_time_has_passed(self):
+        soon = timezone.now() + timedelta(seconds=1)
+        User.objects.create(username='planlagt', date_joined=soon)
+        stamp = publication_stamp()
+        self.assertEqual(publication_stamp(), stamp)
+        time.sleep(1.1)
+        self.assertGreater(publication_stamp(), stamp)
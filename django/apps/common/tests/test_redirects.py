@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import shutil
+import tempfile
+
+from django.conf.urls import include, url
+from django.core.urlresolvers import Resolver404, resolve, reverse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.views.generic import RedirectView
+
+from apps.common import redirects
+from apps.common.redirects import (
+    InvalidRedirect, LegacyRedirectMiddleware, RedirectTable,
+    ReverseOnlyResolver, table_from_urlpatterns)
+
+REDIRECT_LINES = """
+# comment
+/gammel/side/   /ny/side/
+/midlertidig/   /annen/     302
+/fjernet/       -           410
+~^/sak/(\\d+)/   /\\1/        301
+"""
+
+LEGACY_URLS = [
+    url(r'^gammel/side\.html$',
+        RedirectView.as_view(url='/ny/side/', permanent=True), name='side'),
+    url(r'^sak/(?P<pk>\d+)/$',
+        RedirectView.as_view(url='/%(pk)s/', permanent=False), name='sak'),
+    url(r'^fjernet/$', RedirectView.as_view(url=None), name='fjernet'),
+    url(r'^arkiv/', include([
+        url(r'^(?P<year>\d{4})/$',
+            RedirectView.as_view(url='/utgaver/%(year)s/'), name='arkiv'),
+    ])),
+]
+
+urlpatterns = [
+    ReverseOnlyResolver(r'^', LEGACY_URLS, namespace='redirect'),
+]
+
+
+class RedirectTableTests(SimpleTestCase):
+
+    def setUp(self):
+        self.table = RedirectTable.from_lines(REDIRECT_LINES.splitlines())
+
+    def test_exact_paths_ignore_trailing_slash(self):
+        self.assertEqual(self.table.lookup('/gammel/side'), ('/ny/side/', 301))
+        self.assertEqual(
+            self.table.lookup('/gammel/side/'), ('/ny/side/', 301))
+
+    def test_pattern(self):
+        self.assertEqual(self.table.lookup('/sak/123/'), ('/123/', 301))
+
+    def test_no_match(self):
+        self.assertIsNone(self.table.lookup('/ukjent/'))
+
+    def test_invalid_lines_are_skipped(self):
+        table = RedirectTable.from_lines([
+            '/a/ /b/ abc\n',
+            '/c/ /d/ 999\n',
+            '~^/e/(\\d+ /f/\n',
+            '/g/ /h/\n',
+        ])
+        self.assertEqual(len(table), 1)
+        self.assertEqual(len(table.errors), 3)
+        self.assertEqual(table.lookup('/g/'), ('/h/', 301))
+
+    def test_add_rejects_unknown_status(self):
+        with self.assertRaises(InvalidRedirect):
+            self.table.add('/x/', '/y/', 200)
+
+    def test_bad_group_reference_is_not_a_match(self):
+        table = RedirectTable.from_lines(['~^/p/(\\d+)/ /q/\\2/'])
+        self.assertIsNone(table.lookup('/p/1/'))
+
+    def test_lines_round_trip(self):
+        table = RedirectTable.from_lines(self.table.to_lines())
+        self.assertEqual(table.exact, self.table.exact)
+        self.assertEqual(len(table.patterns), len(self.table.patterns))
+
+
+class LegacyRedirectMiddlewareTests(SimpleTestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.filename = os.path.join(self.folder, 'redirects.txt')
+        with io.open(self.filename, 'w', encoding='utf8') as redirects_file:
+            redirects_file.write(REDIRECT_LINES)
+        self.settings = override_settings(REDIRECTS_FILE=self.filename)
+        self.settings.enable()
+        redirects._loaded_table['mtime'] = None
+        redirects._loaded_table['checked'] = 0
+        self.middleware = LegacyRedirectMiddleware()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.folder)
+
+    def response(self, path):
+        return self.middleware.process_request(self.factory.get(path))
+
+    def test_permanent_redirect_keeps_query_string(self):
+        response = self.response('/gammel/side/?side=2')
+        self.assertEqual(response.status_code, 301)
+        self.assertEqual(response['Location'], '/ny/side/?side=2')
+
+    def test_status_is_kept(self):
+        self.assertEqual(self.response('/midlertidig/').status_code, 302)
+        self.assertEqual(self.response('/fjernet/').status_code, 410)
+
+    def test_unknown_path_passes_through(self):
+        self.assertIsNone(self.response('/ukjent/'))
+
+    def test_file_with_invalid_lines_still_loads(self):
+        with io.open(self.filename, 'a', encoding='utf8') as redirects_file:
+            redirects_file.write(u'/broken/ /x/ nope\n~^/bad(/ /y/\n')
+        os.utime(self.filename, (0, 0))
+        self.assertEqual(self.response('/gammel/side/').status_code, 301)
+
+
+class UrlPatternExportTests(SimpleTestCase):
+
+    def setUp(self):
+        self.table = table_from_urlpatterns(LEGACY_URLS, '^')
+
+    def test_plain_path(self):
+        self.assertEqual(self.table.errors, [])
+        self.assertEqual(
+            self.table.lookup('/gammel/side.html'), ('/ny/side/', 301))
+
+    def test_named_groups(self):
+        self.assertEqual(self.table.lookup('/sak/12/'), ('/12/', 302))
+        self.assertEqual(
+            self.table.lookup('/arkiv/2015/'), ('/utgaver/2015/', 301))
+
+    def test_gone(self):
+        self.assertEqual(self.table.lookup('/fjernet/'), ('-', 410))
+
+    def test_other_views_are_errors(self):
+        table = table_from_urlpatterns(
+            [url(r'^x/$', lambda request: None, name='x')], '^')
+        self.assertEqual(len(table.errors), 1)
+
+    def test_lines_round_trip(self):
+        table = RedirectTable.from_lines(self.table.to_lines())
+        self.assertEqual(table.errors, [])
+        self.assertEqual(table.lookup('/sak/12/'), ('/12/', 302))
+
+
+@override_settings(ROOT_URLCONF='apps.common.tests.test_redirects')
+class ReverseOnlyResolverTests(SimpleTestCase):
+
+    def test_reverse(self):
+        self.assertEqual(reverse('redirect:side'), '/gammel/side.html')
+        self.assertEqual(reverse('redirect:sak', args=[12]), '/sak/12/')
+
+    def test_never_resolves(self):
+        with self.assertRaises(Resolver404):
+            resolve('/sak/12/')
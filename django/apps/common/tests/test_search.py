@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.test import SimpleTestCase, TestCase
+
+from apps.common import search
+from apps.common.models import SearchEntry
+from apps.common.search import SearchPage, SearchPaginator, reindex
+
+
+class ReindexTests(TestCase):
+
+    def setUp(self):
+        search._registry[User] = ('username', '', '')
+        self.addCleanup(search._registry.pop, User)
+        for number in range(1, 6):
+            User.objects.create(pk=number, username='bruker{}'.format(number))
+        content_type = ContentType.objects.get_for_model(User)
+        for pk in (1, 3, 99):
+            SearchEntry.objects.create(
+                content_type=content_type, object_id=pk, title='gammel')
+        User.objects.filter(pk=3).delete()
+
+    def test_replaces_and_prunes_entries(self):
+        self.assertEqual(list(reindex(User, batch_size=2)), [2, 4])
+        self.assertEqual(
+            list(SearchEntry.objects.order_by('object_id').values_list(
+                'object_id', 'title')),
+            [(1, 'bruker1'), (2, 'bruker2'), (4, 'bruker4'), (5, 'bruker5')])
+
+
+class SearchPageTests(SimpleTestCase):
+
+    def setUp(self):
+        self.paginator = SearchPaginator('sak', per_page=20)
+
+    def test_middle_page(self):
+        page = SearchPage(list(range(20)), 2, True, self.paginator)
+        self.assertTrue(page.has_next())
+        self.assertTrue(page.has_previous())
+        self.assertEqual(page.next_page_number(), 3)
+        self.assertEqual((page.start_index(), page.end_index()), (21, 40))
+
+    def test_last_page(self):
+        page = SearchPage(list(range(5)), 3, False, self.paginator)
+        self.assertFalse(page.has_next())
+        self.assertEqual((page.start_index(), page.end_index()), (41, 45))
+
+    def test_empty_page(self):
+        page = search.search('')
+        self.assertFalse(page.has_other_pages())
+        self.assertEqual((page.start_index(), page.end_index()), (0, 0))
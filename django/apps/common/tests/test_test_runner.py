@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from django.test import SimpleTestCase
+
+from apps.common.test_runner import make_shards
+
+
+def _test_case(name, count):
+    """A test case class with a number of empty tests."""
+    methods = dict(
+        ('test_{}'.format(number), lambda self: None)
+        for number in range(count))
+    return type(str(name), (unittest.TestCase,), methods)
+
+
+class MakeShardsTests(SimpleTestCase):
+
+    def setUp(self):
+        self.cases = [
+            _test_case('Small', 1), _test_case('Large', 3),
+            _test_case('Medium', 2)]
+        loader = unittest.TestLoader()
+        self.suite = unittest.TestSuite(
+            loader.loadTestsFromTestCase(case) for case in self.cases)
+
+    def test_classes_stay_together(self):
+        small, large, medium = self.cases
+        shards = make_shards(self.suite, 2)
+        classes = [set(type(test) for test in shard) for shard in shards]
+        self.assertEqual(classes, [{large}, {medium, small}])
+
+    def test_no_empty_shards(self):
+        shards = make_shards(self.suite, 10)
+        self.assertEqual(len(shards), 3)
+        self.assertEqual(sum(shard.countTestCases() for shard in shards), 6)
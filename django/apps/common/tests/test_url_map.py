@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from django.conf.urls import include, url
+from django.core.urlresolvers import NoReverseMatch, reverse
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from apps.common.url_map import fast_reverse, url_map
+
+
+def view(request, **kwargs):
+    return HttpResponse()
+
+
+section_urls = [
+    url(r'^(?P<story_id>\d+)/(?P<slug>[-\w]*)/$', view, name='article'),
+]
+
+urlpatterns = [
+    url(r'^$', view, name='home'),
+    url(r'^(?P<section>[-\w]+)/', include(section_urls)),
+    url(r'^sok/', include([url(r'^$', view, name='search')],
+                          namespace='search')),
+]
+
+class OtherUrls(object):
+    urlpatterns = [url(r'^forside/$', view, name='home')]
+
+ARTICLE_KWARGS = {'section': 'nyheter', 'story_id': 42, 'slug': 'æøå'}
+
+
+@override_settings(ROOT_URLCONF=__name__)
+class FastReverseTests(SimpleTestCase):
+
+    def test_same_as_reverse(self):
+        self.assertEqual(
+            fast_reverse('article', **ARTICLE_KWARGS),
+            reverse('article', kwargs=ARTICLE_KWARGS))
+        self.assertEqual(fast_reverse('search:search'), '/sok/')
+
+    def test_positional_arguments(self):
+        self.assertEqual(
+            fast_reverse('article', 'nyheter', 42, 'sak'),
+            '/nyheter/42/sak/')
+
+    def test_wrong_arguments(self):
+        with self.assertRaises(NoReverseMatch):
+            fast_reverse('article', section='nyheter')
+
+    def test_template_tag(self):
+        template = Template(
+            '{% load fast_urls %}'
+            '{% fast_url "article" section=s story_id=42 slug="sak" %}')
+        self.assertEqual(
+            template.render(Context({'s': 'kultur'})), '/kultur/42/sak/')
+
+    def test_table_follows_root_urlconf(self):
+        self.assertEqual(fast_reverse('home'), '/')
+        with self.settings(ROOT_URLCONF=OtherUrls):
+            self.assertEqual(fast_reverse('home'), '/forside/')
+        self.assertEqual(fast_reverse('home'), '/')
+
+    def test_url_map(self):
+        self.assertEqual(url_map()['article'],
+                         '/<section>/<story_id>/<slug>/')
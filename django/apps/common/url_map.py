@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Named urls from the root urlconf, for the frontend and for fast reversing.
+
+``url_map()`` walks the resolver once and lists every named url pattern.
+The same walk builds a table of format strings with ``regex_helper``, which
+``fast_reverse()`` uses to build urls without the regular expression
+matching that ``reverse()`` does for every call. That matters on listing
+pages that link to hundreds of articles. The table is for the root
+urlconf, and is built again when the ROOT_URLCONF setting is changed.
+"""
+import json
+import os
+
+from django.core.signals import setting_changed
+from django.core.urlresolvers import (
+    NoReverseMatch, RegexURLResolver, get_resolver, get_script_prefix)
+from django.utils import six
+from django.utils.http import RFC3986_SUBDELIMS, urlquote
+from django.utils.regex_helper import normalize
+
+SAFE_CHARACTERS = RFC3986_SUBDELIMS + str('/~:@')
+
+_table = {}  # name -> list of (format string, parameter names)
+
+
+def _strip(pattern):
+    return pattern[1:] if pattern.startswith('^') else pattern
+
+
+def walk_patterns(resolver=None, prefix='', namespace=''):
+    """Yield (name, full regex) for all named url patterns."""
+    resolver = resolver or get_resolver(None)
+    for pattern in resolver.url_patterns:
+        regex = prefix + _strip(pattern.regex.pattern)
+        if isinstance(pattern, RegexURLResolver):
+            child_namespace = namespace
+            if pattern.namespace:
+                child_namespace = namespace + pattern.namespace + ':'
+            for item in walk_patterns(pattern, regex, child_namespace):
+                yield item
+        elif pattern.name:
+            yield namespace + pattern.name, regex
+
+
+def url_map():
+    """Dictionary of url name -> readable url, like /section/<story_id>/"""
+    from django.contrib.admindocs.views import simplify_regex
+    urls = {}
+    for name, regex in walk_patterns():
+        if '<format>' in simplify_regex(regex):
+            continue
+        urls.setdefault(name, simplify_regex(regex))
+    return urls
+
+
+def export_url_map(filename):
+    """Write the url map as json. Returns False if the file was up to date."""
+    content = json.dumps(url_map(), indent=2, sort_keys=True) + '\n'
+    try:
+        with open(filename) as json_file:
+            if json_file.read() == content:
+                return False
+    except IOError:
+        pass
+    temp_file = filename + '.tmp'
+    with open(temp_file, 'w') as json_file:
+        json_file.write(content)
+    os.rename(temp_file, filename)
+    return True
+
+
+def reverse_table():
+    """Format strings for each url name. Built on first use."""
+    if not _table:
+        table = {}
+        for name, regex in walk_patterns():
+            for format_string, params in normalize('^' + regex):
+                table.setdefault(name, []).append(
+                    (format_string, frozenset(params), params))
+        _table.update(table)
+    return _table
+
+
+def _clear_table(setting, **kwargs):
+    if setting == 'ROOT_URLCONF':
+        _table.clear()
+
+
+setting_changed.connect(_clear_table)
+
+
+def fast_reverse(name, *args, **kwargs):
+    """
+    Url for a named pattern. Like ``reverse()``, but the arguments are not
+    checked against the pattern, so only use it with values that are known
+    to be valid, such as slugs and ids from the database.
+    """
+    for format_string, param_set, params in reverse_table().get(name, ()):
+        if args:
+            if len(args) != len(params):
+                continue
+            values = dict(zip(params, args))
+        elif param_set == set(kwargs):
+            values = kwargs
+        else:
+            continue
+        path = format_string % dict(
+            (key, six.text_type(value)) for key, value in values.items())
+        return urlquote(get_script_prefix() + path, safe=SAFE_CHARACTERS)
+    raise NoReverseMatch('No url named {} with arguments {} {}'.format(
+        name, args, kwargs))
@@ -3,24 +3,34 @@
 from django.conf.urls import include, url
 from django.contrib import admin
 from apps.core.views import RobotsTxtView, HumansTxtView
-from apps.search import urls as search_urls
 from apps.core.autocomplete_views import autocomplete_list
 from apps.frontpage.views import (
     frontpage_view, section_frontpage, storytype_frontpage, search_404_view)
 from apps.issues.views import PdfArchiveView, PubPlanView
 from apps.stories.views import article_view
 from apps.stories.feeds import LatestStories
-from autocomplete_light import urls as autocomplete_light_urls
 from .redirect_urls import urlpatterns as redirect_urls
+from .redirects import ReverseOnlyResolver
+from .feeds import cached_feed
+from .autocomplete import autocomplete_index_view
+from .sitemaps import sitemap_chunk, sitemap_index
 # from watson import urls as watson_urls
 
 from django.views.generic import TemplateView
 
-admin.autodiscover()
+
+def lazy_include(module, namespace=None, app_name=None):
+    """
+    Like include(), but the module is imported the first time a url is
+    resolved or reversed through it, instead of when this file is loaded.
+    include() imports dotted paths at once on django 1.8.
+    """
+    return module, app_name, namespace
+
 
 urlpatterns = [
     # RSS
-    url(r'^rss/$', LatestStories(), name='rss'),
+    url(r'^rss/$', cached_feed(LatestStories()), name='rss'),
 
     # Content
     url(r'^$', frontpage_view, name='frontpage'),
@@ -49,13 +59,20 @@ urlpatterns = [
     url(r'^admin/', include(admin.site.urls)),
     url(r'^robots.txt$', RobotsTxtView.as_view(), name='robots.txt'),
     url(r'^humans.txt$', HumansTxtView.as_view(), name='humans.txt'),
+    url(r'^sitemap\.xml$', sitemap_index, name='sitemap'),
+    url(r'^sitemap-(?P<name>[a-z]+)-(?P<chunk>\d+)\.xml$', sitemap_chunk,
+        name='sitemap_chunk'),
 
-    url(r'^autocomplete', include(autocomplete_light_urls)),
-    url(r'^autocomplete', include(autocomplete_light_urls)),
+    url(r'^autocomplete/index/(?P<name>[a-z]+)/$', autocomplete_index_view,
+        name='autocomplete_index'),
+    url(r'^autocomplete', lazy_include('autocomplete_light.urls')),
     url(r'^autocomplete/menu$', autocomplete_list, name='autocomplete_list'),
 
-    url(r'^search/', include(search_urls, namespace='watson')),
-    url(r'^', include(redirect_urls, namespace='redirect')),
+    url(r'^search/',
+        lazy_include('apps.common.search_urls', namespace='watson')),
+    # Legacy redirects are served from REDIRECTS_FILE by the middleware.
+    # These patterns only keep the names for reverse('redirect:...').
+    ReverseOnlyResolver(r'^', redirect_urls, namespace='redirect'),
 
     url(r'^(?P<section>[a-z0-9-]+)/(?P<story_id>\d+)/(?P<slug>[a-z0-9-]*)/?$',
         article_view, name='article'),
@@ -8,7 +8,12 @@ For more information on this file, see
 https://docs.djangoproject.com/en/1.6/howto/deployment/wsgi/
 """
 
-from raven.contrib.django.raven_compat.middleware.wsgi import Sentry
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
-application = Sentry(get_wsgi_application())
+application = get_wsgi_application()
+
+if settings.RAVEN_CONFIG.get('dsn'):
+    # Only pay for importing raven when sentry is actually configured.
+    from raven.contrib.django.raven_compat.middleware.wsgi import Sentry
+    application = Sentry(application)
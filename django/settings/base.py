@@ -1,13 +1,20 @@
 # -*- coding: utf-8 -*-
 """ Django settings for universitas_no project. """
 
+from datetime import timedelta
 from os.path import dirname
 import django.conf.global_settings as DEFAULT_SETTINGS
-from django.utils.translation import ugettext_lazy as _
 from utils.setting_helpers import (
     environment_variable, join_path, load_json_file)
 from .logging_settings import *
 
+
+def _(text):
+    # Dummy gettext. Importing the translation machinery from settings slows
+    # down startup, and makemessages still finds strings marked with _().
+    return text
+
+
 SITE_URL = environment_variable('SITE_URL')
 DEBUG = TEMPLATE_DEBUG = False
 ALLOWED_HOSTS = environment_variable('ALLOWED_HOSTS').split()
@@ -19,16 +26,20 @@ MEDIA_URL = "http://{host}/{media}/".format(
     host=AWS_S3_CUSTOM_DOMAIN, media=MEDIA_ROOT, )
 
 INSTALLED_APPS = [  # CUSTOM APPS
-
+    'apps.common',
 ]
 
 INSTALLED_APPS = [  # THIRD PARTY APPS
     'django_extensions',
     'sorl.thumbnail',
-    'raven.contrib.django.raven_compat',
     'storages',
 ] + INSTALLED_APPS
 
+if environment_variable('RAVEN_DSN'):
+    # The app registry imports raven at boot, so only add it when it is used.
+    INSTALLED_APPS.insert(
+        INSTALLED_APPS.index('storages'), 'raven.contrib.django.raven_compat')
+
 INSTALLED_APPS = [  # CORE APPS
     'django.contrib.admin',
     'django.contrib.auth',
@@ -39,11 +50,11 @@ INSTALLED_APPS = [  # CORE APPS
 ] + INSTALLED_APPS
 
 MIDDLEWARE_CLASSES = [
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'apps.common.redirects.LegacyRedirectMiddleware',
+    # Session, authentication and messages, skipped for anonymous readers.
+    'apps.common.middleware.SessionOnDemandMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
@@ -80,7 +91,10 @@ THUMBNAIL_URL_TIMEOUT = 3
 DATABASE_ROUTERS = ['apps.legacy_db.router.ProdsysRouter']
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        # Backend from django-transaction-hooks, so background tasks can be
+        # queued when a transaction is committed. Django 1.9+ has this built
+        # in, and should use 'django.db.backends.postgresql_psycopg2'.
+        'ENGINE': 'transaction_hooks.backends.postgresql_psycopg2',
         'NAME': environment_variable('DB_NAME'),
         'USER': environment_variable('DB_USER'),
         'PASSWORD': environment_variable('DB_PASSWORD'),
@@ -115,6 +129,86 @@ CACHES = {
     },
 }
 
+# SESSIONS
+SESSION_ENGINE = 'apps.common.redis_sessions'
+SESSION_REDIS_DB = 3
+# Requests to these paths always get a session, even without a cookie.
+SESSION_PATHS = ['/admin/', '/autocomplete']
+
+# Saving or deleting these models invalidates cached pages and feeds.
+PUBLICATION_MODELS = ['stories.Story', 'issues.Issue', 'issues.PrintIssue']
+# model: field with the time an object is published. Objects scheduled for
+# later invalidate cached pages and feeds when that time has passed.
+PUBLICATION_SCHEDULE = {'stories.Story': 'publication_date'}
+
+# AUTOCOMPLETE
+# index name: (model, field used as label)
+AUTOCOMPLETE_INDEXES = {
+    'contributor': ('contributors.Contributor', 'display_name'),
+    'story': ('stories.Story', 'title'),
+    'issue': ('issues.PrintIssue', 'issue_name'),
+}
+AUTOCOMPLETE_REDIS_DB = 2
+
+# SEARCH
+# model: fields used for search entry title, description and content
+SEARCH_MODELS = {
+    'stories.Story': {
+        'title': 'title', 'description': 'lede', 'content': 'bodytext_markup',
+    },
+}
+
+# SITEMAPS
+# name: (model, field with last modified time or None)
+SITEMAPS = {
+    'stories': ('stories.Story', None),
+}
+
+# LEGACY SYNC
+# Tables copied from the prodsys database by `sync_legacy`.
+# name: {
+#     'source_table': legacy table, 'target_table': postgres table,
+#     'key': primary key column, 'modified': last changed column,
+#     'columns': {legacy column: postgres column},
+#     'transform': optional dotted path to function(row) -> row or None,
+# }
+LEGACY_SYNC_TABLES = {}
+
+# CELERY
+BROKER_URL = 'redis://localhost:6379/4'
+# A task that is not acknowledged within the visibility timeout is sent to
+# another worker. Tasks on the media and sync queues can run for longer, so
+# they are acknowledged when they start. See apps/common/tasks.py
+BROKER_TRANSPORT_OPTIONS = {'visibility_timeout': 3600}
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+CELERY_IGNORE_RESULT = True
+CELERY_DEFAULT_QUEUE = 'default'
+# Each queue has its own worker. See config_tools/supervisor/template
+CELERY_TASK_QUEUES = ['default', 'media', 'sync']
+# Tasks are long, so workers should not reserve more than they are running.
+CELERY_ACKS_LATE = True
+CELERYD_PREFETCH_MULTIPLIER = 1
+CELERY_MEDIA_PROCESSES = 2  # pool size for pdf and photo processing tasks
+CELERYBEAT_SCHEDULE = {
+    'index-pdfs': {
+        'task': 'apps.common.tasks.index_pdfs',
+        'schedule': timedelta(minutes=15),
+    },
+    'index-byline-photos': {
+        'task': 'apps.common.tasks.index_byline_photos',
+        'schedule': timedelta(minutes=15),
+    },
+    'ingest-photos': {
+        'task': 'apps.common.tasks.ingest_photos',
+        'schedule': timedelta(minutes=5),
+    },
+    'sync-legacy': {
+        'task': 'apps.common.tasks.sync_legacy',
+        'schedule': timedelta(minutes=5),
+    },
+}
+
 # SENTRY
 RAVEN_CONFIG = {'dsn': environment_variable('RAVEN_DSN'), }
 SENTRY_CLIENT = 'raven.contrib.django.raven_compat.DjangoClient'
@@ -127,15 +221,18 @@ SENTRY_CLIENT = 'raven.contrib.django.raven_compat.DjangoClient'
 # AWS_S3_CUSTOM_DOMAIN = AWS_STORAGE_BUCKET_NAME  # cname
 # AWS_S3_SECURE_URLS = False
 # AWS_S3_USE_SSL = False
+# AWS_DEFAULT_ACL = 'public-read'
 # AWS_S3_FILE_BUFFER_SIZE = 5242880
 # Buffer size is used to calculate md5 hash for AWS mulitpart uploads
 # if changed, md5 hashes for large files might be wrong
+# Set endpoint to use a local S3 compatible server instead of amazon.
+# AWS_S3_ENDPOINT_URL = 'http://localhost:9000'
 
 STATIC_ROOT = 'static'
 MEDIA_ROOT = 'media'
-# STATICFILES_STORAGE = 'utils.aws_custom_storage.StaticStorage'
-# DEFAULT_FILE_STORAGE = 'utils.aws_custom_storage.MediaStorage'
-# THUMBNAIL_STORAGE = 'utils.aws_custom_storage.ThumbStorage'
+# STATICFILES_STORAGE = 'apps.common.storage.StaticStorage'
+# DEFAULT_FILE_STORAGE = 'apps.common.storage.MediaStorage'
+# THUMBNAIL_STORAGE = 'apps.common.storage.ThumbStorage'
 
 # FOLDERS
 # source code folder
@@ -157,7 +254,19 @@ FIXTURE_DIRS = [join_path(BASE_DIR, 'fixtures'), ]
 TEMPLATE_DIRS = [join_path(BASE_DIR, 'templates'), ]
 # Look for byline images here
 BYLINE_PHOTO_DIR = '/srv/fotoarkiv_universitas/byline/'
+BYLINE_PHOTO_INDEX = join_path(PROJECT_DIR, 'byline-photos.json')
 STAGING_ROOT = '/srv/fotoarkiv_universitas/'
+# Photo import from STAGING_ROOT with `ingest_photos`
+PHOTO_INGEST_JOURNAL = join_path(PROJECT_DIR, 'photo-ingest.jsonl')
+PHOTO_INGEST_MAX_SIZE = 2400  # pixels
+# Legacy url redirects. Use `import_redirects` to add more.
+REDIRECTS_FILE = join_path(BASE_DIR, 'redirects.txt')
+# Issue pdf files, and the precomputed index made by `index_pdfs`
+PDF_ARCHIVE_DIR = join_path(PROJECT_DIR, MEDIA_ROOT, 'pdf')
+PDF_INDEX_FILE = join_path(PROJECT_DIR, 'pdf-index.json.gz')
+PDF_TEXT_DIR = join_path(PROJECT_DIR, 'pdf-text')  # page text of each pdf
+# High-water marks for `sync_legacy`
+LEGACY_SYNC_STATE_FILE = join_path(PROJECT_DIR, 'legacy-sync.json')
 
 
 # INTERNATIONALIZATION
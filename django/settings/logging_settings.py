@@ -54,7 +54,10 @@ LOGGING['handlers'] = {
     'sentry': {
         'level': 'ERROR',
         'filters': ['require_debug_false'],
-        'class': 'raven.contrib.django.raven_compat.handlers.SentryHandler',
+        # Avoid importing raven at startup when there's no sentry dsn.
+        'class': (
+            'raven.contrib.django.raven_compat.handlers.SentryHandler'
+            if environment_variable('RAVEN_DSN') else 'logging.NullHandler'),
     },
     'console': {
         'filters': ['require_debug_true'],
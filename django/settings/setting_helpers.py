@@ -6,15 +6,40 @@ import logging
 logger = logging.getLogger(__name__)
 
 
+PREFIX = 'DJANGO_'
+_snapshot = {'environment': None}
+
+
+def _load_environment():
+    """
+    Read environment variables once. Values from the json file written at
+    deploy are used unless the same variable is set in the environment.
+    """
+    snapshot = {}
+    filename = os.environ.get(PREFIX + 'ENVIRONMENT_FILE')
+    if filename:
+        try:
+            with open(filename) as environment_fh:
+                snapshot.update(json.load(environment_fh))
+        except (IOError, ValueError) as err:
+            logger.warning('could not read environment file: %s', err)
+    snapshot.update(
+        (key, value) for key, value in os.environ.items()
+        if key.startswith(PREFIX))
+    return snapshot
+
+
 def environment_variable(keyname):
     """shortcut for getting environmental variables"""
     # To avoid commiting passwords and usernames to git and GitHub,
     # these settings are saved as environmental variables in a file called postactivate.
     # Postactivate is sourced when the virtual environment is activated.
-    if keyname.startswith('DJANGO_'):
-        keyname = keyname[7:]
-    keyname = 'DJANGO_{}'.format(keyname.upper().replace(' ', '_'))
-    return os.environ.get(keyname) or ''
+    if _snapshot['environment'] is None:
+        _snapshot['environment'] = _load_environment()
+    if keyname.startswith(PREFIX):
+        keyname = keyname[len(PREFIX):]
+    keyname = PREFIX + keyname.upper().replace(' ', '_')
+    return _snapshot['environment'].get(keyname) or ''
 
 
 def join_path(*paths):
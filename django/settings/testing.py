@@ -13,6 +13,24 @@ DATABASES = {
         "PORT": "",
     },
 }
+# The legacy prodsys database is not available in tests.
+DATABASE_ROUTERS = []
+
+# Each test process gets its own cache instead of sharing redis.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+THUMBNAIL_KVSTORE = 'sorl.thumbnail.kvstores.cached_db_kvstore.KVStore'
+SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
+# Run background tasks right away, without a broker.
+CELERY_ALWAYS_EAGER = True
+CELERY_EAGER_PROPAGATES_EXCEPTIONS = True
+
+# Run tests in parallel processes and report the slowest tests.
+# ./manage.py test --processes=4 --slowest=20
+TEST_RUNNER = 'apps.common.test_runner.ParallelTestRunner'
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 
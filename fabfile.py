@@ -1,6 +1,7 @@
 """Deployment of Django website using pyvenv-3.4 and git"""
 
 from __future__ import print_function
+import json
 import os
 from os.path import join, dirname
 from fabric.contrib.console import confirm
@@ -9,7 +10,8 @@ from fabric.context_managers import shell_env, cd, settings as env_settings
 from fabric.api import local, env, run, sudo, settings, task
 from fabric.utils import abort
 from fabtools.vagrant import vagrant
-from deployment_tools.generate_postactivate import make_postactivate_file
+from config_tools.generate_postactivate import (
+    make_environment_file, make_postactivate_file)
 
 # github repo used for deploying the site
 REPO_URL = ''
@@ -20,7 +22,31 @@ WEBSERVER_ROOT = '/srv'       # root folder for all websites on the webserver
 SITE_NAME = 'prodsys.no'    # the base host name for this project
 POSTGRESQL_USER = 'postgres'  # username for the postgresql database root user.
 
+# Gunicorn settings. Override per deploy with `fab --set gunicorn_<key>=value`
+GUNICORN_SETTINGS = {
+    'workers': None,          # None means size from cpu count and memory
+    'worker_class': 'gthread',  # 'sync', 'gthread' or 'gevent'
+    'threads': 4,             # threads per worker for the gthread class
+    'max_requests': 1000,     # recycle workers after this many requests
+    'max_requests_jitter': 100,  # avoid recycling all workers at once
+    'timeout': 30,
+    'keepalive': 5,
+}
+# Celery worker for each task queue. Override with `fab --set celery_<queue>=n`
+# The media tasks start their own process pools, which the prefork pool does
+# not allow, so they run one at a time in the solo pool.
+CELERY_WORKERS = {
+    'default': {'concurrency': 2, 'pool': 'prefork'},
+    'media': {'concurrency': 1, 'pool': 'solo'},
+    'sync': {'concurrency': 1, 'pool': 'solo'},
+}
+MICROCACHE_SECONDS = 5       # how long nginx caches pages for anonymous users
+WORKER_MEMORY_MB = 150        # expected memory use per gunicorn worker
+RESERVED_MEMORY_MB = 1024     # memory for postgres, redis, nginx and so on
+DEFAULT_WORKERS = 3           # gunicorn workers when the host is not asked
+
 env.site_url = 'vagrant.' + SITE_NAME
+env.microcache = False
 
 # Stops annoying linting error. "vagrant" is a command line task
 
@@ -39,6 +65,7 @@ def production_server():
     """run task on development server"""
     env.site_url = SITE_NAME
     env.hosts = [env.site_url]
+    env.microcache = True
 
 
 @task(name='staging')
@@ -55,6 +82,25 @@ def development_server():
     env.hosts = [env.site_url]
 
 
+@task
+def microcache(enabled='yes'):
+    """Enable or disable the nginx microcache. Use with update_config."""
+    env.microcache = enabled.lower() in ('yes', 'on', 'true', '1')
+    env.regenerate_configs = True
+
+
+@task(name='logs')
+def analyze_logs(window=60, top=20):
+    """Summarize nginx and django logs on the server."""
+    folders = _get_folders(env.site_url)
+    run(
+        '{venv}/bin/python {source}/config_tools/analyze_logs.py '
+        '{logs}/access-nginx.log* {logs}/error-django.log* '
+        '{logs}/debug-django.log* '
+        '--window {window} --top {top}'.format(
+            window=window, top=top, **folders))
+
+
 @task(name='notebook')
 def start_ipython_notebook():
     """start the ipython notebook"""
@@ -66,7 +112,8 @@ def start_runserver_plus():
     """Start a development webserver"""
     folders = _get_folders(env.site_url)
     with cd(folders['venv']):
-        run('source bin/activate && django-admin runserver_plus')
+        sudo('source bin/activate && django-admin runserver_plus',
+             user=_linux_user())
 
 
 @task(name='gulp')
@@ -80,9 +127,10 @@ def gulp_watch():
 def django_admin(*args):
     """run arbitrary django-admin commands"""
     venv_folder = _get_folders(env.site_url)['venv']
-    run('source {venv}/bin/activate && django-admin {args}'.format(
+    # Only the site user can read the environment file with the secrets.
+    sudo('source {venv}/bin/activate && django-admin {args}'.format(
         venv=venv_folder,
-        args=' '.join(args), ))
+        args=' '.join(args), ), user=_linux_user())
 
 
 def _get_folders(site_url=None):
@@ -116,6 +164,11 @@ def _get_folders(site_url=None):
     return folders
 
 
+def _linux_user(site_url=None):
+    """Name of the linux user that runs the site."""
+    return (site_url or env.site_url).replace('.', '_')
+
+
 def _get_configs(
         site_url=None, user_name=None, bin_folder=None, config_folder=None):
     """
@@ -123,14 +176,14 @@ def _get_configs(
     """
     # user name for database and linux
     site_url = site_url or env.site_url
-    user_name = user_name or site_url.replace('.', '_')
+    user_name = user_name or _linux_user(site_url)
     # folder to put shell scripts
     project_folder = '{root}/{url}/'.format(
         root=WEBSERVER_ROOT,
         url=site_url)
     bin_folder = bin_folder or project_folder + 'bin'
     # parent folder of config file templates.
-    config_folder = config_folder or dirname(__file__) + '/deployment_tools'
+    config_folder = config_folder or dirname(__file__) + '/config_tools'
 
     configs = {
         # 'service': # name of program or service that need configuration files.
@@ -163,7 +216,8 @@ def _get_configs(
             'template': '{config}/nginx/template'.format(config=config_folder,),
             'filename': '{url}'.format(url=site_url,),
             'target folder': '/etc/nginx/sites-available',
-            'install': ':',
+            # folder for the microcache
+            'install': 'sudo mkdir -p /var/cache/nginx/{user}'.format(user=user_name),
             'start': (
                 # create symbolic link from config file to sites-enabled
                 'sudo ln -sf /etc/nginx/sites-available/{url} /etc/nginx/sites-enabled/{url} '
@@ -193,13 +247,16 @@ def deploy():
     folders = _get_folders()
 
     postactivate_file, project_settings = make_postactivate_file(env.site_url, )
+    environment_file = make_environment_file(env.site_url, project_settings)
 
     _create_postgres_db(project_settings)
     _create_linux_user(project_settings['user'], LINUXGROUP)
 
     _folders_and_permissions(folders)
     _create_virtualenv(folders)
-    _upload_postactivate(postactivate_file, folders['venv'], folders['bin'])
+    _upload_postactivate(
+        postactivate_file, environment_file, folders['venv'], folders['bin'],
+        project_settings['user'])
     _deploy_configs()
     update()
 
@@ -222,6 +279,7 @@ def update():
     _update_virtualenv(folders['source'], folders['venv'],)
     _update_npm_and_bower(folders)
     _gulp_build(folders['source'])
+    _compile_translations(folders['venv'], folders['source'])
     _collectstatic(folders['venv'])
     _update_database(folders['venv'])
     stop()
@@ -252,8 +310,9 @@ def dropdb():
 def resetdb():
     """Reset and repopulate database with dummy data."""
     stop()
-    run('source {venv}/bin/activate && reset-database.sh'.format(
-        venv=_get_folders(env.site_url)['venv']))
+    # The script loads the django settings, so it must run as the site user.
+    sudo('source {venv}/bin/activate && reset-database.sh'.format(
+        venv=_get_folders(env.site_url)['venv']), user=_linux_user())
     start()
 
 
@@ -279,16 +338,73 @@ def update_config():
     start()
 
 
+def _gunicorn_settings(ask_host=True):
+    """
+    Gunicorn settings for the target host.
+    Worker count is based on the host's cpu count and available memory,
+    or DEFAULT_WORKERS if ask_host is False.
+    """
+    gunicorn = dict(GUNICORN_SETTINGS)
+    for key, default in GUNICORN_SETTINGS.items():
+        override = env.get('gunicorn_' + key)
+        if override is not None:
+            # Values from `fab --set` are strings.
+            if key == 'workers' or isinstance(default, int):
+                override = int(override)
+            gunicorn[key] = override
+    if not gunicorn['workers'] and not ask_host:
+        gunicorn['workers'] = DEFAULT_WORKERS
+    if not gunicorn['workers']:
+        cpus = int(run('nproc', quiet=True))
+        memory_mb = int(run(
+            "awk '/MemTotal/ {print $2}' /proc/meminfo", quiet=True)) // 1024
+        gunicorn['workers'] = max(1, min(
+            2 * cpus + 1,
+            (memory_mb - RESERVED_MEMORY_MB) // WORKER_MEMORY_MB,
+        ))
+    if gunicorn['worker_class'] != 'gthread':
+        gunicorn['threads'] = 1
+    return gunicorn
+
+
 def _deploy_configs(user_name=None, user_group=None, upload=True):
     """
     Creates new configs for webserver and services and uploads them to webserver.
     If a custom version of config exists locally that is newer than the template config,
-    a new config file will not be created from template.
+    a new config file will not be created from template, unless
+    env.regenerate_configs is set. A config that has not been edited since
+    it was generated is also created again when the replacements change,
+    for example because the host has a different cpu count or a setting was
+    overridden with `fab --set`. Without upload, the host is not contacted.
     """
     site_url = env.site_url
-    user_name = user_name or site_url.replace('.', '_')
+    user_name = user_name or _linux_user(site_url)
     user_group = user_group or LINUXGROUP
     configs = _get_configs(site_url)
+    # Placeholders in the templates and what to replace them with.
+    folders = _get_folders(site_url)
+    replacements = {
+        'SITEURL': site_url,
+        'USERNAME': user_name,
+        'USERGROUP': user_group,
+        'STATIC_FOLDER': folders['static'],
+        'MEDIA_FOLDER': folders['media'],
+        'MICROCACHE_ZONE': (
+            '{}_microcache'.format(user_name) if env.microcache else 'off'),
+        'MICROCACHE_TIME': '{}s'.format(MICROCACHE_SECONDS),
+    }
+    for key, value in _gunicorn_settings(ask_host=upload).items():
+        replacements['GUNICORN_' + key.upper()] = value
+    for queue, worker in CELERY_WORKERS.items():
+        prefix = 'CELERY_' + queue.upper()
+        replacements[prefix + '_CONCURRENCY'] = int(
+            env.get('celery_' + queue) or worker['concurrency'])
+        replacements[prefix + '_POOL'] = worker['pool']
+    # Longest names first, so GUNICORN_MAX_REQUESTS does not replace part of
+    # GUNICORN_MAX_REQUESTS_JITTER
+    sed_commands = ' | '.join(
+        'sed "s|{key}|{value}|g"'.format(key=key, value=replacements[key])
+        for key in sorted(replacements, key=len, reverse=True))
     for service in configs:  # services are webserver, wsgi service and so on.
         config = configs[service]
         template = config['template']  # template config file
@@ -297,24 +413,37 @@ def _deploy_configs(user_name=None, user_group=None, upload=True):
             config['filename'])  # name for parsed config file
         # server filepath to place config file. Outside git repo.
         destination = join(config['target folder'], config['filename'])
-        if not os.path.exists(target) or os.path.getctime(
-                target) < os.path.getctime(template):
+        # The sed commands and mtime of the last generated config. A target
+        # with another mtime has been edited, and is kept.
+        generated_file = target + '.sed'
+        generated = {}
+        try:
+            with open(generated_file) as generated_fh:
+                generated = json.load(generated_fh)
+        except (IOError, ValueError):
+            pass  # never generated, or by an older version of this file
+        unedited = os.path.exists(target) and (
+            generated.get('mtime') == os.path.getmtime(target))
+        if env.get('regenerate_configs') or not os.path.exists(
+                target) or os.path.getctime(target) < os.path.getctime(
+                template) or (
+                unedited and generated.get('sed') != sed_commands):
             # Generate config file from template if a newer custom file does not exist.
             # use sed to change variable names that will differ between
             # deployments and sites.
-            local((
-                'cat "{template}" | '
-                'sed "s/SITEURL/{url}/g" | '
-                'sed "s/USERNAME/{user}/g" | '
-                'sed "s/USERGROUP/{group}/g" > '
-                '"{filename}"'
-            ).format(
+            local('cat "{template}" | {sed} > "{filename}"'.format(
                 template=template,
-                url=site_url,
-                user=user_name,
-                group=user_group,
+                sed=sed_commands,
                 filename=target,
             ))
+            with open(generated_file, 'w') as generated_fh:
+                json.dump({
+                    'sed': sed_commands,
+                    'mtime': os.path.getmtime(target),
+                }, generated_fh)
+        elif generated.get('sed') != sed_commands:
+            print('Kept edited {}. Use `fab --set regenerate_configs=1` to '
+                  'replace it.'.format(target))
         if upload:
             # upload config file
             put(target, destination, use_sudo=True)
@@ -335,8 +464,9 @@ def _enable_site(start=True):
         run(service[command])
 
 
-def _upload_postactivate(postactivate_file, venv_folder, bin_folder):
-    """Uploads postactivate shell script file to server."""
+def _upload_postactivate(postactivate_file, environment_file, venv_folder,
+                         bin_folder, user_name):
+    """Uploads postactivate shell script and environment files to server."""
     # full filepath for the uploaded file.
     postactivate_path = '{bin}/postactivate'.format(bin=bin_folder,)
     # full filepath for python virtual environment activation shellscript on
@@ -349,8 +479,13 @@ def _upload_postactivate(postactivate_file, venv_folder, bin_folder):
         'source {postactivate}'.format(
             postactivate=postactivate_path,
         ))
-    # upload file.
+    # upload files. Django reads the environment file at startup. It has
+    # the secret key and database password, so only the site user can read
+    # it. postactivate has no secrets.
     put(postactivate_file, postactivate_path)
+    environment_path = '{bin}/environment.json'.format(bin=bin_folder)
+    put(environment_file, environment_path, use_sudo=True, mode=0o600)
+    sudo('chown {user} {path}'.format(user=user_name, path=environment_path))
 
 
 def _folders_and_permissions(folders):
@@ -526,6 +661,12 @@ def _gulp_build(source_folder):
             venv=_get_folders(env.site_url)['venv']))
 
 
+def _compile_translations(venv_folder, source_folder):
+    """Compile translation catalogs that have changed."""
+    run('{venv}/bin/python {source}/config_tools/translations.py '
+        'compile'.format(venv=venv_folder, source=source_folder))
+
+
 def _collectstatic(venv_folder):
     """Run django collectstatic on server."""
     django_admin('collectstatic', '--noinput')
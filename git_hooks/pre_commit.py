@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Pre-commit checks for staged files only.
+
+Lints staged python files, runs the test modules that are staged or import
+a staged module, and regenerates derived files when urls or models change.
+Tests run on a checkout of the index, so unstaged changes can't make them
+pass. Checks run in parallel. Passed checks are cached by the content hash
+of the staged files, so committing the same content again costs nothing.
+"""
+import ast
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = subprocess.check_output(
+    ['git', 'rev-parse', '--show-toplevel']).decode().strip()
+CACHE_FILE = os.path.join(ROOT, '.git', 'pre-commit-cache.json')
+CACHE_SIZE = 2000  # number of passed checks to remember
+SOURCE_FOLDER = 'django'  # python modules are imported relative to this
+TEST_FILE = re.compile(r'(^|/)(test_[^/]*|[^/]*_tests?|tests)\.py$')
+
+
+def git(*args):
+    return subprocess.check_output(('git',) + args, cwd=ROOT).decode()
+
+
+def staged_blobs():
+    """Dictionary of staged file path -> blob hash of the staged content."""
+    changed = git(
+        'diff', '--cached', '--name-only', '--diff-filter=ACMR').splitlines()
+    blobs = {}
+    if changed:
+        for line in git('ls-files', '--stage', '--', *changed).splitlines():
+            info, path = line.split('\t', 1)
+            blobs[path] = info.split()[1]
+    return blobs
+
+
+def module_name(path):
+    """Dotted python module name for a file path."""
+    path = os.path.relpath(path, SOURCE_FOLDER)
+    name = os.path.splitext(path)[0].replace(os.sep, '.')
+    return re.sub(r'\.__init__$', '', name)
+
+
+def imported_modules(path, source):
+    """
+    Names of modules a python file imports. ``from package import name``
+    gives both the package and package.name, since name may be a module.
+    """
+    try:
+        tree = ast.parse(source, path)
+    except SyntaxError:
+        return set()
+    package = module_name(path).split('.')
+    if not path.endswith('__init__.py'):
+        package = package[:-1]
+    modules = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = (node.module or '').split('.')
+            if node.level:  # relative import
+                base = package[:len(package) - node.level + 1] + base
+            base = '.'.join(part for part in base if part)
+            modules.add(base)
+            modules.update(
+                '{}.{}'.format(base, alias.name) for alias in node.names)
+    return modules
+
+
+def dependent_tests(python_files):
+    """Test modules that are staged or import one of the staged modules."""
+    tests = set(path for path in python_files if TEST_FILE.search(path))
+    names = set(module_name(path) for path in python_files)
+    if not names:
+        return tests
+    for path in git('ls-files', '--cached', '*.py').splitlines():
+        if TEST_FILE.search(path) and path not in tests:
+            # The staged version of the test file.
+            source = git('show', ':' + path)
+            if imported_modules(path, source) & names:
+                tests.add(path)
+    return tests
+
+
+def run(name, command, stdin=None, cwd=ROOT):
+    """Run a command. Returns (name, passed, output)"""
+    try:
+        process = subprocess.Popen(
+            command, cwd=cwd, shell=isinstance(command, str),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT)
+    except OSError as err:
+        return name, False, '{}: {}'.format(command[0], err)
+    output, _ = process.communicate(stdin)
+    return name, process.returncode == 0, output.decode(errors='replace')
+
+
+def lint(path, blob):
+    """Lint the staged content of a file, not the working tree."""
+    content = git('cat-file', 'blob', blob).encode()
+    return run('flake8 ' + path, [
+        'flake8', '--stdin-display-name', path, '-'], stdin=content)
+
+
+def test(path, checkout):
+    """Run a test module in the checkout of the index."""
+    return run('py.test ' + path, ['py.test', '-q', path], cwd=checkout)
+
+
+def make_checks(blobs, checkout):
+    """List of (cache key, check function, arguments)"""
+    python_files = sorted(path for path in blobs if path.endswith('.py'))
+    checks = []
+    for path in python_files:
+        checks.append(('lint:' + blobs[path], lint, (path, blobs[path])))
+
+    # A test module is run again if it, or any staged python file, changed.
+    staged_hash = hashlib.sha1(''.join(
+        blobs[path] for path in python_files).encode()).hexdigest()
+    for path in sorted(dependent_tests(python_files)):
+        key = 'test:{}:{}'.format(path, staged_hash)
+        checks.append((key, test, (path, checkout)))
+
+    if any(path.endswith('urls.py') for path in blobs):
+        checks.append((None, run, (
+            'url json dump',
+            './bashscripts/urls-to-json.sh && '
+            'git add src/javascript/api-urls.json')))
+    if any(path.endswith('models.py') for path in blobs):
+        checks.append((None, run, (
+            'model schema graph',
+            './bashscripts/graph-models.sh && git add database-schema.svg')))
+    return checks
+
+
+def load_cache():
+    """List of keys of passed checks, oldest first."""
+    try:
+        with open(CACHE_FILE) as cache_file:
+            return json.load(cache_file)
+    except (IOError, ValueError):
+        return []
+
+
+def save_cache(cache):
+    with open(CACHE_FILE, 'w') as cache_file:
+        json.dump(cache[-CACHE_SIZE:], cache_file)
+
+
+def main():
+    cache = load_cache()
+    passed_checks = set(cache)
+    checkout = tempfile.mkdtemp(prefix='pre-commit-')
+    try:
+        checks = [check for check in make_checks(staged_blobs(), checkout)
+                  if check[0] not in passed_checks]
+        if any(function is test for _, function, _ in checks):
+            git('checkout-index', '--all',
+                '--prefix=' + os.path.join(checkout, ''))
+        return run_checks(cache, checks)
+    finally:
+        shutil.rmtree(checkout)
+
+
+def run_checks(cache, checks):
+    if not checks:
+        return 0
+    # Checks without a cache key stage files, so they run one by one
+    # after the others.
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 2) as executor:
+        futures = [
+            (key, executor.submit(function, *args))
+            for key, function, args in checks if key is not None]
+        results = [(key, future.result()) for key, future in futures]
+    results += [(None, function(*args))
+                for key, function, args in checks if key is None]
+
+    failed = False
+    for key, (name, passed, output) in results:
+        if passed:
+            if key:
+                cache.append(key)
+        else:
+            failed = True
+            print('FAILED: {}\n{}'.format(name, output))
+    save_cache(cache)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())